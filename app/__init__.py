@@ -17,6 +17,10 @@ migrate = Migrate()
 
 def create_app():
     app = Flask(__name__)
+
+    # orjson-backed JSON encoding, with native datetime, enum and Decimal support
+    from .utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # App configuration
     app.config.update({
@@ -24,7 +28,23 @@ def create_app():
         'SQLALCHEMY_TRACK_MODIFICATIONS': False,
         'SECRET_KEY': os.getenv('SECRET_KEY'),
         'JWT_SECRET_KEY': os.getenv('JWT_SECRET_KEY'),
-        'TINYPESA_API_KEY': os.getenv('TINYPESA_API_KEY')
+        'TINYPESA_API_KEY': os.getenv('TINYPESA_API_KEY'),
+        # 'postgres' or 'memory'; defaults to postgres on a PostgreSQL database
+        'CACHE_INVALIDATION_BACKEND': os.getenv('CACHE_INVALIDATION_BACKEND'),
+        # Bearer token required by /metrics when set
+        'METRICS_TOKEN': os.getenv('METRICS_TOKEN'),
+        # Statements slower than this are logged
+        'SLOW_QUERY_MS': float(os.getenv('SLOW_QUERY_MS', '250')),
+        # The same statement this many times in one request is logged as a likely N+1
+        'N_PLUS_ONE_THRESHOLD': int(os.getenv('N_PLUS_ONE_THRESHOLD', '10')),
+        # Request profiling is off unless a key (for X-Profile tokens) or a sample rate is set
+        'PROFILER_KEY': os.getenv('PROFILER_KEY'),
+        'PROFILE_TOKEN_MAX_AGE': int(os.getenv('PROFILE_TOKEN_MAX_AGE', '3600')),
+        'PROFILE_SAMPLE_RATE': float(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+        'PROFILE_DIR': os.getenv('PROFILE_DIR'),
+        'PROFILE_MAX_PROFILES': int(os.getenv('PROFILE_MAX_PROFILES', '50')),
+        # Samples kept per profile; longer requests are only profiled up to this point
+        'PROFILE_MAX_SAMPLES': int(os.getenv('PROFILE_MAX_SAMPLES', '30000'))
     })
     
     # Initialize extensions
@@ -32,6 +52,10 @@ def create_app():
     bcrypt.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
+
+    # Cache invalidations shared across worker processes
+    from .utils.invalidation import invalidation_bus
+    invalidation_bus.init_app(app)
     
     # Configure CORS
     allowed_origins = [
@@ -68,6 +92,7 @@ def create_app():
     # Register blueprints
     from .routes import auth_routes, group_routes, transaction_routes, withdrawal_routes
     from .routes import payment_routes, notification_routes, userSearch_route, loan_routes
+    from .routes import admin_routes, statement_routes
 
     app.register_blueprint(auth_routes.auth_bp, url_prefix='/api/auth')
     app.register_blueprint(group_routes.group_bp, url_prefix='/api/groups')  # Ensure this matches the group routes
@@ -77,6 +102,24 @@ def create_app():
     app.register_blueprint(notification_routes.notification_bp, url_prefix='/api/notifications')
     app.register_blueprint(userSearch_route.user_bp, url_prefix='/api/users')
     app.register_blueprint(loan_routes.loan_bp, url_prefix='/api/loans')  # Ensure loan routes are registered correctly
+    app.register_blueprint(admin_routes.admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(statement_routes.statement_bp, url_prefix='/api/statements')
+
+    # Slow query and N+1 logging, and the per-request query counts the metrics use
+    from .utils.query_inspector import query_inspector
+    query_inspector.init_app(app)
+
+    # Request metrics, exposed on /metrics
+    from .utils.metrics import init_metrics
+    init_metrics(app)
+
+    # On-demand request profiling, served on /profiles
+    from .utils.profiler import init_profiler
+    init_profiler(app)
+
+    # Register CLI commands
+    from .commands import register_commands
+    register_commands(app)
 
     @app.route("/")
     def health_check():
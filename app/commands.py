@@ -0,0 +1,103 @@
+# app/commands.py
+import click
+import time
+from datetime import date, timedelta
+from flask.cli import with_appcontext
+
+@click.command('accrue-penalties')
+@click.option('--date', 'accrual_date', type=click.DateTime(formats=['%Y-%m-%d']),
+              help="Accrual date (defaults to today)")
+@click.option('--days', type=int, default=1, show_default=True,
+              help="Number of days up to the accrual date to accrue, for catching up missed runs")
+@with_appcontext
+def accrue_penalties_command(accrual_date, days):
+    """Accrue late penalties on overdue loan installments (run nightly)"""
+    from app.services.penalty_service import PenaltyService
+
+    end_date = accrual_date.date() if accrual_date else date.today()
+    start_date = end_date - timedelta(days=max(days, 1) - 1)
+    for summary in PenaltyService.accrue_range(start_date, end_date):
+        click.echo(
+            f"{summary['accrual_date']}: {summary['penalties_written']} penalties "
+            f"totalling {summary['penalty_total']:.2f}, "
+            f"{summary['installments_marked_late']} installments marked late"
+        )
+
+@click.command('simulate-loan-policy')
+@click.option('--group-id', 'group_ids', type=int, multiple=True, required=True,
+              help="Group to simulate; repeat for several groups")
+@click.option('--scenarios', type=int, default=5000, show_default=True)
+@click.option('--horizon-weeks', type=int, default=26, show_default=True)
+@click.option('--seed', type=int, help="Random seed, for reproducible runs")
+@click.option('--workers', type=int, help="Worker processes (defaults to the CPU count)")
+@with_appcontext
+def simulate_loan_policy_command(group_ids, scenarios, horizon_weeks, seed, workers):
+    """Simulate candidate loan settings around each group's current ones"""
+    from app.services.policy_simulator import PolicySimulator
+
+    started = time.perf_counter()
+    histories = [PolicySimulator.load_history(group_id) for group_id in group_ids]
+    results = PolicySimulator.simulate_many(
+        histories, scenarios=scenarios, horizon_weeks=horizon_weeks, seed=seed, workers=workers
+    )
+
+    for group_id, candidates in results.items():
+        click.echo(f"Group {group_id}")
+        click.echo(f"  {'multiplier':>10} {'rate':>6} {'weeks':>7} {'interest':>12} {'default loss':>13} "
+                   f"{'loss p95':>12} {'shortfall':>12} {'P(short)':>9}")
+        for result in candidates:
+            click.echo(
+                f"  {result['max_loan_multiplier']:>10.2f} {result['base_interest_rate']:>6.1f} "
+                f"{result['min_repayment_period']:>3}-{result['max_repayment_period']:<3} "
+                f"{result['expected_interest_income']:>12.2f} {result['expected_default_loss']:>13.2f} "
+                f"{result['default_loss_p95']:>12.2f} {result['expected_liquidity_shortfall']:>12.2f} "
+                f"{result['shortfall_probability']:>9.1%}"
+            )
+    click.echo(f"Simulated {len(group_ids)} groups x {scenarios} scenarios in {time.perf_counter() - started:.2f}s")
+
+@click.command('import-contributions')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--group-id', type=int, required=True)
+@click.option('--dry-run', is_flag=True, help="Only validate the file")
+@with_appcontext
+def import_contributions_command(csv_file, group_id, dry_run):
+    """Load historical contributions from a CSV of username, amount, date[, description, reference]"""
+    from app import db
+    from app.services.import_service import ContributionImportService
+
+    started = time.perf_counter()
+    result = ContributionImportService.import_csv(group_id, csv_file, dry_run=dry_run)
+    if result.error_count:
+        db.session.rollback()
+        for error in result.errors:
+            click.echo(f"line {error['line'] or '-'}: {error['error']}", err=True)
+        raise click.ClickException(f"{result.error_count} invalid rows; nothing was imported")
+    if dry_run:
+        db.session.rollback()
+        click.echo(f"{result.valid_rows} valid rows from {result.members} members totalling {result.total_amount:.2f}")
+        return
+    db.session.commit()
+    click.echo(
+        f"Imported {result.imported} contributions from {result.members} members totalling "
+        f"{result.total_amount:.2f} ({result.skipped_duplicates} already imported) "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+@click.command('profile-token')
+@with_appcontext
+def profile_token_command():
+    """Print an X-Profile header value that has requests profiled, valid for PROFILE_TOKEN_MAX_AGE seconds"""
+    from flask import current_app
+    from app.utils.profiler import profile_serializer
+
+    key = current_app.config.get('PROFILER_KEY')
+    if not key:
+        raise click.ClickException("PROFILER_KEY is not set")
+    click.echo(profile_serializer(key).dumps({'issued_at': int(time.time())}))
+
+def register_commands(app):
+    """Register the app's CLI commands"""
+    app.cli.add_command(accrue_penalties_command)
+    app.cli.add_command(simulate_loan_policy_command)
+    app.cli.add_command(import_contributions_command)
+    app.cli.add_command(profile_token_command)
@@ -0,0 +1,39 @@
+# app/models/dividend.py
+from datetime import datetime
+from app import db
+
+class DividendDistribution(db.Model):
+    """One sharing-out of a group's loan interest income for a period"""
+    __tablename__ = 'dividend_distributions'
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'period_start', 'period_end', name='uq_dividend_distributions_group_period'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    period_end = db.Column(db.Date, nullable=False)  # Inclusive
+    interest_income = db.Column(db.Float, nullable=False, default=0.0)
+    distributed_amount = db.Column(db.Float, nullable=False, default=0.0)
+    # Sum of the members' time-weighted balances, in balance-days
+    total_weight = db.Column(db.Float, nullable=False, default=0.0)
+    member_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    group = db.relationship('Group', backref=db.backref('dividend_distributions', lazy=True))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'group_id': self.group_id,
+            'period_start': self.period_start.isoformat(),
+            'period_end': self.period_end.isoformat(),
+            'interest_income': self.interest_income,
+            'distributed_amount': self.distributed_amount,
+            'total_weight': self.total_weight,
+            'member_count': self.member_count,
+            'created_by_id': self.created_by_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
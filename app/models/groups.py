@@ -54,6 +54,18 @@ class Group(db.Model):
         
         return 'admin' if query.is_admin else 'member'
     
+    @staticmethod
+    def get_admin_group_ids(user_id, group_ids=None):
+        """Get the IDs of the groups the user administers, optionally limited to group_ids"""
+        query = db.session.query(group_members.c.group_id).filter(
+            group_members.c.user_id == user_id,
+            group_members.c.is_admin == 1
+        )
+        if group_ids is not None:
+            query = query.filter(group_members.c.group_id.in_(list(group_ids)))
+        
+        return {row.group_id for row in query.all()}
+    
     @staticmethod
     def add_member(group_id, user_id, is_admin=False):
         """Add user to group"""
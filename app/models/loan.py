@@ -1,5 +1,5 @@
 from app import db
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, Float, String, DateTime, Date, Boolean, ForeignKey, Enum, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum as PyEnum
@@ -20,6 +20,9 @@ class RepaymentStatus(PyEnum):
 
 class Loan(db.Model):
     __tablename__ = 'loans'
+    __table_args__ = (
+        db.Index('ix_loans_group_status_created_at', 'group_id', 'status', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     amount = Column(Float, nullable=False)
@@ -27,6 +30,7 @@ class Loan(db.Model):
     status = Column(Enum(LoanStatus), default=LoanStatus.PENDING)
     interest_rate = Column(Float, nullable=False)
     duration_weeks = Column(Integer, nullable=False)
+    interest_method = Column(String(20), default='flat', nullable=False)  # Copied from the group's settings on request
     approved_at = Column(DateTime)
     due_date = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -42,9 +46,26 @@ class Loan(db.Model):
 
     approved_by_id = Column(Integer, ForeignKey('users.id'))
     approved_by = relationship("User", foreign_keys=[approved_by_id])
+
+    # Admin currently working this request from the approval queue, until the lease expires
+    claimed_by_id = Column(Integer, ForeignKey('users.id'))
+    claimed_until = Column(DateTime)
         
     repayments = relationship("LoanRepayment", back_populates="loan", cascade="all, delete-orphan")
     
+    # Keys of to_dict that ?fields= can pick; the computed ones need the repayments loaded
+    COLUMN_FIELDS = (
+        'id', 'amount', 'purpose', 'status', 'interest_rate', 'duration_weeks', 'interest_method',
+        'approved_at', 'due_date', 'created_at', 'user_id', 'group_id', 'approved_by_id'
+    )
+    COMPUTED_FIELDS = ('total_repayment', 'amount_paid', 'outstanding_balance', 'next_payment_due')
+    LIST_FIELDS = COLUMN_FIELDS + COMPUTED_FIELDS
+    
+    @staticmethod
+    def list_select(fields):
+        """Select just the given column fields, one column each, without loading Loan objects"""
+        return db.select(*(getattr(Loan, field) for field in fields))
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -53,6 +74,7 @@ class Loan(db.Model):
             'status': self.status.value,
             'interest_rate': self.interest_rate,
             'duration_weeks': self.duration_weeks,
+            'interest_method': self.interest_method,
             'approved_at': self.approved_at.isoformat() if self.approved_at else None,
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'created_at': self.created_at.isoformat(),
@@ -67,24 +89,34 @@ class Loan(db.Model):
     
     def total_repayment_amount(self):
         """Calculate total amount to be repaid (principal + interest)"""
-        return self.amount * (1 + (self.interest_rate / 100))
+        # Once scheduled, the installments are what the member owes
+        if self.repayments:
+            return sum([repayment.amount for repayment in self.repayments])
+        from app.services.loan_pricing import LoanPricingEngine
+        return float(LoanPricingEngine.total_repayment(
+            self.amount, self.interest_rate, self.duration_weeks, self.interest_method or 'flat'
+        )[0])
     
     def amount_paid(self):
         """Calculate total amount already paid"""
-        return sum([repayment.amount for repayment in self.repayments if repayment.status == RepaymentStatus.PAID.value])
+        return sum([repayment.amount_paid or 0.0 for repayment in self.repayments])
+    
+    def penalties_accrued(self):
+        """Calculate total late penalties accrued on the installments"""
+        return sum([repayment.penalty_amount or 0.0 for repayment in self.repayments])
     
     def outstanding_balance(self):
-        """Calculate remaining balance"""
-        return self.total_repayment_amount() - self.amount_paid()
+        """Calculate remaining balance, including late penalties"""
+        return self.total_repayment_amount() + self.penalties_accrued() - self.amount_paid()
     
     def next_payment_due_date(self):
         """Calculate next payment due date"""
-        if self.status != LoanStatus.ACTIVE.value:
+        if self.status not in (LoanStatus.APPROVED, LoanStatus.ACTIVE):
             return None
             
-        last_payment = sorted(self.repayments, key=lambda x: x.due_date)[-1] if self.repayments else None
-        if last_payment and last_payment.status != RepaymentStatus.PAID.value:
-            return last_payment.due_date
+        unpaid = [repayment for repayment in self.repayments if repayment.status != RepaymentStatus.PAID]
+        if unpaid:
+            return min(repayment.due_date for repayment in unpaid)
             
         # If all payments are made or no payments exist
         return None
@@ -95,30 +127,68 @@ class LoanRepayment(db.Model):
     id = Column(Integer, primary_key=True)
     amount = Column(Float, nullable=False)
     amount_paid = Column(Float, default=0.0)
+    principal_amount = Column(Float)  # Split of the installment amount
+    interest_amount = Column(Float)
     due_date = Column(DateTime, nullable=False)
     status = Column(Enum(RepaymentStatus), default=RepaymentStatus.PENDING)
     paid_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Maintained by the nightly penalty accrual job
+    is_overdue = Column(Boolean, default=False, nullable=False, index=True)
+    penalty_amount = Column(Float, default=0.0, nullable=False)
     
     # Relationships
     loan_id = Column(Integer, ForeignKey('loans.id'), nullable=False)
     loan = relationship("Loan", back_populates="repayments")
     
+    def amount_due(self):
+        """Installment amount plus the late penalties accrued on it; both must be paid to settle it"""
+        return self.amount + (self.penalty_amount or 0.0)
+    
     def to_dict(self):
         return {
             'id': self.id,
             'amount': self.amount,
             'amount_paid': self.amount_paid,
+            'principal_amount': self.principal_amount,
+            'interest_amount': self.interest_amount,
             'due_date': self.due_date.isoformat(),
             'status': self.status.value,
             'paid_at': self.paid_at.isoformat() if self.paid_at else None,
             'loan_id': self.loan_id,
-            'is_overdue': self.is_overdue()
+            'is_overdue': self.is_overdue,
+            'penalty_amount': self.penalty_amount
         }
+
+class LoanPenalty(db.Model):
+    """Ledger of late penalties, one entry per overdue installment and accrual date"""
+    __tablename__ = 'loan_penalties'
+    __table_args__ = (
+        UniqueConstraint('repayment_id', 'accrual_date', name='uq_loan_penalties_repayment_date'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    accrual_date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+    rate = Column(Float, nullable=False)  # late_penalty_rate applied, in percent per week
+    created_at = Column(DateTime, default=datetime.utcnow)
     
-    def is_overdue(self):
-        """Check if repayment is overdue"""
-        return self.status != RepaymentStatus.PAID.value and datetime.utcnow() > self.due_date
+    # Relationships
+    repayment_id = Column(Integer, ForeignKey('loan_repayments.id'), nullable=False)
+    loan_id = Column(Integer, ForeignKey('loans.id'), nullable=False, index=True)
+    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
+    repayment = relationship("LoanRepayment", backref="penalties")
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'accrual_date': self.accrual_date.isoformat(),
+            'amount': self.amount,
+            'rate': self.rate,
+            'repayment_id': self.repayment_id,
+            'loan_id': self.loan_id,
+            'group_id': self.group_id
+        }
 
 class GroupLoanSettings(db.Model):
     __tablename__ = 'group_loan_settings'
@@ -129,6 +199,7 @@ class GroupLoanSettings(db.Model):
     min_repayment_period = Column(Integer, default=4)  # Minimum repayment period in weeks
     max_repayment_period = Column(Integer, default=12)  # Maximum repayment period in weeks
     late_penalty_rate = Column(Float, default=2.0)  # Additional interest for late payments
+    interest_method = Column(String(20), default='flat', nullable=False)  # flat, reducing_balance or annuity
     
     # Relationship
     group_id = Column(Integer, ForeignKey('groups.id'), unique=True, nullable=False)
@@ -142,5 +213,6 @@ class GroupLoanSettings(db.Model):
             'min_repayment_period': self.min_repayment_period,
             'max_repayment_period': self.max_repayment_period,
             'late_penalty_rate': self.late_penalty_rate,
+            'interest_method': self.interest_method,
             'group_id': self.group_id
         }
\ No newline at end of file
@@ -0,0 +1,91 @@
+# app/models/member_balance.py
+from enum import Enum
+from datetime import datetime
+from app import db
+
+class HoldStatus(Enum):
+    ACTIVE = "active"
+    CONVERTED = "converted"
+    RELEASED = "released"
+
+class MemberBalance(db.Model):
+    """Materialized per-member balance of a group, kept in step with the ledger"""
+    __tablename__ = 'member_balances'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'group_id', name='uq_member_balances_user_group'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+    total_contributed = db.Column(db.Float, nullable=False, default=0.0)
+    total_withdrawn = db.Column(db.Float, nullable=False, default=0.0)
+    # Loan interest shared out to the member
+    total_dividends = db.Column(db.Float, nullable=False, default=0.0)
+    # Funds reserved by pending withdrawal requests
+    held_amount = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def net_savings(self):
+        """Contributions and dividends minus approved withdrawals"""
+        return (self.total_contributed or 0.0) + (self.total_dividends or 0.0) - (self.total_withdrawn or 0.0)
+
+    @property
+    def available(self):
+        """Balance the member can still reserve for new withdrawals"""
+        return self.net_savings - (self.held_amount or 0.0)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'group_id': self.group_id,
+            'total_contributed': self.total_contributed,
+            'total_withdrawn': self.total_withdrawn,
+            'total_dividends': self.total_dividends,
+            'held_amount': self.held_amount,
+            'available_balance': self.available
+        }
+
+class WithdrawalHold(db.Model):
+    """Ledger of funds reserved against a member balance by a withdrawal request"""
+    __tablename__ = 'withdrawal_holds'
+
+    id = db.Column(db.Integer, primary_key=True)
+    amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), default=HoldStatus.ACTIVE.value, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    settled_at = db.Column(db.DateTime)
+
+    withdrawal_request_id = db.Column(db.Integer, db.ForeignKey('withdrawal_requests.id'), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+
+    withdrawal_request = db.relationship('WithdrawalRequest', backref=db.backref('hold', uselist=False))
+
+class DailyRollup(db.Model):
+    """Per-member daily totals of a group's savings activity, kept in step with the ledger"""
+    __tablename__ = 'daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'day', 'user_id', name='uq_daily_rollups_group_day_user'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    contributed = db.Column(db.Float, nullable=False, default=0.0)
+    contribution_count = db.Column(db.Integer, nullable=False, default=0)
+    withdrawn = db.Column(db.Float, nullable=False, default=0.0)
+    withdrawal_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'group_id': self.group_id,
+            'user_id': self.user_id,
+            'day': self.day.isoformat(),
+            'contributed': self.contributed,
+            'contribution_count': self.contribution_count,
+            'withdrawn': self.withdrawn,
+            'withdrawal_count': self.withdrawal_count
+        }
@@ -1,6 +1,7 @@
 # app/models/notification.py
 from app import db
 from datetime import datetime
+from sqlalchemy.orm import validates
 from enum import Enum
 
 class NotificationType(Enum):
@@ -12,6 +13,8 @@ class NotificationType(Enum):
     LOAN_APPROVED = 'loan_approved'
     LOAN_REJECTED = 'loan_rejected'
     LOAN_REPAYMENT = 'loan_repayment'
+    DIVIDEND_PAID = 'dividend_paid'
+    GROUP_WELCOME = 'group_welcome'
 
 
 class Notification(db.Model):
@@ -24,6 +27,63 @@ class Notification(db.Model):
     group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     read = db.Column(db.Boolean, default=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    reference_id = db.Column(db.Integer, nullable=True)  # e.g., transaction, withdrawal or loan ID
+    reference_amount = db.Column(db.Float, nullable=True)
+    emailed = db.Column(db.Boolean, default=False)
     
-    recipient = db.relationship('User', backref=db.backref('notifications', lazy=True))
-    group = db.relationship('Group', backref=db.backref('notifications', lazy=True))
\ No newline at end of file
+    recipient = db.relationship('User', foreign_keys=[recipient_id], backref=db.backref('notifications', lazy=True))
+    sender = db.relationship('User', foreign_keys=[sender_id])
+    group = db.relationship('Group', backref=db.backref('notifications', lazy=True))
+    
+    @validates('type')
+    def validate_type(self, key, value):
+        # Store the enum's value, the column is a plain string
+        return value.value if isinstance(value, NotificationType) else value
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'message': self.message,
+            'recipient_id': self.recipient_id,
+            'sender_id': self.sender_id,
+            'group_id': self.group_id,
+            'reference_id': self.reference_id,
+            'reference_amount': self.reference_amount,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'read': self.read
+        }
+
+    @staticmethod
+    def list_select():
+        """Select the columns to_dict returns, for lists that skip loading objects"""
+        return db.select(
+            Notification.id,
+            Notification.type,
+            Notification.message,
+            Notification.recipient_id,
+            Notification.sender_id,
+            Notification.group_id,
+            Notification.reference_id,
+            Notification.reference_amount,
+            Notification.created_at,
+            Notification.read
+        )
+
+    @staticmethod
+    def row_to_dict(row):
+        """to_dict for a list_select row; the JSON provider formats created_at"""
+        id, type, message, recipient_id, sender_id, group_id, reference_id, reference_amount, created_at, read = row
+        return {
+            'id': id,
+            'type': type,
+            'message': message,
+            'recipient_id': recipient_id,
+            'sender_id': sender_id,
+            'group_id': group_id,
+            'reference_id': reference_id,
+            'reference_amount': reference_amount,
+            'created_at': created_at,
+            'read': read
+        }
\ No newline at end of file
@@ -0,0 +1,52 @@
+# app/models/statement.py
+from enum import Enum
+from datetime import datetime
+from app import db
+
+class StatementStatus(Enum):
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+
+class MemberStatement(db.Model):
+    """A member's rendered statement for one group and period, reused until their activity changes"""
+    __tablename__ = 'member_statements'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'group_id', 'period_start', 'period_end', 'format',
+                            name='uq_member_statements_member_period_format'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    period_end = db.Column(db.Date, nullable=False)  # Inclusive
+    format = db.Column(db.String(10), nullable=False, default='csv')
+    status = db.Column(db.String(20), nullable=False, default=StatementStatus.PENDING.value)
+    # Fingerprint of the member's activity the content was generated from
+    activity_marker = db.Column(db.String(255))
+    content = db.Column(db.Text)
+    opening_balance = db.Column(db.Float)
+    closing_balance = db.Column(db.Float)
+    error = db.Column(db.String(255))
+    requested_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+
+    user = db.relationship('User', backref=db.backref('statements', lazy=True))
+    group = db.relationship('Group', backref=db.backref('statements', lazy=True))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'group_id': self.group_id,
+            'period_start': self.period_start.isoformat(),
+            'period_end': self.period_end.isoformat(),
+            'format': self.format,
+            'status': self.status,
+            'opening_balance': self.opening_balance,
+            'closing_balance': self.closing_balance,
+            'error': self.error,
+            'requested_at': self.requested_at.isoformat() if self.requested_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
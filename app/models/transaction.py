@@ -1,6 +1,7 @@
 # app/models/transaction.py
 from app import db
 from datetime import datetime
+from sqlalchemy import select
 from sqlalchemy.ext.hybrid import hybrid_property
 from enum import Enum
 
@@ -11,9 +12,13 @@ class TransactionType(Enum):
     LOAN_REQUEST = 'loan_request'
     LOAN_REPAYMENT = 'loan_repayment'
     LOAN_DISBURSEMENT = 'loan_disbursement'
+    DIVIDEND = 'dividend'
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_group_id_id', 'group_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
@@ -65,4 +70,38 @@ class Transaction(db.Model):
                 'id': self.user.id,
                 'username': self.user.username
             }
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def list_select():
+        """Select the columns the transaction lists return, with the username joined in, without loading objects"""
+        from app.models.user import User
+        return select(
+            Transaction.id,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.transaction_type,
+            Transaction.timestamp,
+            Transaction.user_id,
+            Transaction.group_id,
+            User.username
+        ).join(User, User.id == Transaction.user_id)
+
+    @staticmethod
+    def row_to_dict(row):
+        """to_dict for a list_select row; the JSON provider formats the type and timestamp"""
+        # Unpacking is several times faster than reading a Row's attributes by name
+        id, amount, description, transaction_type, timestamp, user_id, group_id, username = row
+        return {
+            'id': id,
+            'amount': amount,
+            'description': description,
+            'transaction_type': transaction_type,
+            'timestamp': timestamp,
+            'user_id': user_id,
+            'group_id': group_id,
+            'user': {
+                'id': user_id,
+                'username': username
+            }
+        }
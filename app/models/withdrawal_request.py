@@ -1,6 +1,7 @@
 # app/models/withdrawal_request.py
 from enum import Enum
 from datetime import datetime
+from sqlalchemy.orm import aliased
 from app import db
 from app.models.transaction import Transaction, TransactionType
 
@@ -11,6 +12,9 @@ class WithdrawalStatus(Enum):
 
 class WithdrawalRequest(db.Model):
     __tablename__ = 'withdrawal_requests'
+    __table_args__ = (
+        db.Index('ix_withdrawal_requests_group_status_timestamp', 'group_id', 'status', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
@@ -26,11 +30,39 @@ class WithdrawalRequest(db.Model):
     admin_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     admin_comment = db.Column(db.String(255))
     
+    # Admin currently working this request from the approval queue, until the lease expires
+    claimed_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    
     # Relationships
     user = db.relationship('User', foreign_keys=[user_id], backref='withdrawal_requests')
     group = db.relationship('Group', backref='withdrawal_requests')
     admin = db.relationship('User', foreign_keys=[admin_id])
     
+    # Keys of to_dict that ?fields= can pick; user, group and admin are names from joined tables
+    LIST_FIELDS = (
+        'id', 'amount', 'description', 'status', 'timestamp', 'updated_at', 'user_id', 'group_id',
+        'admin_id', 'admin_comment', 'user', 'group', 'admin'
+    )
+    
+    @staticmethod
+    def list_select(fields):
+        """Select the given to_dict keys, one column each, joining only the tables whose names are asked for"""
+        from app.models.user import User
+        from app.models.groups import Group
+        requester, admin = aliased(User), aliased(User)
+        names = {'user': requester.username, 'group': Group.name, 'admin': admin.username}
+        query = db.select(*(
+            names[field] if field in names else getattr(WithdrawalRequest, field) for field in fields
+        )).select_from(WithdrawalRequest)
+        if 'user' in fields:
+            query = query.outerjoin(requester, requester.id == WithdrawalRequest.user_id)
+        if 'group' in fields:
+            query = query.outerjoin(Group, Group.id == WithdrawalRequest.group_id)
+        if 'admin' in fields:
+            query = query.outerjoin(admin, admin.id == WithdrawalRequest.admin_id)
+        return query
+    
     def to_dict(self):
         """Convert object to dictionary"""
         return {
@@ -0,0 +1,372 @@
+# app/routes/admin_routes.py
+import io
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.models.user import User
+from app.models.groups import Group, group_members
+from app.models.loan import Loan, LoanStatus
+from app.models.withdrawal_request import WithdrawalRequest, WithdrawalStatus
+from app.models.dividend import DividendDistribution
+from app.models.notification import NotificationType
+from app.services.dividend_service import DividendService, DividendPeriodError
+from app.services.import_service import ContributionImportService
+from app.services.notification_service import NotificationService
+from app.utils.validators import DividendDistributionSchema, QueueReleaseSchema
+from marshmallow import ValidationError
+from sqlalchemy import select, update, union_all, literal, and_, or_
+from datetime import datetime, timedelta
+
+admin_bp = Blueprint('admin', __name__)
+dividend_distribution_schema = DividendDistributionSchema()
+queue_release_schema = QueueReleaseSchema()
+
+QUEUE_ITEM_TYPES = ('withdrawal', 'loan')
+DEFAULT_CLAIM_MINUTES = 15
+
+def _admin_group_ids(admin_id):
+    """Subquery of the groups the user administers"""
+    return select(group_members.c.group_id).where(
+        group_members.c.user_id == admin_id,
+        group_members.c.is_admin == 1
+    )
+
+def _unclaimed(model, admin_id, now):
+    """Items nobody else holds an unexpired claim on"""
+    return or_(
+        model.claimed_until.is_(None),
+        model.claimed_until < now,
+        model.claimed_by_id == admin_id
+    )
+
+def _queue_select(admin_id, item_types, now, available_only=False, ids=None):
+    """Pending withdrawals and loans across the admin's groups as one UNION ALL query"""
+    parts = []
+
+    if 'withdrawal' in item_types:
+        withdrawals = select(
+            literal('withdrawal').label('type'),
+            WithdrawalRequest.id,
+            WithdrawalRequest.group_id,
+            Group.name.label('group_name'),
+            WithdrawalRequest.user_id,
+            User.username,
+            WithdrawalRequest.amount,
+            WithdrawalRequest.description.label('details'),
+            WithdrawalRequest.timestamp.label('created_at'),
+            WithdrawalRequest.claimed_by_id,
+            WithdrawalRequest.claimed_until
+        ).join(
+            Group, Group.id == WithdrawalRequest.group_id
+        ).join(
+            User, User.id == WithdrawalRequest.user_id
+        ).where(
+            WithdrawalRequest.group_id.in_(_admin_group_ids(admin_id)),
+            WithdrawalRequest.status == WithdrawalStatus.PENDING.value
+        )
+        if available_only:
+            withdrawals = withdrawals.where(_unclaimed(WithdrawalRequest, admin_id, now))
+        if ids is not None:
+            withdrawals = withdrawals.where(WithdrawalRequest.id.in_(ids.get('withdrawal', [])))
+        parts.append(withdrawals)
+
+    if 'loan' in item_types:
+        loans = select(
+            literal('loan').label('type'),
+            Loan.id,
+            Loan.group_id,
+            Group.name.label('group_name'),
+            Loan.user_id,
+            User.username,
+            Loan.amount,
+            Loan.purpose.label('details'),
+            Loan.created_at.label('created_at'),
+            Loan.claimed_by_id,
+            Loan.claimed_until
+        ).join(
+            Group, Group.id == Loan.group_id
+        ).join(
+            User, User.id == Loan.user_id
+        ).where(
+            Loan.group_id.in_(_admin_group_ids(admin_id)),
+            Loan.status == LoanStatus.PENDING
+        )
+        if available_only:
+            loans = loans.where(_unclaimed(Loan, admin_id, now))
+        if ids is not None:
+            loans = loans.where(Loan.id.in_(ids.get('loan', [])))
+        parts.append(loans)
+
+    queue = union_all(*parts).subquery() if len(parts) > 1 else parts[0].subquery()
+    return select(queue).order_by(queue.c.created_at.asc(), queue.c.id.asc())
+
+def _serialize_queue_item(row, now):
+    return {
+        "type": row.type,
+        "id": row.id,
+        "group_id": row.group_id,
+        "group_name": row.group_name,
+        "user_id": row.user_id,
+        "username": row.username,
+        "amount": row.amount,
+        "details": row.details,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "claimed_by_id": row.claimed_by_id if row.claimed_until and row.claimed_until > now else None,
+        "claimed_until": row.claimed_until.isoformat() if row.claimed_until and row.claimed_until > now else None
+    }
+
+def _parse_item_types(value):
+    if not value:
+        return QUEUE_ITEM_TYPES
+    item_types = tuple(t.strip() for t in value.split(',') if t.strip())
+    if not item_types or any(t not in QUEUE_ITEM_TYPES for t in item_types):
+        return None
+    return item_types
+
+@admin_bp.route('/queue', methods=['GET'])
+@jwt_required()
+def get_admin_queue():
+    """Get pending withdrawals and loans across every group the user administers"""
+    current_user_id = int(get_jwt_identity())
+    now = datetime.utcnow()
+
+    item_types = _parse_item_types(request.args.get('type'))
+    if item_types is None:
+        return jsonify({"error": f"Invalid type. Valid values are: {', '.join(QUEUE_ITEM_TYPES)}"}), 400
+
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    offset = request.args.get('offset', 0, type=int)
+    available_only = request.args.get('available_only', 'false').lower() == 'true'
+
+    rows = db.session.execute(
+        _queue_select(current_user_id, item_types, now, available_only).limit(limit).offset(offset)
+    ).all()
+
+    return jsonify({
+        "items": [_serialize_queue_item(row, now) for row in rows],
+        "count": len(rows),
+        "limit": limit,
+        "offset": offset
+    }), 200
+
+@admin_bp.route('/queue/claim', methods=['POST'])
+@jwt_required()
+def claim_queue_items():
+    """
+    Claim the next N unclaimed pending items for the current admin.
+    Candidates are locked with FOR UPDATE SKIP LOCKED, so co-admins claiming at
+    the same time each get different items instead of waiting on one another.
+    Claims are leases: they lapse after lease_minutes unless renewed.
+    """
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+    now = datetime.utcnow()
+
+    item_types = _parse_item_types(data.get('type'))
+    if item_types is None:
+        return jsonify({"error": f"Invalid type. Valid values are: {', '.join(QUEUE_ITEM_TYPES)}"}), 400
+
+    try:
+        limit = min(int(data.get('limit', 10)), 100)
+        lease_minutes = int(data.get('lease_minutes', DEFAULT_CLAIM_MINUTES))
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid data types"}), 400
+    if limit <= 0 or lease_minutes <= 0:
+        return jsonify({"error": "limit and lease_minutes must be positive"}), 400
+
+    claimed_until = now + timedelta(minutes=lease_minutes)
+    models = {'withdrawal': (WithdrawalRequest, WithdrawalRequest.timestamp,
+                             WithdrawalRequest.status == WithdrawalStatus.PENDING.value),
+              'loan': (Loan, Loan.created_at, Loan.status == LoanStatus.PENDING)}
+
+    try:
+        # Lock up to N candidates of each type, skipping rows other admins are claiming right now
+        candidates = []
+        for item_type in item_types:
+            model, created_at, pending = models[item_type]
+            rows = db.session.execute(
+                select(model.id, created_at.label('created_at')).where(
+                    model.group_id.in_(_admin_group_ids(current_user_id)),
+                    pending,
+                    _unclaimed(model, current_user_id, now)
+                ).order_by(created_at.asc(), model.id.asc())
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).all()
+            candidates.extend((row.created_at, item_type, row.id) for row in rows)
+
+        # Oldest first across both types
+        candidates.sort(key=lambda c: (c[0] or now, c[2]))
+        claimed = {}
+        for _, item_type, item_id in candidates[:limit]:
+            claimed.setdefault(item_type, []).append(item_id)
+
+        for item_type, item_ids in claimed.items():
+            model = models[item_type][0]
+            db.session.execute(
+                update(model)
+                .where(model.id.in_(item_ids))
+                .values(claimed_by_id=current_user_id, claimed_until=claimed_until)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Failed to claim queue items", "details": str(e)}), 500
+
+    rows = []
+    if claimed:
+        rows = db.session.execute(
+            _queue_select(current_user_id, tuple(claimed), now, ids=claimed)
+        ).all()
+
+    return jsonify({
+        "items": [_serialize_queue_item(row, now) for row in rows],
+        "count": len(rows),
+        "claimed_until": claimed_until.isoformat()
+    }), 200
+
+@admin_bp.route('/queue/release', methods=['POST'])
+@jwt_required()
+def release_queue_items():
+    """Release the current admin's claims on the given items"""
+    try:
+        data = queue_release_schema.load(request.get_json(silent=True) or {})
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+
+    current_user_id = int(get_jwt_identity())
+    released = 0
+    try:
+        for item_type, model in (('withdrawal', WithdrawalRequest), ('loan', Loan)):
+            item_ids = [item['id'] for item in data['items'] if item['type'] == item_type]
+            if not item_ids:
+                continue
+            result = db.session.execute(
+                update(model)
+                .where(and_(model.id.in_(item_ids), model.claimed_by_id == current_user_id))
+                .values(claimed_by_id=None, claimed_until=None)
+                .execution_options(synchronize_session=False)
+            )
+            released += result.rowcount
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Failed to release queue items", "details": str(e)}), 500
+
+    return jsonify({"message": "Claims released", "released": released}), 200
+
+@admin_bp.route('/groups/<int:group_id>/dividends', methods=['GET'])
+@jwt_required()
+def get_dividend_distributions(group_id):
+    """List a group's past dividend distributions (admin only)"""
+    current_user_id = int(get_jwt_identity())
+    if Group.get_member_status(group_id, current_user_id) != 'admin':
+        return jsonify({"error": "Only group admins can view dividend distributions"}), 403
+
+    distributions = DividendDistribution.query.filter_by(group_id=group_id)\
+        .order_by(DividendDistribution.period_start.desc()).all()
+    return jsonify({"distributions": [d.to_dict() for d in distributions]}), 200
+
+@admin_bp.route('/groups/<int:group_id>/dividends', methods=['POST'])
+@jwt_required()
+def distribute_dividends(group_id):
+    """
+    Share a period's loan interest income out to the group's members (admin only).
+    Shares are pro rata to time-weighted savings; dry_run previews them without paying out.
+    """
+    try:
+        data = dividend_distribution_schema.load(request.get_json(silent=True) or {})
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+
+    current_user_id = int(get_jwt_identity())
+    group = Group.query.get_or_404(group_id)
+    if Group.get_member_status(group_id, current_user_id) != 'admin':
+        return jsonify({"error": "Only group admins can distribute dividends"}), 403
+
+    try:
+        distribution, allocations, weights = DividendService.distribute(
+            group_id, data['period_start'], data['period_end'], current_user_id, dry_run=data['dry_run']
+        )
+
+        notification_ids = []
+        if not data['dry_run']:
+            notification_ids = NotificationService.bulk_create_notifications([
+                {
+                    'type': NotificationType.DIVIDEND_PAID,
+                    'recipient_id': user_id,
+                    'sender_id': current_user_id,
+                    'group_id': group_id,
+                    'message': f"You received a dividend of ${amount:.2f} from {group.name}",
+                    'reference_id': distribution.id,
+                    'reference_amount': amount
+                }
+                for user_id, amount in allocations.items()
+            ])
+            db.session.commit()
+        else:
+            db.session.rollback()
+    except DividendPeriodError as err:
+        db.session.rollback()
+        return jsonify({
+            "error": str(err),
+            "distribution": err.distribution.to_dict()
+        }), 409
+    except ValueError as err:
+        db.session.rollback()
+        return jsonify({"error": str(err)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Dividend distribution failed: {str(e)}")
+        return jsonify({"error": "Failed to distribute dividends", "details": str(e)}), 500
+
+    NotificationService.queue_notification_emails(notification_ids)
+
+    return jsonify({
+        "message": "Dividend preview" if data['dry_run'] else "Dividends distributed",
+        "dry_run": data['dry_run'],
+        "distribution": distribution.to_dict(),
+        "allocations": [
+            {"user_id": user_id, "amount": amount, "weight": weights[user_id]}
+            for user_id, amount in sorted(allocations.items(), key=lambda item: -item[1])
+        ]
+    }), 200 if data['dry_run'] else 201
+
+@admin_bp.route('/groups/<int:group_id>/contributions/import', methods=['POST'])
+@jwt_required()
+def import_contributions(group_id):
+    """
+    Load historical contributions from a CSV of username, amount, date and optional
+    description and reference (admin only). Sent as a multipart "file" or as the raw
+    request body; ?dry_run=true only validates. Nothing is loaded if any row is invalid.
+    """
+    current_user_id = int(get_jwt_identity())
+    Group.query.get_or_404(group_id)
+    if Group.get_member_status(group_id, current_user_id) != 'admin':
+        return jsonify({"error": "Only group admins can import contributions"}), 403
+
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+
+    try:
+        result = ContributionImportService.import_csv(
+            group_id, io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''), dry_run=dry_run
+        )
+        if result.error_count:
+            db.session.rollback()
+            return jsonify({"error": "The file has invalid rows; nothing was imported", **result.to_dict()}), 400
+        if dry_run:
+            db.session.rollback()
+            return jsonify({"message": "The file is valid", "dry_run": True, **result.to_dict()}), 200
+        db.session.commit()
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({"error": "The file must be UTF-8 encoded CSV"}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Contribution import failed: {str(e)}")
+        return jsonify({"error": "Failed to import contributions", "details": str(e)}), 500
+
+    return jsonify({"message": "Contributions imported", "dry_run": False, **result.to_dict()}), 201
@@ -3,12 +3,15 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.user import User, UserRole
 from app.models.groups import Group, group_members
-from app.utils.validators import GroupSchema, JoinGroupSchema
+from app.utils.validators import GroupSchema, JoinGroupSchema, BulkMemberAddSchema
 from app.utils.role_decorators import group_admin_required
 from app.services.notification_service import NotificationService
 from marshmallow import ValidationError
 from sqlalchemy import and_
 from app.services.mpesa_service import MpesaService
+from app.services.balance_service import BalanceService
+from app.services.forecast_service import ForecastService
+from app.services.membership_service import MembershipService
 from app.models.transaction import Transaction
 from app.models.notification import Notification  # Import Notification
 from app.models.loan import Loan, LoanStatus, LoanRepayment, RepaymentStatus
@@ -19,6 +22,7 @@ group_bp = Blueprint('groups', __name__)
 
 group_schema = GroupSchema()
 join_schema = JoinGroupSchema()
+bulk_member_add_schema = BulkMemberAddSchema()
 
 @group_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -64,14 +68,21 @@ def get_user_groups():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get user's groups
+        # Get user's groups with their membership in one query
         user = User.query.get_or_404(current_user_id)
+        memberships = db.session.query(Group, group_members.c.is_admin).join(
+            group_members, Group.id == group_members.c.group_id
+        ).filter(
+            group_members.c.user_id == user.id
+        ).all()
+        forecasts = ForecastService.get_forecasts([group for group, _ in memberships])
         groups = []
         
-        for group in user.groups:
+        for group, is_admin in memberships:
             group_dict = group.to_dict()
             # Add member status (admin or regular member)
-            group_dict['member_status'] = Group.get_member_status(group.id, current_user_id)
+            group_dict['member_status'] = 'admin' if is_admin else 'member'
+            group_dict['forecast'] = forecasts.get(group.id)
             groups.append(group_dict)
         
         return jsonify({
@@ -116,6 +127,7 @@ def get_group_by_id(group_id):
     response = group.to_dict()
     response['members'] = members
     response['member_status'] = status
+    response['forecast'] = ForecastService.get_forecasts([group]).get(group.id)
     
     return jsonify(response), 200
 
@@ -282,6 +294,37 @@ def add_member_to_group(group_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@group_bp.route('/<int:group_id>/members/bulk', methods=['POST'])
+@jwt_required()
+@group_admin_required
+def add_members_to_group(group_id):
+    """Add many users to the group by username or email (admin only)"""
+    try:
+        data = bulk_member_add_schema.load(request.get_json() or {})
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+    
+    group = Group.query.get_or_404(group_id)
+    admin = User.query.get_or_404(int(get_jwt_identity()))
+    
+    try:
+        results, notification_ids = MembershipService.add_members(group, data['members'], admin)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Failed to add members", "details": str(e)}), 500
+    
+    NotificationService.queue_notification_emails(notification_ids)
+    
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return jsonify({
+        "message": f"{summary.get('added', 0)} members added",
+        "summary": summary,
+        "results": results
+    }), 201 if summary.get('added') else 200
+
 @group_bp.route('/<int:group_id>/admin/<int:user_id>', methods=['POST'])
 @jwt_required()
 @group_admin_required
@@ -350,6 +393,7 @@ def update_group(group_id):
             group.target_amount = float(data['target_amount'])
         except (ValueError, TypeError):
             return jsonify({'error': 'Invalid target amount'}), 400
+        ForecastService.invalidate(group.id)
     
     # Save changes
     try:
@@ -511,15 +555,28 @@ def mpesa_callback():
         result_code = data['Body']['stkCallback']['ResultCode']
         checkout_request_id = data['Body']['stkCallback']['CheckoutRequestID']
         
+        # Lock the transaction so duplicate callbacks for it are handled one at a time
         transaction = Transaction.query.filter_by(
             mpesa_request_id=checkout_request_id
-        ).first()
+        ).with_for_update().first()
         
         if not transaction:
             current_app.logger.error(f"Transaction not found for request ID: {checkout_request_id}")
             return jsonify({"status": "error", "message": "Transaction not found"}), 404
         
+        if transaction.status in ('completed', 'failed'):
+            # M-Pesa retries callbacks; the first one already settled this transaction
+            db.session.commit()
+            current_app.logger.info(f"Duplicate callback for transaction {transaction.id} ignored")
+            return jsonify({"status": "received"}), 200
+        
         if result_code == 0:
+            # Lock the group before the member balance, the order every savings write uses
+            BalanceService.lock_group(transaction.group_id)
+            
+            # Credit the member's materialized balance while the transaction is still pending
+            BalanceService.record_contribution(transaction.user_id, transaction.group_id, transaction.amount)
+            
             # Success
             transaction.status = 'completed'
             transaction.mpesa_confirmation_code = data['Body']['stkCallback']['CallbackMetadata']['Item'][1]['Value']
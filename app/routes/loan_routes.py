@@ -3,14 +3,29 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.loan import Loan, LoanStatus, LoanRepayment, RepaymentStatus, GroupLoanSettings
 from app.models.user import User
-from app.models.groups import Group
+from app.models.groups import Group, group_members
+from app.models.member_balance import MemberBalance
 from app.services.notification_service import NotificationService
+from app.services.loan_service import LoanService
+from app.services.loan_pricing import LoanPricingEngine, INTEREST_METHODS
+from app.services.balance_service import BalanceService
+from app.services.portfolio_service import PortfolioService
+from app.services.policy_simulator import PolicySimulator, GroupNotFoundError, DEFAULT_SCENARIOS
 from app.utils.role_decorators import group_admin_required
+from app.utils.query_inspector import query_budget
+from app.utils.fieldsets import InvalidFields, requested_fields, rows_to_dicts, only
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+import math
+from sqlalchemy import func, and_, select
+from sqlalchemy.orm import selectinload
 from app.models.transaction import Transaction, TransactionType
+from app.models.notification import NotificationType
+from app.utils.validators import LoanBulkActionSchema, LoanPolicySimulationSchema
+from marshmallow import ValidationError
 
 loan_bp = Blueprint('loans', __name__)
+loan_bulk_action_schema = LoanBulkActionSchema()
+loan_policy_simulation_schema = LoanPolicySimulationSchema()
 
 @loan_bp.route('/settings', methods=['GET', 'PUT'])
 @jwt_required()
@@ -66,6 +81,11 @@ def manage_loan_settings():
             settings.max_repayment_period = int(data['max_repayment_period'])
         if 'late_penalty_rate' in data:
             settings.late_penalty_rate = float(data['late_penalty_rate'])
+        if 'interest_method' in data:
+            if data['interest_method'] not in INTEREST_METHODS:
+                db.session.rollback()
+                return jsonify({"error": f"Invalid interest method. Valid values are: {', '.join(INTEREST_METHODS)}"}), 400
+            settings.interest_method = data['interest_method']
         
         db.session.commit()
         
@@ -74,6 +94,69 @@ def manage_loan_settings():
             "settings": settings.to_dict()
         }), 200
 
+@loan_bp.route('/settings/simulate', methods=['POST'])
+@jwt_required()
+def simulate_loan_settings():
+    """
+    Simulate candidate loan settings over the group's own history (admin only).
+    Reports expected interest income, default losses and liquidity shortfall per
+    candidate; without candidates, a small grid around the current settings is used.
+    """
+    try:
+        data = loan_policy_simulation_schema.load(request.get_json(silent=True) or {})
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+
+    current_user_id = int(get_jwt_identity())
+    group_id = data['group_id']
+    # Check if user is admin of this group
+    if Group.get_member_status(group_id, current_user_id) != 'admin':
+        return jsonify({"error": "Only group admins can simulate loan settings"}), 403
+
+    try:
+        history = PolicySimulator.load_history(group_id)
+        # Memory grows with scenarios x members, so large groups get fewer scenarios inline
+        max_scenarios = PolicySimulator.max_inline_scenarios(history, data['horizon_weeks'])
+        if data['scenarios'] is None:
+            data['scenarios'] = min(DEFAULT_SCENARIOS, max_scenarios)
+        elif data['scenarios'] > max_scenarios:
+            return jsonify({
+                "error": f"At most {max_scenarios} scenarios can be simulated for a group of this size "
+                         f"over {data['horizon_weeks']} weeks; use the simulate-loan-policy command for more",
+                "max_scenarios": max_scenarios
+            }), 400
+        candidates = data.get('candidates') or PolicySimulator.default_candidates(history)
+        started = datetime.utcnow()
+        results = PolicySimulator.simulate(
+            history, candidates, data['scenarios'], data['horizon_weeks'], data.get('seed')
+        )
+        elapsed = (datetime.utcnow() - started).total_seconds()
+    except GroupNotFoundError as err:
+        return jsonify({"error": str(err)}), 404
+    except ValueError as err:
+        # Candidate settings the pricing engine or the simulation cannot work with
+        return jsonify({"error": str(err)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Loan settings simulation failed: {str(e)}")
+        return jsonify({"error": "Failed to simulate loan settings", "details": str(e)}), 500
+
+    return jsonify({
+        "group_id": group_id,
+        "scenarios": data['scenarios'],
+        "horizon_weeks": data['horizon_weeks'],
+        "current_settings": history['current_settings'],
+        "assumptions": {
+            "liquidity": history['liquidity'],
+            "members": int(history['savings'].size),
+            "borrow_probability": history['borrow_probability'],
+            "default_probability": history['default_probability'],
+            "interest_method": history['interest_method']
+        },
+        "results": results,
+        "elapsed_seconds": elapsed
+    }), 200
+
 @loan_bp.route('/eligibility', methods=['GET'], endpoint='check_loan_eligibility_v1')
 @jwt_required()
 def check_loan_eligibility():
@@ -130,6 +213,97 @@ def check_loan_eligibility():
         current_app.logger.error(f"Eligibility check failed: {str(e)}")
         return jsonify({"error": "Failed to calculate eligibility"}), 500
 
+def _setting(settings, name):
+    """A loan setting, or its model default where the nullable column is NULL"""
+    value = getattr(settings, name)
+    return GroupLoanSettings.__table__.c[name].default.arg if value is None else value
+
+@loan_bp.route('/quote', methods=['GET'])
+@jwt_required()
+def quote_loan():
+    """
+    Quote a prospective loan for every repayment period the group permits.
+    Returns the member's eligible ceiling and one full schedule per duration from
+    min_repayment_period to max_repayment_period, all priced in a single pass.
+    The amount defaults to the eligible ceiling.
+    """
+    current_user_id = int(get_jwt_identity())
+
+    try:
+        group_id = int(request.args['group_id'])
+        amount = float(request.args['amount']) if 'amount' in request.args else None
+    except KeyError:
+        return jsonify({"error": "group_id is required"}), 400
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid data types"}), 400
+    # Check if the amount is a usable number (float() also accepts nan and inf)
+    if amount is not None and not (math.isfinite(amount) and amount > 0):
+        return jsonify({"error": "amount must be a positive number"}), 400
+
+    # Membership, settings and the materialized balance in one round trip
+    row = db.session.execute(
+        select(group_members.c.user_id, GroupLoanSettings, MemberBalance)
+        .outerjoin(GroupLoanSettings, GroupLoanSettings.group_id == group_members.c.group_id)
+        .outerjoin(MemberBalance, and_(
+            MemberBalance.user_id == group_members.c.user_id,
+            MemberBalance.group_id == group_members.c.group_id
+        ))
+        .where(group_members.c.group_id == group_id, group_members.c.user_id == current_user_id)
+    ).first()
+    if row is None:
+        return jsonify({"error": "Not a group member"}), 403
+
+    settings, balance = row.GroupLoanSettings, row.MemberBalance
+    if not settings:
+        settings = GroupLoanSettings(group_id=group_id)
+        db.session.add(settings)
+        db.session.commit()
+    if not balance:
+        balance = BalanceService.get_balance(current_user_id, group_id)
+        db.session.commit()
+
+    method = request.args.get('method', settings.interest_method)
+    if method not in INTEREST_METHODS:
+        return jsonify({"error": f"Invalid interest method. Valid values are: {', '.join(INTEREST_METHODS)}"}), 400
+
+    multiplier = _setting(settings, 'max_loan_multiplier')
+    interest_rate = _setting(settings, 'base_interest_rate')
+    min_period = _setting(settings, 'min_repayment_period')
+    max_period = _setting(settings, 'max_repayment_period')
+
+    net_savings = balance.net_savings
+    eligible_amount = max(net_savings * multiplier, 0.0)
+    if amount is None:
+        amount = eligible_amount
+
+    durations = list(range(max(min_period, 1), max_period + 1))
+    options = []
+    if amount > 0 and durations:
+        priced = LoanPricingEngine.price(amount, interest_rate, durations, method)
+        for index, duration_weeks in enumerate(durations):
+            schedule = LoanPricingEngine.schedule(priced, index)
+            options.append({
+                "duration_weeks": duration_weeks,
+                "first_installment": schedule[0]["amount"],
+                "total_interest": float(priced["total_interest"][index]),
+                "total_repayment": float(priced["total_repayment"][index]),
+                "schedule": schedule
+            })
+
+    return jsonify({
+        "group_id": group_id,
+        "amount": amount,
+        "eligible_amount": eligible_amount,
+        "within_limit": amount <= eligible_amount,
+        "net_savings": net_savings,
+        "multiplier": multiplier,
+        "interest_rate": interest_rate,
+        "interest_method": method,
+        "min_repayment_period": min_period,
+        "max_repayment_period": max_period,
+        "options": options
+    }), 200
+
 @loan_bp.route('/request', methods=['POST'])
 @jwt_required()
 def request_loan():
@@ -171,6 +345,7 @@ def request_loan():
         purpose=purpose,
         status=LoanStatus.PENDING,
         interest_rate=settings.base_interest_rate,
+        interest_method=settings.interest_method,
         duration_weeks=duration_weeks,
         user_id=current_user_id,
         group_id=group_id
@@ -201,27 +376,14 @@ def approve_loan(loan_id):
     # Check if user is admin of the loan's group
     if not Group.get_member_status(loan.group_id, current_user_id) == 'admin':
         return jsonify({"error": "Only group admins can approve loans"}), 403
-    if loan.status != LoanStatus.PENDING.value:
+    if loan.status != LoanStatus.PENDING:
     # Check if loan is already processed
         return jsonify({"error": "Loan has already been processed"}), 400
-    repayment_amount = (loan.amount * (1 + (loan.interest_rate / 100))) / loan.duration_weeks
-    # Calculate repayment schedule
-    today = datetime.utcnow()
-        # Update loan status
     try:
-        loan.status = LoanStatus.APPROVED
-        loan.approved_by_id = current_user_id
-        loan.approved_at = today
-        loan.due_date = today + timedelta(weeks=loan.duration_weeks)
-        for week in range(1, loan.duration_weeks + 1):
-        # Create repayment schedule
-            repayment = LoanRepayment(
-                amount=repayment_amount,
-                due_date=today + timedelta(weeks=week),
-                loan_id=loan.id
-            )
-            db.session.add(repayment)
+        # Update loan status and create the repayment schedule
+        LoanService.approve(loan, current_user_id)
         db.session.commit()
+        PortfolioService.invalidate(loan.group_id)
         # Notify borrower about loan approval
         NotificationService.notify_user_about_loan_approval(
             user_id=loan.user_id,
@@ -253,14 +415,12 @@ def reject_loan(loan_id):
     # Check if user is admin of the loan's group
     if not Group.get_member_status(loan.group_id, current_user_id) == 'admin':
         return jsonify({"error": "Only group admins can reject loans"}), 403
-    if loan.status != LoanStatus.PENDING.value:
+    if loan.status != LoanStatus.PENDING:
     # Check if loan is already processed
         return jsonify({"error": "Loan has already been processed"}), 400
         # Update loan status
     try:
-        loan.status = LoanStatus.REJECTED
-        loan.approved_by_id = current_user_id
-        loan.approved_at = datetime.utcnow()
+        LoanService.reject(loan, current_user_id)
         
         db.session.commit()
         # Notify borrower about loan rejection
@@ -280,12 +440,96 @@ def reject_loan(loan_id):
         print(f"Loan rejection failed: {str(e)}")
         return jsonify({"error": "Failed to reject loan", "details": str(e)}), 500
 
+@loan_bp.route('/bulk-action', methods=['POST'])
+@jwt_required()
+def bulk_loan_action():
+    """Approve or reject many loan requests in one transaction (admin only)"""
+    try:
+        data = loan_bulk_action_schema.load(request.json)
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+
+    current_user_id = int(get_jwt_identity())
+    loan_ids = [action['loan_id'] for action in data['actions']]
+
+    # Lock all referenced loans and resolve the caller's admin rights in one query each
+    loans = {loan.id: loan for loan in Loan.query.filter(Loan.id.in_(loan_ids)).with_for_update().all()}
+    admin_group_ids = Group.get_admin_group_ids(current_user_id, {loan.group_id for loan in loans.values()})
+
+    now = datetime.utcnow()
+    results = []
+    notifications = []
+    approved_loans = []
+    try:
+        for action in data['actions']:
+            loan = loans.get(action['loan_id'])
+            result = {"loan_id": action['loan_id'], "action": action['action'], "success": False}
+
+            if not loan:
+                result['error'] = "Loan not found"
+            elif loan.group_id not in admin_group_ids:
+                result['error'] = "Only group admins can approve or reject loans"
+            elif loan.status != LoanStatus.PENDING or loan in approved_loans:
+                # Also catches a loan listed twice in the same batch
+                result['error'] = "Loan has already been processed"
+            elif action['action'] == 'approve':
+                # Scheduled together below, in one pricing pass
+                approved_loans.append(loan)
+                result['success'] = True
+                result['status'] = LoanStatus.APPROVED.value
+                notifications.append({
+                    'type': NotificationType.LOAN_APPROVED,
+                    'recipient_id': loan.user_id,
+                    'sender_id': current_user_id,
+                    'group_id': loan.group_id,
+                    'message': f"Your loan request for ${loan.amount} has been approved",
+                    'reference_id': loan.id,
+                    'reference_amount': loan.amount
+                })
+            else:
+                reason = action.get('reason', 'No reason provided')
+                LoanService.reject(loan, current_user_id, now)
+                result['success'] = True
+                notifications.append({
+                    'type': NotificationType.LOAN_REJECTED,
+                    'recipient_id': loan.user_id,
+                    'sender_id': current_user_id,
+                    'group_id': loan.group_id,
+                    'message': f"Your loan request for ${loan.amount} was rejected. Reason: {reason}",
+                    'reference_id': loan.id,
+                    'reference_amount': loan.amount
+                })
+
+            if result['success'] and 'status' not in result:
+                result['status'] = loan.status.value
+            results.append(result)
+
+        LoanService.approve_many(approved_loans, current_user_id, now)
+        notification_ids = NotificationService.bulk_create_notifications(notifications)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Bulk loan action failed: {str(e)}")
+        return jsonify({"error": "Failed to process loan actions", "details": str(e)}), 500
+
+    PortfolioService.invalidate(*{loan.group_id for loan in approved_loans})
+
+    # Emails go out in the background once everything is committed
+    NotificationService.queue_notification_emails(notification_ids)
+
+    processed = sum(1 for result in results if result['success'])
+    return jsonify({
+        "results": results,
+        "processed": processed,
+        "failed": len(results) - processed
+    }), 200
+
 @jwt_required()
 @loan_bp.route('/<int:loan_id>/repay', methods=['POST'])
 @jwt_required()
 def repay_loan(loan_id):
     """Make a loan repayment"""
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     # Get the repayment amount from the request data
     data = request.get_json(force=True)
     amount = float(data.get('amount', 0))
@@ -296,29 +540,32 @@ def repay_loan(loan_id):
     if loan.user_id != current_user_id:
     # Check if loan belongs to the user
         return jsonify({"error": "You can only repay your own loans"}), 403
-    if loan.status != LoanStatus.ACTIVE.value:
+    if loan.status not in (LoanStatus.APPROVED, LoanStatus.ACTIVE):
     # Check if loan is active
         return jsonify({"error": "Loan is not active"}), 400
     repayment = LoanRepayment.query.filter(
     # Find the next due repayment
         LoanRepayment.loan_id == loan_id,
-        LoanRepayment.status != RepaymentStatus.PAID.value
+        LoanRepayment.status != RepaymentStatus.PAID
     ).order_by(LoanRepayment.due_date.asc()).first()
     if not repayment:
         return jsonify({"error": "No pending repayments found for this loan"}), 400
         # Process repayment
     try:
-        repayment.amount_paid = amount
+        repayment.amount_paid = (repayment.amount_paid or 0.0) + amount
         repayment.paid_at = datetime.utcnow()
-        if amount >= repayment.amount:
-            repayment.status = RepaymentStatus.PAID.value
+        # The installment stays open until its late penalties are paid as well
+        if repayment.amount_paid >= repayment.amount_due():
+            repayment.status = RepaymentStatus.PAID
+            repayment.is_overdue = False
+        else:
+            repayment.status = RepaymentStatus.PARTIAL
+        if round(loan.outstanding_balance(), 2) <= 0:
+        # Check if loan is fully paid (to the cent, so float residue cannot keep it open)
+            loan.status = LoanStatus.PAID
         else:
-            repayment.status = RepaymentStatus.PARTIAL.value
-        if loan.outstanding_balance() <= 0:
-        # Check if loan is fully paid
-            loan.status = LoanStatus.PAID.value
+            loan.status = LoanStatus.ACTIVE
         
-        db.session.commit()
         # Create a transaction record for the repayment
         transaction = Transaction(
             amount=amount,
@@ -326,10 +573,12 @@ def repay_loan(loan_id):
             group_id=loan.group_id,
             transaction_type=TransactionType.LOAN_REPAYMENT,
             description=f"Loan repayment for loan #{loan.id}",
-            loan_id=loan.id
+            reference_id=loan.id,
+            status='completed'
         )
         db.session.add(transaction)
         db.session.commit()
+        PortfolioService.invalidate(loan.group_id)
         # Notify group admins about the repayment
         NotificationService.notify_admins_about_loan_repayment(
             group_id=loan.group_id,
@@ -354,27 +603,40 @@ def get_user_loans():
     """Get all loans for the current user"""
     current_user_id = get_jwt_identity()
     status = request.args.get('status')
-    query = Loan.query.filter_by(user_id=current_user_id)
+    criteria = [Loan.user_id == int(current_user_id)]
     try:
         if status:
         # Convert the status string to the actual LoanStatus enum value
             status_enum = LoanStatus(status.lower())  # Convert to lowercase and match enum
-            query = query.filter_by(status=status_enum)
+            criteria.append(Loan.status == status_enum)
     except ValueError:
         # Return error if status is invalid
         valid_statuses = [e.value for e in LoanStatus]
         return jsonify({
             "error": f"Invalid loan status. Valid values are: {', '.join(valid_statuses)}"
         }), 400
-    loans = query.order_by(Loan.created_at.desc()).all()
+    try:
+        fields = requested_fields(Loan.LIST_FIELDS)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    loans = _list_loans(fields, criteria, Loan.created_at.desc())
     return jsonify({
-        "loans": [loan.to_dict() for loan in loans],
+        "loans": loans,
         "count": len(loans)
     }), 200
 
+def _list_loans(fields, criteria, *order_by):
+    """Loan dicts with just the given fields; repayments are only loaded when a computed field needs them"""
+    if any(field in Loan.COMPUTED_FIELDS for field in fields):
+        loans = Loan.query.filter(*criteria).options(selectinload(Loan.repayments)).order_by(*order_by).all()
+        return [only(loan.to_dict(), fields) for loan in loans]
+    rows = db.session.execute(Loan.list_select(fields).where(*criteria).order_by(*order_by)).all()
+    return rows_to_dicts(fields, rows)
+
 @jwt_required()
 @loan_bp.route('/group/<int:group_id>', methods=['GET'])
 @jwt_required()
+@query_budget(6)
 def get_group_loans(group_id):
     """Get loans for a specific group"""
     status = request.args.get('status', '').lower()
@@ -383,19 +645,42 @@ def get_group_loans(group_id):
     # Check if user is a member of the group
     if not Group.get_member_status(group_id, current_user_id):
         return jsonify({"error": "You are not a member of this group"}), 403
-    query = Loan.query.filter_by(group_id=group_id)
+    criteria = [Loan.group_id == group_id]
     # Filter loans by status if provided
     if status:
         try:
             status_enum = LoanStatus(status)  # Convert to LoanStatus enum
-            query = query.filter_by(status=status_enum)
+            criteria.append(Loan.status == status_enum)
         except ValueError:
             # Return error if status is invalid
             valid_statuses = [e.value for e in LoanStatus]
             return jsonify({"error": f"Invalid loan status. Valid values are: {', '.join(valid_statuses)}"}), 400
+    try:
+        fields = requested_fields(Loan.LIST_FIELDS)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"loans": _list_loans(fields, criteria)}), 200
+
+@loan_bp.route('/group/<int:group_id>/portfolio', methods=['GET'])
+@jwt_required()
+def get_group_portfolio(group_id):
+    """Get a group's loan exposure: outstanding principal, portfolio at risk, defaults and concentration (admin only)"""
+    current_user_id = int(get_jwt_identity())
+    # Check if user is admin of this group
+    if Group.get_member_status(group_id, current_user_id) != 'admin':
+        return jsonify({"error": "Only group admins can view the loan portfolio"}), 403
+
+    if request.args.get('refresh', 'false').lower() == 'true':
+        PortfolioService.invalidate(group_id)
+    try:
+        portfolio, cached = PortfolioService.get_portfolio(group_id)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Portfolio analytics failed: {str(e)}")
+        return jsonify({"error": "Failed to compute loan portfolio", "details": str(e)}), 500
 
-    loans = query.all()
-    return jsonify({"loans": [loan.to_dict() for loan in loans]}), 200
+    return jsonify({**portfolio, "cached": cached}), 200
 
 @jwt_required()
 @loan_bp.route('/<int:loan_id>', methods=['GET'])
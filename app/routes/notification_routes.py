@@ -1,6 +1,8 @@
 # app/routes/notification_routes.py
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 from app.services.notification_service import NotificationService
+from app.services.notification_stream import NotificationStream, parse_cursor
+from app.utils.profiler import not_sampled
 from app.models.notification import Notification, NotificationType
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -10,10 +12,42 @@ notification_bp = Blueprint('notifications', __name__)
 @notification_bp.route('', methods=['GET'])
 @jwt_required()
 def get_notifications():
-    """Get notifications for the current user"""
-    current_user_id = get_jwt_identity()
-    notifications = Notification.query.filter_by(recipient_id=current_user_id).order_by(Notification.created_at.desc()).all()
-    return jsonify([n.to_dict() for n in notifications])
+    """Get notifications for the current user, optionally only those after ?after_id"""
+    current_user_id = int(get_jwt_identity())
+    query = Notification.list_select().where(Notification.recipient_id == current_user_id)
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        query = query.where(Notification.id > after_id)
+    # Plain rows; the JSON provider formats created_at
+    notifications = db.session.execute(query.order_by(Notification.created_at.desc()))
+    return jsonify([Notification.row_to_dict(row) for row in notifications])
+
+@notification_bp.route('/stream', methods=['GET'])
+@not_sampled
+@jwt_required(locations=['headers', 'query_string'])
+def stream_notifications():
+    """
+    Push the current user's new notifications as server-sent events. EventSource cannot
+    set headers, so the token may also be passed as ?jwt=; a reconnecting browser sends
+    Last-Event-ID and gets whatever it missed first.
+    """
+    current_user_id = int(get_jwt_identity())
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    if last_event_id is not None:
+        try:
+            parse_cursor(last_event_id)
+        except ValueError:
+            return jsonify({"error": "Invalid Last-Event-ID"}), 400
+
+    return Response(
+        stream_with_context(NotificationStream.events(current_user_id, last_event_id)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Keep reverse proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
 
 @notification_bp.route('/mark-read/<int:notification_id>', methods=['POST'])
 @jwt_required()
@@ -5,6 +5,7 @@ from app.models.transaction import Transaction
 from app.models.groups import Group
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
+from app.utils.metrics import track_outbound
 import json
 import traceback  # Add this import for detailed error tracing
 
@@ -67,7 +68,9 @@ def initiate_stk_push():
         print(f"Using method: POST")
         
         # Make request to TinyPesa - ensure we're using POST
-        response = requests.post(url, json=payload, headers=headers)
+        with track_outbound('tinypesa', 'stk_push') as call:
+            response = requests.post(url, json=payload, headers=headers)
+            call.ok = response.ok
         print(f"TinyPesa response status: {response.status_code}")
         print(f"TinyPesa response body: {response.text}")
         
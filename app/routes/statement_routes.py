@@ -0,0 +1,87 @@
+# app/routes/statement_routes.py
+from flask import Blueprint, Response, jsonify, request, current_app, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.models.groups import Group
+from app.models.statement import MemberStatement, StatementStatus
+from app.services.statement_service import StatementService
+from app.utils.validators import StatementRequestSchema
+from itsdangerous import BadSignature, SignatureExpired
+from marshmallow import ValidationError
+
+statement_bp = Blueprint('statements', __name__)
+statement_request_schema = StatementRequestSchema()
+
+def _statement_response(statement, current):
+    """Statement status, with a download link once a current rendering is ready"""
+    response = statement.to_dict()
+    response['status_url'] = url_for('statements.get_statement', statement_id=statement.id, _external=True)
+    if statement.status == StatementStatus.READY.value and current:
+        token = StatementService.download_token(statement)
+        response['download_url'] = url_for('statements.download_statement', token=token, _external=True)
+        return jsonify(response), 200
+    return jsonify(response), 202 if statement.status == StatementStatus.PENDING.value else 200
+
+@statement_bp.route('', methods=['POST'])
+@jwt_required()
+def request_statement():
+    """Request the current user's statement for a group and period; generated in the background"""
+    current_user_id = int(get_jwt_identity())
+    try:
+        data = statement_request_schema.load(request.get_json() or {})
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+
+    # Check if user is a member of the group
+    if not Group.get_member_status(data['group_id'], current_user_id):
+        return jsonify({"error": "You are not a member of this group"}), 403
+
+    try:
+        statement, queued = StatementService.request_statement(
+            current_user_id, data['group_id'], data['period_start'], data['period_end'], data['format']
+        )
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Statement request failed: {str(e)}")
+        return jsonify({"error": "Failed to request statement", "details": str(e)}), 500
+
+    # Not queued means the stored one already matches the member's activity, or is on its way
+    return _statement_response(statement, current=not queued)
+
+@statement_bp.route('/<int:statement_id>', methods=['GET'])
+@jwt_required()
+def get_statement(statement_id):
+    """Check on a requested statement"""
+    current_user_id = int(get_jwt_identity())
+    statement = MemberStatement.query.get_or_404(statement_id)
+    if statement.user_id != current_user_id:
+        return jsonify({"error": "You can only view your own statements"}), 403
+
+    return _statement_response(statement, current=StatementService.is_current(statement))
+
+@statement_bp.route('/download/<token>', methods=['GET'])
+def download_statement(token):
+    """Download a rendered statement through a signed, expiring link"""
+    try:
+        payload = StatementService.load_download_token(token)
+    except SignatureExpired:
+        return jsonify({"error": "This download link has expired"}), 410
+    except BadSignature:
+        return jsonify({"error": "Invalid download link"}), 404
+
+    statement = db.session.get(MemberStatement, payload['id'])
+    # The link is for one rendering; a regenerated statement needs a new one
+    if (statement is None or statement.status != StatementStatus.READY.value
+            or statement.activity_marker != payload['marker']):
+        return jsonify({"error": "This statement has been updated; request a new link"}), 410
+
+    extension = 'html' if statement.format == 'html' else 'csv'
+    filename = f"statement-{statement.group_id}-{statement.period_start}-{statement.period_end}.{extension}"
+    return Response(
+        statement.content,
+        mimetype='text/html' if statement.format == 'html' else 'text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'private, max-age=3600'
+        }
+    )
@@ -1,17 +1,25 @@
 # app/routes/transaction_routes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.user import User
-from app.models.groups import Group
+from app.models.groups import Group, group_members
 from app.models.transaction import Transaction, TransactionType
-from app.utils.validators import TransactionSchema
+from app.utils.validators import TransactionSchema, TransactionExportSchema, BatchContributionSchema
 from app.services.notification_service import NotificationService
+from app.services.balance_service import BalanceService
+from app.services.export_service import LedgerExportService
+from app.services.transaction_service import TransactionService
+from app.utils.query_inspector import query_budget
+from app.utils.pagination import paginate_rows
 from marshmallow import ValidationError
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
+from sqlalchemy.orm import joinedload
 
 transaction_bp = Blueprint('transactions', __name__)
 transaction_schema = TransactionSchema()
+transaction_export_schema = TransactionExportSchema()
+batch_contribution_schema = BatchContributionSchema()
 
 @transaction_bp.route('/contribute', methods=['POST'])
 @jwt_required()
@@ -43,12 +51,18 @@ def contribute():
     )
     
     try:
+        # Lock the group before the member balance, the order every savings write uses
+        group = BalanceService.lock_group(group_id)
+        
         # Add transaction to database
         db.session.add(new_transaction)
         
         # Update group's current amount
         group.current_amount = (group.current_amount or 0) + data['amount']
         
+        # Credit the member's materialized balance
+        BalanceService.record_contribution(int(current_user_id), group_id, data['amount'])
+        
         db.session.commit()
         
         # Send notifications to other group members
@@ -70,8 +84,63 @@ def contribute():
         db.session.rollback()
         return jsonify({"error": "Failed to process contribution", "details": str(e)}), 500
 
+@transaction_bp.route('/contribute/batch', methods=['POST'])
+@jwt_required()
+def contribute_batch():
+    """Record a meeting's cash contributions for many members at once (admin only)"""
+    try:
+        data = batch_contribution_schema.load(request.json)
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+    
+    current_user_id = int(get_jwt_identity())
+    group_id = data['group_id']
+    
+    # Check if group exists
+    group = Group.query.get_or_404(group_id)
+    
+    # Check if user is admin of this group
+    if Group.get_member_status(group_id, current_user_id) != 'admin':
+        return jsonify({"error": "Only group admins can record cash contributions"}), 403
+    
+    # Check every contributor's membership in one query
+    user_ids = {entry['user_id'] for entry in data['contributions']}
+    members = set(db.session.execute(
+        select(group_members.c.user_id).where(
+            group_members.c.group_id == group_id,
+            group_members.c.user_id.in_(user_ids)
+        )
+    ).scalars())
+    if members != user_ids:
+        return jsonify({
+            "error": "Some contributors are not members of this group",
+            "user_ids": sorted(user_ids - members)
+        }), 400
+    
+    try:
+        transaction_ids, notification_ids = TransactionService.record_cash_contributions(
+            group, current_user_id, data['contributions'], data.get('description')
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Failed to record contributions", "details": str(e)}), 500
+    
+    NotificationService.queue_notification_emails(notification_ids)
+    
+    db.session.refresh(group)
+    return jsonify({
+        "message": f"{len(transaction_ids)} contributions recorded",
+        "transaction_ids": transaction_ids,
+        "total_amount": sum(entry['amount'] for entry in data['contributions']),
+        "current_savings": group.current_amount,
+        "target_amount": group.target_amount,
+        "progress_percentage": (group.current_amount / group.target_amount) * 100 if group.target_amount > 0 else 0
+    }), 201
+
 @transaction_bp.route('/group/<int:group_id>/transactions', methods=['GET'])
 @jwt_required()
+@query_budget(6)
 def get_group_transactions(group_id):
     """Get all transactions for a specific group"""
     current_user_id = get_jwt_identity()
@@ -87,17 +156,58 @@ def get_group_transactions(group_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
-    transactions = Transaction.query.filter_by(group_id=group_id)\
-        .order_by(Transaction.timestamp.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    # Plain rows, serialized without loading Transaction and User objects
+    transactions = paginate_rows(
+        Transaction.list_select()
+            .where(Transaction.group_id == group_id)
+            .order_by(Transaction.timestamp.desc()),
+        page, per_page
+    )
     
     return jsonify({
-        "transactions": [transaction.to_dict() for transaction in transactions.items],
+        "transactions": [Transaction.row_to_dict(row) for row in transactions.items],
         "total": transactions.total,
         "pages": transactions.pages,
         "current_page": page
     }), 200
 
+@transaction_bp.route('/group/<int:group_id>/export', methods=['GET'])
+@jwt_required()
+def export_group_transactions(group_id):
+    """Stream a group's full ledger as CSV or JSON lines (admin only)"""
+    current_user_id = int(get_jwt_identity())
+    
+    # Check if group exists
+    group = Group.query.get_or_404(group_id)
+    
+    # Check if user is admin of this group
+    if Group.get_member_status(group_id, current_user_id) != 'admin':
+        return jsonify({"error": "Only group admins can export the ledger"}), 403
+    
+    # Types may be repeated or comma separated
+    args = request.args.to_dict()
+    if 'type' in request.args:
+        args['type'] = [t for value in request.args.getlist('type') for t in value.split(',') if t]
+    try:
+        data = transaction_export_schema.load(args)
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+    
+    rows = LedgerExportService.stream(
+        group.id,
+        export_format=data['format'],
+        start_date=data['start_date'],
+        end_date=data['end_date'],
+        types=[TransactionType[t.upper()] for t in data['type']],
+        after_id=data['after_id']
+    )
+    filename = f"group-{group.id}-ledger.{data['format']}"
+    return Response(
+        stream_with_context(rows),
+        mimetype='text/csv' if data['format'] == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @transaction_bp.route('/user/transactions', methods=['GET'])
 @jwt_required()
 def get_user_transactions():
@@ -108,12 +218,15 @@ def get_user_transactions():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
-    transactions = Transaction.query.filter_by(user_id=current_user_id)\
-        .order_by(Transaction.timestamp.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    transactions = paginate_rows(
+        Transaction.list_select()
+            .where(Transaction.user_id == current_user_id)
+            .order_by(Transaction.timestamp.desc()),
+        page, per_page
+    )
     
     return jsonify({
-        "transactions": [transaction.to_dict() for transaction in transactions.items],
+        "transactions": [Transaction.row_to_dict(row) for row in transactions.items],
         "total": transactions.total,
         "pages": transactions.pages,
         "current_page": page
@@ -121,6 +234,7 @@ def get_user_transactions():
 
 @transaction_bp.route('/group/<int:group_id>/stats', methods=['GET'])
 @jwt_required()
+@query_budget(8)
 def get_group_stats(group_id):
     """Get contribution statistics for a group"""
     current_user_id = get_jwt_identity()
@@ -157,6 +271,7 @@ def get_group_stats(group_id):
     
     # Get recent transactions
     recent_transactions = Transaction.query.filter_by(group_id=group_id)\
+        .options(joinedload(Transaction.user))\
         .order_by(Transaction.timestamp.desc())\
         .limit(5)\
         .all()
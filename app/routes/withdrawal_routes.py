@@ -6,9 +6,15 @@ from app.models.user import User
 from app.models.groups import Group
 from app.models.transaction import Transaction, TransactionType
 from app.models.withdrawal_request import WithdrawalRequest, WithdrawalStatus
-from app.utils.validators import WithdrawalRequestSchema, WithdrawalActionSchema
+from app.models.notification import NotificationType
+from app.utils.validators import WithdrawalRequestSchema, WithdrawalActionSchema, WithdrawalBulkActionSchema
 from app.utils.role_decorators import group_admin_required
+from app.utils.query_inspector import query_budget
+from app.utils.fieldsets import InvalidFields, requested_fields, rows_to_dicts
 from app.services.notification_service import NotificationService
+from app.services.balance_service import (
+    BalanceService, InsufficientBalanceError, InsufficientGroupFundsError, WithdrawalStateError
+)
 from marshmallow import ValidationError
 from sqlalchemy import desc, func
 import logging
@@ -20,6 +26,7 @@ logger = logging.getLogger(__name__)
 withdrawal_bp = Blueprint('withdrawals', __name__)
 withdrawal_request_schema = WithdrawalRequestSchema()
 withdrawal_action_schema = WithdrawalActionSchema()
+withdrawal_bulk_action_schema = WithdrawalBulkActionSchema()
 
 @withdrawal_bp.route('/request', methods=['POST'])
 @jwt_required()
@@ -41,33 +48,6 @@ def request_withdrawal():
     if not Group.get_member_status(group_id, current_user_id):
         return jsonify({"error": "You are not a member of this group"}), 403
     
-    # Calculate user's total contribution to the group
-    user_contributions = Transaction.query.filter_by(
-        user_id=current_user_id,
-        group_id=group_id,
-        transaction_type=TransactionType.CONTRIBUTION
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0
-    
-    # Calculate user's total approved withdrawals from the group
-    user_withdrawals = Transaction.query.filter_by(
-        user_id=current_user_id,
-        group_id=group_id,
-        transaction_type=TransactionType.WITHDRAWAL
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0
-    
-    # Calculate user's maximum allowed withdrawal (what they've contributed minus what they've withdrawn)
-    max_allowed_withdrawal = user_contributions - user_withdrawals
-    
-    # Check if amount exceeds user's available balance
-    if data['amount'] > max_allowed_withdrawal:
-        return jsonify({
-            "error": "Withdrawal amount exceeds your available balance in this group",
-            "requested": data['amount'],
-            "available": max_allowed_withdrawal,
-            "total_contributed": user_contributions,
-            "total_withdrawn": user_withdrawals
-        }), 400
-    
     # Check if amount exceeds current group savings (as an additional safeguard)
     if data['amount'] > group.current_amount:
         return jsonify({
@@ -87,43 +67,65 @@ def request_withdrawal():
     try:
         # Add withdrawal request to database
         db.session.add(new_withdrawal)
-        db.session.commit()
-        
-        # Send notifications to group admins
-        NotificationService.notify_about_withdrawal_request(
-            group_id=group_id,
-            requester_id=current_user_id,
-            amount=data['amount'],
-            reason=data.get('description', ''),
-            withdrawal_id=new_withdrawal.id
-        )
+        db.session.flush()  # Flush to get new_withdrawal.id
         
+        # Reserve the funds so concurrent requests cannot overdraw the balance
+        balance = BalanceService.place_hold(new_withdrawal)
+        db.session.commit()
+    except InsufficientBalanceError as err:
+        db.session.rollback()
         return jsonify({
-            "message": "Withdrawal request submitted successfully",
-            "withdrawal_request": new_withdrawal.to_dict(),
-            "remaining_balance": max_allowed_withdrawal - data['amount']
-        }), 201
+            "error": "Withdrawal amount exceeds your available balance in this group",
+            "requested": data['amount'],
+            "available": err.balance.available,
+            "total_contributed": err.balance.total_contributed,
+            "total_withdrawn": err.balance.total_withdrawn,
+            "held_amount": err.balance.held_amount
+        }), 400
     except Exception as e:
         db.session.rollback()
         logger.error("Error occurred while submitting withdrawal request", exc_info=True)
         return jsonify({"error": "Failed to submit withdrawal request", "details": str(e)}), 500
+    
+    # Send notifications to group admins
+    NotificationService.notify_about_withdrawal_request(
+        group_id=group_id,
+        requester_id=current_user_id,
+        amount=data['amount'],
+        reason=data.get('description', ''),
+        withdrawal_id=new_withdrawal.id
+    )
+    
+    return jsonify({
+        "message": "Withdrawal request submitted successfully",
+        "withdrawal_request": new_withdrawal.to_dict(),
+        "remaining_balance": balance.available
+    }), 201
 
 @withdrawal_bp.route('/pending/<int:group_id>', methods=['GET'])
 @jwt_required()
 @group_admin_required
+@query_budget(6)
 def get_pending_withdrawals(group_id):
     """Get all pending withdrawal requests for a group (admin only)"""
     # Check if group exists
     group = Group.query.get_or_404(group_id)
     
+    try:
+        fields = requested_fields(WithdrawalRequest.LIST_FIELDS)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    
     # Get all pending withdrawal requests
-    pending_withdrawals = WithdrawalRequest.query.filter_by(
-        group_id=group_id, 
-        status=WithdrawalStatus.PENDING.value
-    ).order_by(WithdrawalRequest.timestamp.desc()).all()
+    pending_withdrawals = db.session.execute(
+        WithdrawalRequest.list_select(fields).where(
+            WithdrawalRequest.group_id == group_id,
+            WithdrawalRequest.status == WithdrawalStatus.PENDING.value
+        ).order_by(WithdrawalRequest.timestamp.desc())
+    ).all()
     
     return jsonify({
-        "pending_withdrawals": [withdrawal.to_dict() for withdrawal in pending_withdrawals],
+        "pending_withdrawals": rows_to_dicts(fields, pending_withdrawals),
         "count": len(pending_withdrawals)
     }), 200
 
@@ -155,62 +157,20 @@ def process_withdrawal(withdrawal_id):
             "message": f"The withdrawal request is already marked as {withdrawal.status.lower()}."
         }), 400
     
-    # Get the group
-    group = Group.query.get_or_404(withdrawal.group_id)
-    
     try:
-        # If approving, recheck user's contribution balance
-        if data['status'] == WithdrawalStatus.APPROVED.value:
-            # Calculate user's total contribution to the group
-            user_contributions = Transaction.query.filter_by(
-                user_id=withdrawal.user_id,
-                group_id=withdrawal.group_id,
-                transaction_type=TransactionType.CONTRIBUTION
-            ).with_entities(func.sum(Transaction.amount)).scalar() or 0
-
-            # Calculate user's total approved withdrawals from the group
-            user_withdrawals = Transaction.query.filter_by(
-                user_id=withdrawal.user_id,
-                group_id=withdrawal.group_id,
-                transaction_type=TransactionType.WITHDRAWAL
-            ).with_entities(func.sum(Transaction.amount)).scalar() or 0
-
-            # Calculate user's maximum allowed withdrawal
-            max_allowed_withdrawal = user_contributions - user_withdrawals
-
-            # Check if amount exceeds user's available balance
-            if withdrawal.amount > max_allowed_withdrawal:
-                return jsonify({
-                    "error": "Withdrawal amount exceeds user's available balance in this group",
-                    "requested": withdrawal.amount,
-                    "available": max_allowed_withdrawal,
-                    "total_contributed": user_contributions,
-                    "total_withdrawn": user_withdrawals
-                }), 400
-
-            # Check if amount still exceeds current group savings (as additional safeguard)
-            if withdrawal.amount > group.current_amount:
-                return jsonify({
-                    "error": "Withdrawal amount exceeds current group savings",
-                    "requested": withdrawal.amount,
-                    "available": group.current_amount
-                }), 400
-
-        # Update withdrawal request
-        withdrawal.status = data['status']
-        withdrawal.admin_id = current_user_id
-        withdrawal.admin_comment = data.get('admin_comment')
-
-        # If approved, create transaction and update group balance
+        # Transition the request, settle its hold and move the funds as one locked unit
+        group_updated_balance = None
         if data['status'] == WithdrawalStatus.APPROVED.value:
-            # Create transaction from withdrawal
-            transaction = WithdrawalRequest.create_transaction_from_withdrawal(withdrawal)
-            db.session.add(transaction)
-
-            # Update group's current amount
-            group.current_amount = group.current_amount - withdrawal.amount
+            group_updated_balance = BalanceService.approve_withdrawal(
+                withdrawal.id, int(current_user_id), data.get('admin_comment')
+            )
+        else:
+            BalanceService.reject_withdrawal(
+                withdrawal.id, int(current_user_id), data.get('admin_comment')
+            )
 
         db.session.commit()
+        db.session.refresh(withdrawal)
 
         # Send notification to the requester about the withdrawal approval/rejection
         if data['status'] == WithdrawalStatus.APPROVED.value:
@@ -227,8 +187,32 @@ def process_withdrawal(withdrawal_id):
         return jsonify({
             "message": f"Withdrawal request {data['status']} successfully",
             "withdrawal_request": withdrawal.to_dict(),
-            "group_updated_balance": group.current_amount if data['status'] == WithdrawalStatus.APPROVED.value else None
+            "group_updated_balance": group_updated_balance
         }), 200
+    except WithdrawalStateError:
+        db.session.rollback()
+        db.session.refresh(withdrawal)
+        return jsonify({
+            "error": "This withdrawal request has already been processed.",
+            "current_status": withdrawal.status,
+            "message": f"The withdrawal request is already marked as {withdrawal.status.lower()}."
+        }), 400
+    except InsufficientGroupFundsError as err:
+        db.session.rollback()
+        return jsonify({
+            "error": "Withdrawal amount exceeds current group savings",
+            "requested": err.requested,
+            "available": err.group.current_amount
+        }), 400
+    except InsufficientBalanceError as err:
+        db.session.rollback()
+        return jsonify({
+            "error": "Withdrawal amount exceeds user's available balance in this group",
+            "requested": err.requested,
+            "available": err.balance.available,
+            "total_contributed": err.balance.total_contributed,
+            "total_withdrawn": err.balance.total_withdrawn
+        }), 400
     except ValueError as ve:
         db.session.rollback()
         logger.error(f"ValueError while processing withdrawal: {str(ve)}", exc_info=True)
@@ -243,23 +227,139 @@ def process_withdrawal(withdrawal_id):
         return jsonify({"error": f"Failed to {data['status']} withdrawal request", "details": str(e)}), 500
 
 
+@withdrawal_bp.route('/bulk-action', methods=['POST'])
+@jwt_required()
+def bulk_process_withdrawals():
+    """Approve or reject many withdrawal requests in one transaction (admin only)"""
+    try:
+        # Validate incoming data
+        data = withdrawal_bulk_action_schema.load(request.json)
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+    
+    current_user_id = int(get_jwt_identity())
+    withdrawal_ids = [action['withdrawal_id'] for action in data['actions']]
+    
+    # Load the requests, their groups and the caller's admin rights in one query each
+    withdrawals = {
+        withdrawal.id: withdrawal
+        for withdrawal in WithdrawalRequest.query.filter(WithdrawalRequest.id.in_(withdrawal_ids)).all()
+    }
+    group_ids = {withdrawal.group_id for withdrawal in withdrawals.values()}
+    groups = {group.id: group for group in Group.query.filter(Group.id.in_(group_ids)).all()}
+    admin_group_ids = Group.get_admin_group_ids(current_user_id, group_ids)
+    approver = User.query.get(current_user_id)
+    
+    def lock_order(index):
+        withdrawal = withdrawals.get(data['actions'][index]['withdrawal_id'])
+        if not withdrawal:
+            return (0, 0, 0)
+        return (withdrawal.group_id, withdrawal.user_id, withdrawal.id)
+    
+    results = [None] * len(data['actions'])
+    notifications = []
+    try:
+        # Lock every group involved up front, then take the items by group, member and request.
+        # Single approvals lock their group before the member balance too, so neither they nor
+        # other bulk calls listing the same requests in another order can deadlock with this one.
+        for group_id in sorted(group_ids & admin_group_ids):
+            BalanceService.lock_group(group_id)
+        
+        for index in sorted(range(len(data['actions'])), key=lock_order):
+            action = data['actions'][index]
+            withdrawal = withdrawals.get(action['withdrawal_id'])
+            result = {"withdrawal_id": action['withdrawal_id'], "status": action['status'], "success": False}
+            
+            if not withdrawal:
+                result['error'] = "Withdrawal request not found"
+            elif withdrawal.group_id not in admin_group_ids:
+                result['error'] = "Admin privileges required for this action"
+            else:
+                # A savepoint per item keeps one failure from undoing the rest of the batch
+                try:
+                    with db.session.begin_nested():
+                        if action['status'] == WithdrawalStatus.APPROVED.value:
+                            BalanceService.approve_withdrawal(
+                                withdrawal.id, current_user_id, action.get('admin_comment')
+                            )
+                        else:
+                            BalanceService.reject_withdrawal(
+                                withdrawal.id, current_user_id, action.get('admin_comment')
+                            )
+                except WithdrawalStateError:
+                    result['error'] = "This withdrawal request has already been processed."
+                except InsufficientBalanceError as err:
+                    result['error'] = "Withdrawal amount exceeds user's available balance in this group"
+                    result['available'] = err.balance.available
+                except InsufficientGroupFundsError as err:
+                    result['error'] = "Withdrawal amount exceeds current group savings"
+                    result['available'] = err.group.current_amount
+                else:
+                    result['success'] = True
+                    group_name = groups[withdrawal.group_id].name
+                    if action['status'] == WithdrawalStatus.APPROVED.value:
+                        notifications.append({
+                            'type': NotificationType.WITHDRAWAL_APPROVED,
+                            'message': f"Your request to withdraw Ksh.{withdrawal.amount} from {group_name} was approved by {approver.username}",
+                            'recipient_id': withdrawal.user_id,
+                            'sender_id': current_user_id,
+                            'group_id': withdrawal.group_id,
+                            'reference_id': withdrawal.id,
+                            'reference_amount': withdrawal.amount
+                        })
+                    else:
+                        notifications.append({
+                            'type': NotificationType.WITHDRAWAL_REJECTED,
+                            'message': f"Your withdrawal request of {withdrawal.amount} has been rejected by {approver.username}.",
+                            'recipient_id': withdrawal.user_id,
+                            'sender_id': current_user_id,
+                            'group_id': withdrawal.group_id,
+                            'reference_id': withdrawal.id,
+                            'reference_amount': withdrawal.amount
+                        })
+            results[index] = result
+        
+        notification_ids = NotificationService.bulk_create_notifications(notifications)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Unexpected error while processing bulk withdrawal action: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to process withdrawal requests", "details": str(e)}), 500
+    
+    # Emails go out in the background once everything is committed
+    NotificationService.queue_notification_emails(notification_ids)
+    
+    processed = sum(1 for result in results if result['success'])
+    return jsonify({
+        "results": results,
+        "processed": processed,
+        "failed": len(results) - processed
+    }), 200
+
 @withdrawal_bp.route('/user', methods=['GET'])
 @jwt_required()
 def get_user_withdrawals():
     """Get all withdrawal requests made by the current user"""
     current_user_id = get_jwt_identity()
+    try:
+        fields = requested_fields(WithdrawalRequest.LIST_FIELDS)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
     
     # Get all withdrawal requests for the user
-    withdrawals = WithdrawalRequest.query.filter_by(user_id=current_user_id)\
-        .order_by(WithdrawalRequest.timestamp.desc()).all()
+    withdrawals = db.session.execute(
+        WithdrawalRequest.list_select(fields).where(WithdrawalRequest.user_id == int(current_user_id))
+        .order_by(WithdrawalRequest.timestamp.desc())
+    ).all()
     
     return jsonify({
-        "withdrawal_requests": [withdrawal.to_dict() for withdrawal in withdrawals],
+        "withdrawal_requests": rows_to_dicts(fields, withdrawals),
         "count": len(withdrawals)
     }), 200
 
 @withdrawal_bp.route('/group/<int:group_id>', methods=['GET'])
 @jwt_required()
+@query_budget(6)
 def get_group_withdrawals(group_id):
     """Get all withdrawal requests for a specific group"""
     current_user_id = get_jwt_identity()
@@ -271,12 +371,19 @@ def get_group_withdrawals(group_id):
     if not Group.get_member_status(group_id, current_user_id):
         return jsonify({"error": "You are not a member of this group"}), 403
     
+    try:
+        fields = requested_fields(WithdrawalRequest.LIST_FIELDS)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    
     # Get withdrawal requests for the group
-    withdrawals = WithdrawalRequest.query.filter_by(group_id=group_id)\
-        .order_by(WithdrawalRequest.timestamp.desc()).all()
+    withdrawals = db.session.execute(
+        WithdrawalRequest.list_select(fields).where(WithdrawalRequest.group_id == group_id)
+        .order_by(WithdrawalRequest.timestamp.desc())
+    ).all()
     
     return jsonify({
-        "withdrawal_requests": [withdrawal.to_dict() for withdrawal in withdrawals],
+        "withdrawal_requests": rows_to_dicts(fields, withdrawals),
         "count": len(withdrawals)
     }), 200
 
@@ -293,29 +400,18 @@ def get_user_available_balance(group_id):
     if not Group.get_member_status(group_id, current_user_id):
         return jsonify({"error": "You are not a member of this group"}), 403
     
-    # Calculate user's total contribution to the group
-    user_contributions = Transaction.query.filter_by(
-        user_id=current_user_id,
-        group_id=group_id,
-        transaction_type=TransactionType.CONTRIBUTION
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0
-    
-    # Calculate user's total approved withdrawals from the group
-    user_withdrawals = Transaction.query.filter_by(
-        user_id=current_user_id,
-        group_id=group_id,
-        transaction_type=TransactionType.WITHDRAWAL
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0
-    
-    # Calculate user's maximum allowed withdrawal
-    max_allowed_withdrawal = user_contributions - user_withdrawals
+    # Read the member's materialized balance
+    balance = BalanceService.get_balance(int(current_user_id), group_id)
+    db.session.commit()
     
     return jsonify({
         "user_id": current_user_id,
         "group_id": group_id,
-        "total_contributed": user_contributions,
-        "total_withdrawn": user_withdrawals,
-        "available_balance": max_allowed_withdrawal
+        "total_contributed": balance.total_contributed,
+        "total_withdrawn": balance.total_withdrawn,
+        "total_dividends": balance.total_dividends,
+        "held_amount": balance.held_amount,
+        "available_balance": balance.available
     }), 200
     
 @withdrawal_bp.route('/<int:withdrawal_id>/status', methods=['GET'])
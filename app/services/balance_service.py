@@ -0,0 +1,365 @@
+# app/services/balance_service.py
+from app import db
+from app.models.member_balance import MemberBalance, WithdrawalHold, HoldStatus, DailyRollup
+from app.models.transaction import Transaction, TransactionType
+from app.models.withdrawal_request import WithdrawalRequest, WithdrawalStatus
+from app.models.groups import Group, group_members
+from app.services.forecast_service import ForecastService
+from sqlalchemy import func, select, update, or_, literal, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime
+
+class InsufficientBalanceError(ValueError):
+    """Raised when a member's available balance cannot cover an amount"""
+    def __init__(self, requested, balance):
+        self.requested = requested
+        self.balance = balance
+        super().__init__(f"Requested {requested} exceeds available balance {balance.available}")
+
+def settled_contribution():
+    """Filter for contributions that count towards a balance (M-Pesa ones only once confirmed)"""
+    return or_(
+        Transaction.mpesa_request_id.is_(None),
+        Transaction.status == 'completed'
+    )
+
+class InsufficientGroupFundsError(ValueError):
+    """Raised when a group's savings cannot cover an amount"""
+    def __init__(self, requested, group):
+        self.requested = requested
+        self.group = group
+        super().__init__(f"Requested {requested} exceeds group savings {group.current_amount}")
+
+class WithdrawalStateError(ValueError):
+    """Raised when a withdrawal request is no longer pending"""
+    def __init__(self, withdrawal_id):
+        self.withdrawal_id = withdrawal_id
+        super().__init__(f"Withdrawal request {withdrawal_id} has already been processed")
+
+class BalanceService:
+    @staticmethod
+    def _ledger_totals(user_id, group_id):
+        """Scalar subqueries of a member's contributed, withdrawn, dividend and held totals from the ledger"""
+        contributed = select(func.coalesce(func.sum(Transaction.amount), 0.0)).where(
+            Transaction.user_id == user_id,
+            Transaction.group_id == group_id,
+            Transaction.transaction_type == TransactionType.CONTRIBUTION,
+            settled_contribution()
+        ).scalar_subquery()
+        withdrawn = select(func.coalesce(func.sum(Transaction.amount), 0.0)).where(
+            Transaction.user_id == user_id,
+            Transaction.group_id == group_id,
+            Transaction.transaction_type == TransactionType.WITHDRAWAL
+        ).scalar_subquery()
+        dividends = select(func.coalesce(func.sum(Transaction.amount), 0.0)).where(
+            Transaction.user_id == user_id,
+            Transaction.group_id == group_id,
+            Transaction.transaction_type == TransactionType.DIVIDEND
+        ).scalar_subquery()
+        held = select(func.coalesce(func.sum(WithdrawalHold.amount), 0.0)).where(
+            WithdrawalHold.user_id == user_id,
+            WithdrawalHold.group_id == group_id,
+            WithdrawalHold.status == HoldStatus.ACTIVE.value
+        ).scalar_subquery()
+        return contributed, withdrawn, dividends, held
+
+    @staticmethod
+    def ensure_balance(user_id, group_id):
+        """Create the member's balance row from the ledger if it does not exist yet"""
+        contributed, withdrawn, dividends, held = BalanceService._ledger_totals(user_id, group_id)
+
+        stmt = pg_insert(MemberBalance).values(
+            user_id=user_id,
+            group_id=group_id,
+            total_contributed=contributed,
+            total_withdrawn=withdrawn,
+            total_dividends=dividends,
+            held_amount=held,
+            updated_at=datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=['user_id', 'group_id'])
+        db.session.execute(stmt)
+
+    @staticmethod
+    def ensure_balances(user_ids, group_id):
+        """Create any missing balance rows of the group's members among user_ids, in one statement"""
+        member_id = group_members.c.user_id
+        stmt = pg_insert(MemberBalance).from_select(
+            ['user_id', 'group_id', 'total_contributed', 'total_withdrawn', 'total_dividends', 'held_amount', 'updated_at'],
+            select(
+                member_id,
+                group_members.c.group_id,
+                *BalanceService._ledger_totals(member_id, group_id),
+                literal(datetime.utcnow())
+            ).where(
+                group_members.c.group_id == group_id,
+                member_id.in_(list(user_ids))
+            )
+        ).on_conflict_do_nothing(index_elements=['user_id', 'group_id'])
+        db.session.execute(stmt)
+
+    @staticmethod
+    def lock_group(group_id):
+        """
+        Lock the group's row and reload it. Every write touching both a group's savings
+        and its member balances takes this lock before any balance row, so concurrent
+        contributions and withdrawals always lock in the same order and cannot deadlock.
+        """
+        return Group.query.filter_by(id=group_id).populate_existing().with_for_update().first()
+
+    @staticmethod
+    def lock_group_of_withdrawal(withdrawal_id):
+        """Lock the group a withdrawal request belongs to; raises WithdrawalStateError if there is no such request"""
+        group_id = db.session.execute(
+            select(WithdrawalRequest.group_id).where(WithdrawalRequest.id == withdrawal_id)
+        ).scalar()
+        if group_id is None:
+            raise WithdrawalStateError(withdrawal_id)
+        return BalanceService.lock_group(group_id)
+
+    @staticmethod
+    def get_balance(user_id, group_id, lock=False):
+        """Get the member's materialized balance, optionally locking the row"""
+        query = MemberBalance.query.filter_by(user_id=user_id, group_id=group_id)
+        if lock:
+            query = query.with_for_update()
+
+        balance = query.first()
+        if balance is None:
+            BalanceService.ensure_balance(user_id, group_id)
+            balance = query.first()
+        return balance
+
+    @staticmethod
+    def record_contribution(user_id, group_id, amount):
+        """Credit a completed contribution to the member's balance"""
+        # Seed a missing row from the ledger without flushing the contribution being credited
+        with db.session.no_autoflush:
+            BalanceService.ensure_balance(user_id, group_id)
+        db.session.query(MemberBalance).filter_by(
+            user_id=user_id, group_id=group_id
+        ).update({
+            MemberBalance.total_contributed: MemberBalance.total_contributed + amount,
+            MemberBalance.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        BalanceService.record_rollup(user_id, group_id, contributed=amount)
+        ForecastService.invalidate(group_id)
+
+    @staticmethod
+    def record_contributions(group_id, contributions):
+        """
+        Credit a batch of completed contributions, given as (user_id, amount) pairs,
+        with one statement each for balances and daily rollups
+        """
+        now = datetime.utcnow()
+        totals, counts = {}, {}
+        for user_id, amount in contributions:
+            totals[user_id] = totals.get(user_id, 0.0) + amount
+            counts[user_id] = counts.get(user_id, 0) + 1
+
+        with db.session.no_autoflush:
+            BalanceService.ensure_balances(totals, group_id)
+        balances = MemberBalance.__table__
+        db.session.execute(
+            update(balances)
+            .where(balances.c.user_id == bindparam('member_id'), balances.c.group_id == group_id)
+            .values(total_contributed=balances.c.total_contributed + bindparam('contributed'), updated_at=now),
+            [{'member_id': user_id, 'contributed': amount} for user_id, amount in totals.items()]
+        )
+
+        stmt = pg_insert(DailyRollup).values([
+            {
+                'group_id': group_id,
+                'user_id': user_id,
+                'day': now.date(),
+                'contributed': amount,
+                'contribution_count': counts[user_id],
+                'withdrawn': 0.0,
+                'withdrawal_count': 0
+            }
+            for user_id, amount in totals.items()
+        ])
+        db.session.execute(stmt.on_conflict_do_update(
+            constraint='uq_daily_rollups_group_day_user',
+            set_={
+                'contributed': DailyRollup.contributed + stmt.excluded.contributed,
+                'contribution_count': DailyRollup.contribution_count + stmt.excluded.contribution_count
+            }
+        ))
+        ForecastService.invalidate(group_id)
+
+    @staticmethod
+    def record_rollup(user_id, group_id, contributed=0.0, withdrawn=0.0, day=None):
+        """Add settled activity to the member's daily rollup"""
+        stmt = pg_insert(DailyRollup).values(
+            group_id=group_id,
+            user_id=user_id,
+            day=day or datetime.utcnow().date(),
+            contributed=contributed,
+            contribution_count=1 if contributed else 0,
+            withdrawn=withdrawn,
+            withdrawal_count=1 if withdrawn else 0
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            constraint='uq_daily_rollups_group_day_user',
+            set_={
+                'contributed': DailyRollup.contributed + stmt.excluded.contributed,
+                'contribution_count': DailyRollup.contribution_count + stmt.excluded.contribution_count,
+                'withdrawn': DailyRollup.withdrawn + stmt.excluded.withdrawn,
+                'withdrawal_count': DailyRollup.withdrawal_count + stmt.excluded.withdrawal_count
+            }
+        ))
+
+    @staticmethod
+    def place_hold(withdrawal_request):
+        """Reserve funds for a pending withdrawal request against the locked balance"""
+        balance = BalanceService.get_balance(
+            withdrawal_request.user_id, withdrawal_request.group_id, lock=True
+        )
+        if withdrawal_request.amount > balance.available:
+            raise InsufficientBalanceError(withdrawal_request.amount, balance)
+
+        balance.held_amount = (balance.held_amount or 0.0) + withdrawal_request.amount
+        db.session.add(WithdrawalHold(
+            amount=withdrawal_request.amount,
+            withdrawal_request_id=withdrawal_request.id,
+            user_id=withdrawal_request.user_id,
+            group_id=withdrawal_request.group_id
+        ))
+        return balance
+
+    @staticmethod
+    def approve_withdrawal(withdrawal_id, admin_id, admin_comment=None):
+        """
+        Approve a pending withdrawal as one locked unit of conditional updates.
+        Each UPDATE re-checks its condition after waiting on a concurrent writer's
+        row lock, so racing approvals can neither double-approve nor overdraw.
+        Returns the group's updated savings; the caller commits or rolls back.
+        """
+        now = datetime.utcnow()
+        BalanceService.lock_group_of_withdrawal(withdrawal_id)
+
+        # Transition the request; a concurrent approval of it blocks here and then matches nothing
+        withdrawal = db.session.execute(
+            update(WithdrawalRequest)
+            .where(
+                WithdrawalRequest.id == withdrawal_id,
+                WithdrawalRequest.status == WithdrawalStatus.PENDING.value
+            )
+            .values(
+                status=WithdrawalStatus.APPROVED.value,
+                admin_id=admin_id,
+                admin_comment=admin_comment,
+                updated_at=now
+            )
+            .returning(WithdrawalRequest.user_id, WithdrawalRequest.group_id,
+                       WithdrawalRequest.amount, WithdrawalRequest.description)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if withdrawal is None:
+            raise WithdrawalStateError(withdrawal_id)
+
+        # Seed a missing balance row while the hold is still active, so it starts out holding it
+        BalanceService.ensure_balance(withdrawal.user_id, withdrawal.group_id)
+
+        # Convert the hold placed when the request was filed
+        held = db.session.execute(
+            update(WithdrawalHold)
+            .where(
+                WithdrawalHold.withdrawal_request_id == withdrawal_id,
+                WithdrawalHold.status == HoldStatus.ACTIVE.value
+            )
+            .values(status=HoldStatus.CONVERTED.value, settled_at=now)
+            .returning(WithdrawalHold.amount)
+            .execution_options(synchronize_session=False)
+        ).scalar() or 0.0
+
+        # Debit the member balance only if it still covers the withdrawal
+        debited = db.session.execute(
+            update(MemberBalance)
+            .where(
+                MemberBalance.user_id == withdrawal.user_id,
+                MemberBalance.group_id == withdrawal.group_id,
+                MemberBalance.total_contributed + MemberBalance.total_dividends
+                - MemberBalance.total_withdrawn - MemberBalance.held_amount + held >= withdrawal.amount
+            )
+            .values(
+                total_withdrawn=MemberBalance.total_withdrawn + withdrawal.amount,
+                held_amount=MemberBalance.held_amount - held,
+                updated_at=now
+            )
+            .returning(MemberBalance.id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if debited is None:
+            raise InsufficientBalanceError(
+                withdrawal.amount, BalanceService.get_balance(withdrawal.user_id, withdrawal.group_id)
+            )
+
+        # Debit the group savings only if they still cover the withdrawal
+        group_amount = db.session.execute(
+            update(Group)
+            .where(Group.id == withdrawal.group_id, Group.current_amount >= withdrawal.amount)
+            .values(current_amount=Group.current_amount - withdrawal.amount)
+            .returning(Group.current_amount)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if group_amount is None:
+            raise InsufficientGroupFundsError(withdrawal.amount, db.session.get(Group, withdrawal.group_id))
+
+        db.session.add(Transaction(
+            amount=withdrawal.amount,
+            user_id=withdrawal.user_id,
+            group_id=withdrawal.group_id,
+            transaction_type=TransactionType.WITHDRAWAL,
+            description=f"Withdrawal: {withdrawal.description}",
+            reference_id=withdrawal_id
+        ))
+        BalanceService.record_rollup(withdrawal.user_id, withdrawal.group_id, withdrawn=withdrawal.amount)
+        ForecastService.invalidate(withdrawal.group_id)
+        return group_amount
+
+    @staticmethod
+    def reject_withdrawal(withdrawal_id, admin_id, admin_comment=None):
+        """Reject a pending withdrawal and release its hold with conditional updates"""
+        now = datetime.utcnow()
+        BalanceService.lock_group_of_withdrawal(withdrawal_id)
+
+        withdrawal = db.session.execute(
+            update(WithdrawalRequest)
+            .where(
+                WithdrawalRequest.id == withdrawal_id,
+                WithdrawalRequest.status == WithdrawalStatus.PENDING.value
+            )
+            .values(
+                status=WithdrawalStatus.REJECTED.value,
+                admin_id=admin_id,
+                admin_comment=admin_comment,
+                updated_at=now
+            )
+            .returning(WithdrawalRequest.user_id, WithdrawalRequest.group_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if withdrawal is None:
+            raise WithdrawalStateError(withdrawal_id)
+
+        held = db.session.execute(
+            update(WithdrawalHold)
+            .where(
+                WithdrawalHold.withdrawal_request_id == withdrawal_id,
+                WithdrawalHold.status == HoldStatus.ACTIVE.value
+            )
+            .values(status=HoldStatus.RELEASED.value, settled_at=now)
+            .returning(WithdrawalHold.amount)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+
+        if held:
+            db.session.execute(
+                update(MemberBalance)
+                .where(
+                    MemberBalance.user_id == withdrawal.user_id,
+                    MemberBalance.group_id == withdrawal.group_id
+                )
+                .values(held_amount=MemberBalance.held_amount - held, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
@@ -0,0 +1,219 @@
+# app/services/dividend_service.py
+import numpy as np
+from app import db
+from app.models.dividend import DividendDistribution
+from app.models.groups import Group
+from app.models.loan import LoanRepayment
+from app.models.member_balance import MemberBalance
+from app.models.transaction import Transaction, TransactionType
+from app.services.balance_service import settled_contribution
+from sqlalchemy import select, insert, update, func, case, and_, or_, bindparam
+from datetime import datetime, time, timedelta
+
+# Rows fetched per round trip while streaming the ledger
+LEDGER_BATCH_SIZE = 5000
+
+class DividendPeriodError(ValueError):
+    """Raised when a period overlaps one that was already distributed"""
+    def __init__(self, distribution):
+        self.distribution = distribution
+        super().__init__(
+            f"Dividends were already distributed for {distribution.period_start} to {distribution.period_end}"
+        )
+
+def _period_bounds(period_start, period_end):
+    """Datetime bounds of an inclusive date period"""
+    return datetime.combine(period_start, time.min), datetime.combine(period_end + timedelta(days=1), time.min)
+
+class DividendService:
+    @staticmethod
+    def time_weighted_balances(group_ids, period_start, period_end):
+        """
+        Compute each member's time-weighted savings balance over the period, in balance-days.
+        Streams the ledger once, ordered by group and timestamp, carrying a running balance
+        and the time it last changed per member; history before the period only sets the
+        opening balances. Returns {group_id: {user_id: weight}}.
+        """
+        start, end = _period_bounds(period_start, period_end)
+        span = (end - start).total_seconds() / 86400.0
+
+        signed_amount = case(
+            (Transaction.transaction_type == TransactionType.WITHDRAWAL, -Transaction.amount),
+            else_=Transaction.amount
+        )
+        ledger = select(
+            Transaction.group_id, Transaction.user_id, Transaction.timestamp, signed_amount
+        ).where(
+            Transaction.group_id.in_(group_ids),
+            Transaction.timestamp < end,
+            or_(
+                and_(Transaction.transaction_type == TransactionType.CONTRIBUTION, settled_contribution()),
+                Transaction.transaction_type.in_([TransactionType.WITHDRAWAL, TransactionType.DIVIDEND])
+            )
+        ).order_by(
+            Transaction.group_id, Transaction.timestamp.asc().nullsfirst(), Transaction.id
+        ).execution_options(yield_per=LEDGER_BATCH_SIZE)
+
+        weights = {}
+        current_group, balances, changed_at, group_weights = None, None, None, None
+
+        def close_group():
+            # Carry every balance through to the end of the period
+            for user_id, balance in balances.items():
+                group_weights[user_id] = group_weights.get(user_id, 0.0) + max(balance, 0.0) * (span - changed_at[user_id])
+            weights[current_group] = {user_id: weight for user_id, weight in group_weights.items() if weight > 0}
+
+        for group_id, user_id, timestamp, amount in db.session.execute(ledger):
+            if group_id != current_group:
+                if current_group is not None:
+                    close_group()
+                current_group, balances, changed_at, group_weights = group_id, {}, {}, {}
+
+            # Days into the period; anything earlier only moves the opening balance
+            offset = max((timestamp - start).total_seconds() / 86400.0, 0.0) if timestamp else 0.0
+            balance = balances.get(user_id, 0.0)
+            if balance > 0:
+                group_weights[user_id] = group_weights.get(user_id, 0.0) + balance * (offset - changed_at[user_id])
+            balances[user_id] = balance + amount
+            changed_at[user_id] = offset
+
+        if current_group is not None:
+            close_group()
+        return weights
+
+    @staticmethod
+    def interest_income(group_ids, period_start, period_end):
+        """
+        Loan interest repaid to each group during the period.
+        Taken from the LOAN_REPAYMENT transactions dated in the period rather than from
+        the installments, whose amount_paid is cumulative and whose paid_at moves with
+        every payment. Each payment carries its loan's interest share of the schedule;
+        whatever is paid beyond the scheduled total (late penalties) carries none.
+        """
+        start, end = _period_bounds(period_start, period_end)
+
+        schedule = select(
+            LoanRepayment.loan_id,
+            func.sum(func.coalesce(LoanRepayment.interest_amount, 0.0)).label('interest'),
+            func.sum(LoanRepayment.amount).label('scheduled')
+        ).where(LoanRepayment.amount > 0).group_by(LoanRepayment.loan_id).subquery()
+
+        # Everything paid towards the loan before each payment, in ledger order
+        paid_before = func.coalesce(func.sum(Transaction.amount).over(
+            partition_by=Transaction.reference_id,
+            order_by=(Transaction.timestamp, Transaction.id),
+            rows=(None, -1)
+        ), 0.0)
+        payments = select(
+            Transaction.group_id,
+            Transaction.reference_id.label('loan_id'),
+            Transaction.timestamp,
+            Transaction.amount,
+            paid_before.label('paid_before')
+        ).where(
+            Transaction.group_id.in_(group_ids),
+            Transaction.transaction_type == TransactionType.LOAN_REPAYMENT,
+            Transaction.status == 'completed',
+            Transaction.timestamp < end
+        ).subquery()
+
+        # The part of each payment that falls within the schedule, at the loan's interest share
+        scheduled_part = (
+            func.least(payments.c.paid_before + payments.c.amount, schedule.c.scheduled)
+            - func.least(payments.c.paid_before, schedule.c.scheduled)
+        )
+        rows = db.session.execute(
+            select(payments.c.group_id, func.sum(scheduled_part * schedule.c.interest / schedule.c.scheduled))
+            .join(schedule, schedule.c.loan_id == payments.c.loan_id)
+            .where(payments.c.timestamp >= start)
+            .group_by(payments.c.group_id)
+        ).all()
+        return {group_id: float(income or 0.0) for group_id, income in rows}
+
+    @staticmethod
+    def allocate(income, weights):
+        """
+        Split income pro rata to the weights, in whole cents.
+        Leftover cents go to the largest remainders, so the shares add up exactly.
+        """
+        total_cents = int(round(income * 100))
+        user_ids = list(weights)
+        shares = np.fromiter(weights.values(), dtype=np.float64, count=len(user_ids))
+        if total_cents <= 0 or not user_ids or shares.sum() <= 0:
+            return {}
+
+        exact = shares / shares.sum() * total_cents
+        cents = np.floor(exact).astype(np.int64)
+        leftover = total_cents - int(cents.sum())
+        if leftover:
+            cents[np.argsort(cents - exact, kind='stable')[:leftover]] += 1
+
+        return {user_id: amount / 100.0 for user_id, amount in zip(user_ids, cents.tolist()) if amount > 0}
+
+    @staticmethod
+    def distribute(group_id, period_start, period_end, created_by_id, dry_run=False):
+        """
+        Share the group's interest income for the period out to its members by
+        time-weighted balance. Writes the distribution, one DIVIDEND transaction per
+        member and the balance credits in bulk. Returns (distribution, allocations,
+        weights); the caller commits. A dry run computes everything but writes nothing.
+        """
+        if period_end < period_start:
+            raise ValueError("period_end must not be before period_start")
+
+        # Serialize distributions of the same group
+        db.session.execute(select(Group.id).where(Group.id == group_id).with_for_update())
+        overlapping = DividendDistribution.query.filter(
+            DividendDistribution.group_id == group_id,
+            DividendDistribution.period_start <= period_end,
+            DividendDistribution.period_end >= period_start
+        ).first()
+        if overlapping:
+            raise DividendPeriodError(overlapping)
+
+        weights = DividendService.time_weighted_balances([group_id], period_start, period_end).get(group_id, {})
+        income = DividendService.interest_income([group_id], period_start, period_end).get(group_id, 0.0)
+        allocations = DividendService.allocate(income, weights)
+
+        distribution = DividendDistribution(
+            group_id=group_id,
+            period_start=period_start,
+            period_end=period_end,
+            interest_income=income,
+            distributed_amount=round(sum(allocations.values()), 2),
+            total_weight=sum(weights.values()),
+            member_count=len(allocations),
+            created_by_id=created_by_id
+        )
+        if dry_run:
+            return distribution, allocations, weights
+
+        db.session.add(distribution)
+        db.session.flush()
+
+        if allocations:
+            now = datetime.utcnow()
+            description = f"Dividend for {period_start.isoformat()} to {period_end.isoformat()}"
+            db.session.execute(insert(Transaction), [
+                {
+                    'amount': amount,
+                    'user_id': user_id,
+                    'group_id': group_id,
+                    'transaction_type': TransactionType.DIVIDEND,
+                    'description': description,
+                    'timestamp': now,
+                    'status': 'completed',
+                    'reference_id': distribution.id
+                }
+                for user_id, amount in allocations.items()
+            ])
+
+            balances = MemberBalance.__table__
+            db.session.execute(
+                update(balances)
+                .where(balances.c.user_id == bindparam('member_id'), balances.c.group_id == group_id)
+                .values(total_dividends=balances.c.total_dividends + bindparam('dividend'), updated_at=now),
+                [{'member_id': user_id, 'dividend': amount} for user_id, amount in allocations.items()]
+            )
+
+        return distribution, allocations, weights
@@ -6,6 +6,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import render_template_string, current_app
 from datetime import datetime
+from app.utils.metrics import track_outbound
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,6 +26,8 @@ class EmailService:
         smtp_username = os.environ.get('SMTP_USERNAME')
         smtp_password = os.environ.get('SMTP_PASSWORD')
         sender_email = os.environ.get('SENDER_EMAIL', smtp_username)
+        # Only a local test server would run without STARTTLS
+        use_tls = os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
 
         # Log email configuration
         logging.debug(f"SMTP Server: {smtp_server}, Port: {smtp_port}, Username: {smtp_username}, Sender Email: {sender_email}")
@@ -56,13 +59,15 @@ class EmailService:
         try:
             # Connect to SMTP server
             logging.debug("Connecting to SMTP server...")
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(smtp_username, smtp_password)
+            with track_outbound('smtp', 'send'):
+                server = smtplib.SMTP(smtp_server, smtp_port)
+                if use_tls:
+                    server.starttls()
+                server.login(smtp_username, smtp_password)
 
-            # Send email
-            server.sendmail(sender_email, recipient_email, message.as_string())
-            server.quit()
+                # Send email
+                server.sendmail(sender_email, recipient_email, message.as_string())
+                server.quit()
             logging.info(f"Email sent successfully to {recipient_email}.")
             return True
         except Exception as e:
@@ -215,6 +220,42 @@ class EmailService:
         </html>
         """
 
+    @staticmethod
+    def get_group_welcome_template():
+        """Template for welcoming members added to a group"""
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background-color: #4CAF50; color: white; padding: 10px; text-align: center; }
+                .content { padding: 20px; background-color: #f9f9f9; }
+                .footer { font-size: 12px; color: #777; margin-top: 20px; }
+                .button { display: inline-block; background-color: #4CAF50; color: white; padding: 10px 20px; 
+                          text-decoration: none; border-radius: 5px; margin-top: 20px; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h2>Welcome to {{ group_name }}</h2>
+                </div>
+                <div class="content">
+                    <p>Hello {{ recipient_name }},</p>
+                    <p><strong>{{ sender_name }}</strong> added you to the <strong>{{ group_name }}</strong> savings group.</p>
+                    <p>You can now contribute, follow the group's progress towards its target and request loans.</p>
+                    <a href="{{ dashboard_url }}" class="button">Open the Group</a>
+                </div>
+                <div class="footer">
+                    <p>This is an automated message from the Group Savings App. Please do not reply to this email.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
 # Ensure all required variables are defined before creating the context
 def send_contribution_email(recipient_email, recipient_name, sender_name, amount, group_name, current_amount, target_amount):
     context = {
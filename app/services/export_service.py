@@ -0,0 +1,98 @@
+# app/services/export_service.py
+import csv
+import io
+import json
+from app import db
+from app.models.transaction import Transaction
+from app.models.user import User
+from sqlalchemy import select
+from datetime import datetime, time, timedelta
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+# Rows fetched per round trip from the server-side cursor, and written out per chunk
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = (
+    'id', 'timestamp', 'transaction_type', 'amount', 'status', 'user_id', 'username',
+    'description', 'reference', 'mpesa_confirmation_code', 'reference_id'
+)
+
+class LedgerExportService:
+    """
+    Streams a group's ledger as CSV or JSON lines without holding it in memory.
+
+    Rows come in id order from a server-side cursor and are written out one batch
+    at a time, so memory stays flat however long the ledger is. Every row carries
+    its id, so an interrupted export can be resumed with after_id set to the last
+    id received.
+    """
+
+    @staticmethod
+    def ledger_query(group_id, start_date=None, end_date=None, types=None, after_id=None):
+        """Select the group's ledger rows in id order, optionally limited to dates, types and ids after after_id"""
+        query = select(
+            Transaction.id,
+            Transaction.timestamp,
+            Transaction.transaction_type,
+            Transaction.amount,
+            Transaction.status,
+            Transaction.user_id,
+            User.username,
+            Transaction.description,
+            Transaction.reference,
+            Transaction.mpesa_confirmation_code,
+            Transaction.reference_id
+        ).join(
+            User, User.id == Transaction.user_id
+        ).where(
+            Transaction.group_id == group_id
+        ).order_by(Transaction.id)
+
+        if start_date:
+            query = query.where(Transaction.timestamp >= datetime.combine(start_date, time.min))
+        if end_date:
+            query = query.where(Transaction.timestamp < datetime.combine(end_date + timedelta(days=1), time.min))
+        if types:
+            query = query.where(Transaction.transaction_type.in_(types))
+        if after_id:
+            query = query.where(Transaction.id > after_id)
+        return query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    @staticmethod
+    def iter_batches(group_id, **filters):
+        """Yield the ledger as lists of plain row dicts, one cursor batch at a time"""
+        result = db.session.execute(LedgerExportService.ledger_query(group_id, **filters))
+        for rows in result.partitions():
+            yield [
+                {
+                    **row._asdict(),
+                    'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+                    'transaction_type': row.transaction_type.value
+                }
+                for row in rows
+            ]
+
+    @staticmethod
+    def stream_csv(group_id, **filters):
+        """Yield the ledger as CSV text chunks, starting with the header"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        yield buffer.getvalue()
+        for batch in LedgerExportService.iter_batches(group_id, **filters):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+            yield buffer.getvalue()
+
+    @staticmethod
+    def stream_jsonl(group_id, **filters):
+        """Yield the ledger as chunks of newline-delimited JSON objects"""
+        for batch in LedgerExportService.iter_batches(group_id, **filters):
+            yield ''.join(json.dumps(row) + '\n' for row in batch)
+
+    @staticmethod
+    def stream(group_id, export_format='csv', **filters):
+        if export_format == 'jsonl':
+            return LedgerExportService.stream_jsonl(group_id, **filters)
+        return LedgerExportService.stream_csv(group_id, **filters)
@@ -0,0 +1,127 @@
+# app/services/forecast_service.py
+import math
+import numpy as np
+from app import db
+from app.models.member_balance import DailyRollup
+from app.utils.cache import TTLCache
+from app.utils.invalidation import invalidation_bus
+from sqlalchemy import select, func
+from datetime import datetime, timedelta
+
+FORECAST_WINDOW_DAYS = 90
+MIN_HISTORY_DAYS = 7
+CONFIDENCE = 0.8
+# Two-sided z-score for the confidence band
+CONFIDENCE_Z = 1.2815515655446004
+# Forecasts further out than this are reported as stalled
+MAX_FORECAST_DAYS = 36500
+
+# Kept current by invalidations from every worker; the TTL only rolls the forecast dates forward
+forecast_cache = TTLCache(ttl=6 * 3600, maxsize=4096)
+invalidation_bus.watch(forecast_cache, 'groups', 'transactions')
+
+class ForecastService:
+    @staticmethod
+    def compute_forecasts(groups, as_of=None):
+        """
+        Forecast when each group reaches its target from its daily net savings velocity.
+        Daily net flows over the window are read from the rollups in one query and fitted
+        for all groups at once: the mean gives the expected completion date, and treating
+        the days as independent draws gives a band around it.
+        """
+        if not groups:
+            return {}
+        today = (as_of or datetime.utcnow()).date()
+        window_start = today - timedelta(days=FORECAST_WINDOW_DAYS - 1)
+        row_of = {group.id: row for row, group in enumerate(groups)}
+
+        flows = np.zeros((len(groups), FORECAST_WINDOW_DAYS))
+        daily = db.session.execute(
+            select(
+                DailyRollup.group_id,
+                DailyRollup.day,
+                func.sum(DailyRollup.contributed - DailyRollup.withdrawn)
+            ).where(
+                DailyRollup.group_id.in_(list(row_of)),
+                DailyRollup.day >= window_start,
+                DailyRollup.day <= today
+            ).group_by(DailyRollup.group_id, DailyRollup.day)
+        ).all()
+        for group_id, day, net in daily:
+            flows[row_of[group_id], (day - window_start).days] = net
+
+        # Only days since each group was created count as history
+        first_day = np.array([
+            max((group.created_at.date() - window_start).days, 0) if group.created_at else 0
+            for group in groups
+        ])
+        observed = np.arange(FORECAST_WINDOW_DAYS) >= first_day[:, None]
+        history_days = observed.sum(axis=1)
+        velocity = (flows * observed).sum(axis=1) / np.maximum(history_days, 1)
+        spread = np.sqrt(
+            (((flows - velocity[:, None]) ** 2) * observed).sum(axis=1) / np.maximum(history_days - 1, 1)
+        )
+
+        targets = np.array([group.target_amount or 0.0 for group in groups])
+        current = np.array([group.current_amount or 0.0 for group in groups])
+        remaining = targets - current
+
+        # Days t where velocity * t -/+ z * spread * sqrt(t) covers the remaining amount
+        moving = (velocity > 0) & (remaining > 0)
+        safe_velocity = np.where(moving, velocity, 1.0)
+        root = np.sqrt(CONFIDENCE_Z ** 2 * spread ** 2 + 4 * safe_velocity * np.maximum(remaining, 0.0))
+        expected_days = np.maximum(remaining, 0.0) / safe_velocity
+        earliest_days = ((root - CONFIDENCE_Z * spread) / (2 * safe_velocity)) ** 2
+        latest_days = ((root + CONFIDENCE_Z * spread) / (2 * safe_velocity)) ** 2
+
+        def to_date(days):
+            return (today + timedelta(days=math.ceil(days))).isoformat()
+
+        forecasts = {}
+        for row, group in enumerate(groups):
+            forecast = {
+                "as_of": today.isoformat(),
+                "window_days": int(history_days[row]),
+                "daily_velocity": float(velocity[row]),
+                "remaining_amount": float(max(remaining[row], 0.0)),
+                "confidence": CONFIDENCE,
+                "expected_completion_date": None,
+                "earliest_completion_date": None,
+                "latest_completion_date": None
+            }
+            if remaining[row] <= 0:
+                forecast["status"] = "reached"
+            elif history_days[row] < MIN_HISTORY_DAYS:
+                forecast["status"] = "insufficient_history"
+            elif not moving[row] or expected_days[row] > MAX_FORECAST_DAYS:
+                forecast["status"] = "stalled"
+            else:
+                forecast.update({
+                    "status": "on_track",
+                    "expected_completion_date": to_date(expected_days[row]),
+                    "earliest_completion_date": to_date(earliest_days[row]),
+                    "latest_completion_date": to_date(min(latest_days[row], MAX_FORECAST_DAYS))
+                })
+            forecasts[group.id] = forecast
+        return forecasts
+
+    @staticmethod
+    def get_forecasts(groups):
+        """Cached forecasts of the groups, computing any misses in one batch"""
+        forecasts, missing = {}, []
+        for group in groups:
+            forecast = forecast_cache.get(group.id)
+            if forecast is None:
+                missing.append(group)
+            else:
+                forecasts[group.id] = forecast
+
+        for group_id, forecast in ForecastService.compute_forecasts(missing).items():
+            forecast_cache.set(group_id, forecast)
+            forecasts[group_id] = forecast
+        return forecasts
+
+    @staticmethod
+    def invalidate(group_id):
+        """Drop the group's cached forecast in every worker once the current transaction commits"""
+        invalidation_bus.invalidate_on_commit(db.session, 'transactions', group_id)
@@ -0,0 +1,264 @@
+# app/services/import_service.py
+import csv
+import tempfile
+from app import db
+from app.models.groups import Group, group_members
+from app.models.member_balance import MemberBalance, DailyRollup
+from app.models.transaction import Transaction, TransactionType
+from app.models.user import User
+from app.services.balance_service import BalanceService, settled_contribution
+from app.services.forecast_service import ForecastService
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, Float, String, DateTime,
+    select, insert, delete, update, func, literal, cast, Date, exists
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime
+
+REQUIRED_COLUMNS = ('username', 'amount', 'date')
+# Errors listed in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+# Validated rows are spooled in memory up to this size before moving to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Session-local staging table the validated rows are COPYed into, dropped at commit
+staging = Table(
+    'contribution_import_staging', MetaData(),
+    Column('line', Integer, nullable=False),
+    Column('username', String(80), nullable=False),
+    Column('amount', Float, nullable=False),
+    Column('timestamp', DateTime, nullable=False),
+    Column('description', String(255)),
+    Column('reference', String(50)),
+    prefixes=['TEMPORARY'],
+    postgresql_on_commit='DROP'
+)
+
+class ContributionImport:
+    """Outcome of validating (and possibly loading) one import file"""
+
+    def __init__(self, group_id):
+        self.group_id = group_id
+        self.rows = 0
+        self.valid_rows = 0
+        self.total_amount = 0.0
+        self.usernames = set()
+        self.errors = []
+        self.error_count = 0
+        self.imported = 0
+        self.skipped_duplicates = 0
+        self.members = 0
+        self.staged = None
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {
+            'group_id': self.group_id,
+            'rows': self.rows,
+            'valid_rows': self.valid_rows,
+            'total_amount': round(self.total_amount, 2),
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'imported': self.imported,
+            'skipped_duplicates': self.skipped_duplicates,
+            'members': self.members
+        }
+
+class ContributionImportService:
+    """
+    Loads historical contributions into a group in bulk.
+
+    The CSV (username, amount, date and optional description and reference) is
+    validated in one streaming pass that spools the clean rows to a temporary file;
+    usernames are resolved against the group's members with one query. Only a file
+    without errors is loaded: the rows are COPYed into a staging table and merged
+    into the ledger with set-based statements, after which balances, daily rollups
+    and the group's savings are brought up to date once. Rows whose reference is
+    already in the group's ledger are skipped, so re-running an import is safe.
+    No per-row notifications are sent.
+    """
+
+    @staticmethod
+    def _parse_timestamp(value):
+        timestamp = datetime.fromisoformat(value.strip())
+        return timestamp.replace(tzinfo=None) if timestamp.tzinfo else timestamp
+
+    @staticmethod
+    def validate(group_id, lines):
+        """Validate the CSV text in one pass and spool the clean rows; returns a ContributionImport"""
+        result = ContributionImport(group_id)
+        reader = csv.DictReader(lines)
+        header = [name.strip().lower() for name in reader.fieldnames or []]
+        missing = [name for name in REQUIRED_COLUMNS if name not in header]
+        if missing:
+            result.add_error(1, f"Missing columns: {', '.join(missing)}")
+            return result
+        reader.fieldnames = header
+
+        now = datetime.utcnow()
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode='w+', newline='')
+        writer = csv.writer(spool)
+        for row in reader:
+            line = reader.line_num
+            result.rows += 1
+            username = (row.get('username') or '').strip()
+            description = (row.get('description') or '').strip() or None
+            reference = (row.get('reference') or '').strip() or None
+            if not username:
+                result.add_error(line, "username is required")
+                continue
+            try:
+                amount = float(row.get('amount') or '')
+            except ValueError:
+                result.add_error(line, f"Invalid amount: {row.get('amount')!r}")
+                continue
+            if amount <= 0:
+                result.add_error(line, "amount must be positive")
+                continue
+            try:
+                timestamp = ContributionImportService._parse_timestamp(row.get('date') or '')
+            except ValueError:
+                result.add_error(line, f"Invalid date: {row.get('date')!r}")
+                continue
+            if timestamp > now:
+                result.add_error(line, "date is in the future")
+                continue
+            if description and len(description) > 255 or reference and len(reference) > 50:
+                result.add_error(line, "description or reference is too long")
+                continue
+
+            writer.writerow([line, username, amount, timestamp.isoformat(), description or '', reference or ''])
+            result.usernames.add(username)
+            result.valid_rows += 1
+            result.total_amount += amount
+
+        if result.rows == 0:
+            result.add_error(1, "The file has no rows")
+
+        # Resolve every username against the group's members in one lookup
+        if result.usernames:
+            members = set(db.session.execute(
+                select(User.username).join(
+                    group_members, group_members.c.user_id == User.id
+                ).where(
+                    group_members.c.group_id == group_id,
+                    User.username.in_(result.usernames)
+                )
+            ).scalars())
+            for username in sorted(result.usernames - members):
+                result.add_error(None, f"{username} is not a member of this group")
+            result.members = len(members)
+
+        spool.seek(0)
+        result.staged = spool
+        return result
+
+    @staticmethod
+    def load(result):
+        """COPY a validated import into staging and merge it; the caller commits"""
+        group_id = result.group_id
+        # Lock the group before the member balances, the order every savings write uses
+        BalanceService.lock_group(group_id)
+        connection = db.session.connection()
+        staging.create(connection)
+
+        # Empty fields load as NULL
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(
+            f"COPY {staging.name} (line, username, amount, timestamp, description, reference) "
+            "FROM STDIN WITH (FORMAT csv)",
+            result.staged
+        )
+        result.staged.close()
+
+        # Rows already in the ledger from an earlier run of the same file
+        result.skipped_duplicates = db.session.execute(
+            delete(staging).where(
+                staging.c.reference.isnot(None),
+                exists().where(Transaction.group_id == group_id, Transaction.reference == staging.c.reference)
+            )
+        ).rowcount
+
+        staged = select(staging, User.id.label('user_id')).join(User, User.username == staging.c.username).subquery()
+        result.imported = db.session.execute(
+            insert(Transaction).from_select(
+                ['amount', 'description', 'transaction_type', 'timestamp', 'status', 'reference', 'user_id', 'group_id'],
+                select(
+                    staged.c.amount,
+                    staged.c.description,
+                    literal(TransactionType.CONTRIBUTION, Transaction.transaction_type.type),
+                    staged.c.timestamp,
+                    literal('completed'),
+                    staged.c.reference,
+                    staged.c.user_id,
+                    literal(group_id)
+                ).order_by(staged.c.timestamp, staged.c.line)
+            )
+        ).rowcount
+        imported_total = db.session.execute(select(func.coalesce(func.sum(staging.c.amount), 0.0))).scalar()
+
+        # Daily rollups, one upsert for every member and day touched
+        day = cast(staged.c.timestamp, Date)
+        rollups = pg_insert(DailyRollup).from_select(
+            ['group_id', 'user_id', 'day', 'contributed', 'contribution_count', 'withdrawn', 'withdrawal_count'],
+            select(
+                literal(group_id), staged.c.user_id, day,
+                func.sum(staged.c.amount), func.count(), literal(0.0), literal(0)
+            ).group_by(staged.c.user_id, day)
+        )
+        db.session.execute(rollups.on_conflict_do_update(
+            constraint='uq_daily_rollups_group_day_user',
+            set_={
+                'contributed': DailyRollup.contributed + rollups.excluded.contributed,
+                'contribution_count': DailyRollup.contribution_count + rollups.excluded.contribution_count
+            }
+        ))
+
+        # Rebuild the contributed totals of the members touched from the ledger; rows
+        # created here get their other totals from it too, as ensure_balance would
+        is_contribution = Transaction.transaction_type == TransactionType.CONTRIBUTION
+        totals = select(
+            Transaction.user_id,
+            literal(group_id),
+            func.coalesce(func.sum(Transaction.amount).filter(is_contribution, settled_contribution()), 0.0),
+            func.coalesce(func.sum(Transaction.amount).filter(
+                Transaction.transaction_type == TransactionType.WITHDRAWAL), 0.0),
+            func.coalesce(func.sum(Transaction.amount).filter(
+                Transaction.transaction_type == TransactionType.DIVIDEND), 0.0),
+            literal(0.0),
+            func.now()
+        ).where(
+            Transaction.group_id == group_id,
+            Transaction.user_id.in_(select(staged.c.user_id))
+        ).group_by(Transaction.user_id)
+        balances = pg_insert(MemberBalance).from_select(
+            ['user_id', 'group_id', 'total_contributed', 'total_withdrawn', 'total_dividends', 'held_amount', 'updated_at'],
+            totals
+        )
+        db.session.execute(balances.on_conflict_do_update(
+            constraint='uq_member_balances_user_group',
+            set_={'total_contributed': balances.excluded.total_contributed, 'updated_at': balances.excluded.updated_at}
+        ))
+
+        db.session.execute(
+            update(Group).where(Group.id == group_id).values(
+                current_amount=func.coalesce(Group.current_amount, 0.0) + imported_total
+            )
+        )
+        ForecastService.invalidate(group_id)
+        result.total_amount = imported_total
+        return result
+
+    @staticmethod
+    def import_csv(group_id, lines, dry_run=False):
+        """Validate and, unless dry_run or invalid, load the file; returns the ContributionImport"""
+        result = ContributionImportService.validate(group_id, lines)
+        if result.error_count or dry_run:
+            if result.staged:
+                result.staged.close()
+            return result
+        return ContributionImportService.load(result)
@@ -0,0 +1,118 @@
+# app/services/loan_pricing.py
+import numpy as np
+
+FLAT = 'flat'
+REDUCING_BALANCE = 'reducing_balance'
+ANNUITY = 'annuity'
+INTEREST_METHODS = (FLAT, REDUCING_BALANCE, ANNUITY)
+
+class LoanPricingEngine:
+    """
+    Prices arrays of loans in one NumPy pass.
+
+    interest_rate keeps its existing meaning of a percentage of the principal over
+    the whole term, so a flat loan repays principal * (1 + rate / 100). The declining
+    balance methods charge the equivalent weekly rate, rate / 100 / term, on the
+    balance still owed:
+
+    - flat: equal installments of principal and interest
+    - reducing_balance: equal principal, interest on the opening balance each week
+    - annuity: equal installments, interest on the opening balance each week
+    """
+
+    @staticmethod
+    def _as_arrays(principals, rates, terms, method):
+        if method not in INTEREST_METHODS:
+            raise ValueError(f"Invalid interest method. Valid values are: {', '.join(INTEREST_METHODS)}")
+
+        # Scalars broadcast, so one principal can be priced over many terms and vice versa
+        principals, rates, terms = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(principals, dtype=np.float64)),
+            np.asarray(rates, dtype=np.float64),
+            np.asarray(terms, dtype=np.int64)
+        )
+        if (terms <= 0).any():
+            raise ValueError("Loan terms must be at least one week")
+        return principals, rates / 100.0, terms
+
+    @staticmethod
+    def price(principals, rates, terms, method=FLAT):
+        """
+        Compute the weekly repayment schedules of many loans.
+        Returns (loans x longest term) arrays of installments, principal, interest and
+        closing balance, zero past each loan's own term, plus per-loan totals.
+        """
+        principals, rates, terms = LoanPricingEngine._as_arrays(principals, rates, terms, method)
+        max_term = int(terms.max()) if terms.size else 0
+
+        weeks = np.arange(1, max_term + 1, dtype=np.float64)
+        active = weeks <= terms[:, None]
+        p = principals[:, None]
+        n = terms[:, None].astype(np.float64)
+        r = rates[:, None]
+
+        if method == FLAT:
+            principal = np.where(active, p / n, 0.0)
+            interest = np.where(active, p * r / n, 0.0)
+        else:
+            weekly_rate = r / n
+            if method == REDUCING_BALANCE:
+                principal = np.where(active, p / n, 0.0)
+                opening = p - (weeks - 1) * p / n
+            else:
+                # Closed-form opening balances; interest-free loans reduce to equal principal
+                charged = weekly_rate > 0
+                safe_rate = np.where(charged, weekly_rate, 1.0)
+                payment = np.where(charged, p * safe_rate / (1 - (1 + safe_rate) ** -n), p / n)
+                growth = (1 + safe_rate) ** (weeks - 1)
+                opening = np.where(charged, p * growth - payment * (growth - 1) / safe_rate,
+                                   p - (weeks - 1) * payment)
+            interest = np.where(active, opening * weekly_rate, 0.0)
+            if method == ANNUITY:
+                principal = np.where(active, payment - interest, 0.0)
+
+        installments = principal + interest
+        balance = np.where(active, np.maximum(p - np.cumsum(principal, axis=1), 0.0), 0.0)
+        total_interest = interest.sum(axis=1)
+
+        return {
+            "terms": terms,
+            "installments": installments,
+            "principal": principal,
+            "interest": interest,
+            "balance": balance,
+            "total_interest": total_interest,
+            "total_repayment": principals + total_interest
+        }
+
+    @staticmethod
+    def total_repayment(principals, rates, terms, method=FLAT):
+        """Total repaid per loan in closed form, without building the schedules"""
+        principals, rates, terms = LoanPricingEngine._as_arrays(principals, rates, terms, method)
+        n = terms.astype(np.float64)
+
+        if method == FLAT:
+            interest = principals * rates
+        elif method == REDUCING_BALANCE:
+            interest = principals * rates * (n + 1) / (2 * n)
+        else:
+            weekly_rate = rates / n
+            charged = weekly_rate > 0
+            safe_rate = np.where(charged, weekly_rate, 1.0)
+            payment = np.where(charged, principals * safe_rate / (1 - (1 + safe_rate) ** -n), principals / n)
+            interest = n * payment - principals
+        return principals + interest
+
+    @staticmethod
+    def schedule(priced, index):
+        """The schedule of one priced loan as a list of weekly installments"""
+        return [
+            {
+                "week": week + 1,
+                "amount": float(priced["installments"][index, week]),
+                "principal": float(priced["principal"][index, week]),
+                "interest": float(priced["interest"][index, week]),
+                "balance": float(priced["balance"][index, week])
+            }
+            for week in range(int(priced["terms"][index]))
+        ]
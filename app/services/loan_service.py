@@ -0,0 +1,69 @@
+# app/services/loan_service.py
+from app import db
+from app.models.loan import LoanStatus, LoanRepayment
+from app.services.loan_pricing import LoanPricingEngine
+from datetime import datetime, timedelta
+
+class LoanService:
+    @staticmethod
+    def build_repayment_schedules(loans, start):
+        """Build the weekly repayment installments of many loans, pricing each interest method in one pass"""
+        by_method = {}
+        for loan in loans:
+            by_method.setdefault(loan.interest_method or 'flat', []).append(loan)
+
+        repayments = []
+        for method, priced_loans in by_method.items():
+            priced = LoanPricingEngine.price(
+                [loan.amount for loan in priced_loans],
+                [loan.interest_rate for loan in priced_loans],
+                [loan.duration_weeks for loan in priced_loans],
+                method
+            )
+            installments = priced["installments"].tolist()
+            principal = priced["principal"].tolist()
+            interest = priced["interest"].tolist()
+            for index, loan in enumerate(priced_loans):
+                repayments.extend(
+                    LoanRepayment(
+                        amount=installments[index][week],
+                        principal_amount=principal[index][week],
+                        interest_amount=interest[index][week],
+                        due_date=start + timedelta(weeks=week + 1),
+                        loan=loan
+                    )
+                    for week in range(loan.duration_weeks)
+                )
+        return repayments
+
+    @staticmethod
+    def build_repayment_schedule(loan, start):
+        """Build the weekly repayment installments of a loan starting from start"""
+        return LoanService.build_repayment_schedules([loan], start)
+
+    @staticmethod
+    def approve_many(loans, approver_id, approved_at=None):
+        """Mark pending loans approved and schedule all their repayments (caller commits)"""
+        approved_at = approved_at or datetime.utcnow()
+
+        for loan in loans:
+            loan.status = LoanStatus.APPROVED
+            loan.approved_by_id = approver_id
+            loan.approved_at = approved_at
+            loan.due_date = approved_at + timedelta(weeks=loan.duration_weeks)
+
+        repayments = LoanService.build_repayment_schedules(loans, approved_at)
+        db.session.add_all(repayments)
+        return repayments
+
+    @staticmethod
+    def approve(loan, approver_id, approved_at=None):
+        """Mark a pending loan approved and schedule its repayments (caller commits)"""
+        return LoanService.approve_many([loan], approver_id, approved_at)
+
+    @staticmethod
+    def reject(loan, approver_id, rejected_at=None):
+        """Mark a pending loan rejected (caller commits)"""
+        loan.status = LoanStatus.REJECTED
+        loan.approved_by_id = approver_id
+        loan.approved_at = rejected_at or datetime.utcnow()
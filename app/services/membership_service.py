@@ -0,0 +1,77 @@
+# app/services/membership_service.py
+from app import db
+from app.models.groups import group_members
+from app.models.notification import NotificationType
+from app.models.user import User
+from app.services.notification_service import NotificationService
+from sqlalchemy import select, func, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime
+
+class MembershipService:
+    @staticmethod
+    def add_members(group, identifiers, added_by):
+        """
+        Add many users to a group by username or email: one query resolves them all,
+        one INSERT ... ON CONFLICT DO NOTHING adds whoever is not a member yet, and one
+        insert creates their welcome notifications. Returns (results, notification_ids),
+        with one {identifier, status, user_id} result per entry in the order given;
+        the caller commits and then queues the notification emails.
+        """
+        entries = [identifier.strip() for identifier in identifiers]
+        lookup = {entry for entry in entries if entry}
+        users = db.session.execute(
+            select(User.id, User.username, User.email).where(or_(
+                User.username.in_(lookup),
+                func.lower(User.email).in_({entry.lower() for entry in lookup})
+            ))
+        ).all() if lookup else []
+        by_identifier = {}
+        for user in users:
+            by_identifier[user.username] = user
+            by_identifier[user.email.lower()] = user
+
+        resolved = {}
+        for entry in entries:
+            user = by_identifier.get(entry) or by_identifier.get(entry.lower())
+            if user:
+                resolved.setdefault(user.id, user)
+
+        added = set()
+        if resolved:
+            joined_at = datetime.utcnow()
+            added = set(db.session.execute(
+                pg_insert(group_members).values([
+                    {'group_id': group.id, 'user_id': user_id, 'is_admin': 0, 'joined_at': joined_at}
+                    for user_id in resolved
+                ]).on_conflict_do_nothing().returning(group_members.c.user_id)
+            ).scalars())
+
+        results, seen = [], set()
+        for entry in entries:
+            user = by_identifier.get(entry) or by_identifier.get(entry.lower())
+            if not entry:
+                status = 'invalid'
+            elif user is None:
+                status = 'not_found'
+            elif user.id in seen:
+                status = 'duplicate'
+            elif user.id in added:
+                status = 'added'
+            else:
+                status = 'already_member'
+            if user is not None:
+                seen.add(user.id)
+            results.append({'identifier': entry, 'status': status, 'user_id': user.id if user else None})
+
+        notification_ids = NotificationService.bulk_create_notifications([
+            {
+                'type': NotificationType.GROUP_WELCOME,
+                'recipient_id': user_id,
+                'sender_id': added_by.id,
+                'group_id': group.id,
+                'message': f"Welcome to {group.name}! {added_by.username} added you to the group"
+            }
+            for user_id in sorted(added)
+        ])
+        return results, notification_ids
@@ -5,6 +5,7 @@ import json
 from flask import current_app
 import os
 from app.models.transaction import Transaction
+from app.utils.metrics import track_outbound
 
 def get_mpesa_credentials():
     """Fetch M-Pesa credentials from environment variables."""
@@ -18,21 +19,30 @@ def get_mpesa_credentials():
 
     return consumer_key, consumer_secret, passkey, business_shortcode
 
+MPESA_SANDBOX_URL = "https://sandbox.safaricom.co.ke"
+
+def get_mpesa_base_url():
+    """Daraja base URL: the sandbox, unless MPESA_BASE_URL points elsewhere (e.g. a local stand-in)"""
+    return (os.getenv('MPESA_BASE_URL') or MPESA_SANDBOX_URL).rstrip('/')
+
 class MpesaService:
     def __init__(self):
-        self.auth_url = "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
-        self.stk_push_url = "https://sandbox.safaricom.co.ke/mpesa/stkpush/v1/processrequest"
-        self.callback_url = "https://yourdomain.com/api/mpesa/callback"  # Update with your domain
+        base_url = get_mpesa_base_url()
+        self.auth_url = f"{base_url}/oauth/v1/generate?grant_type=client_credentials"
+        self.stk_push_url = f"{base_url}/mpesa/stkpush/v1/processrequest"
+        self.callback_url = os.getenv('MPESA_CALLBACK_URL', "https://yourdomain.com/api/mpesa/callback")  # Update with your domain
         
     def get_access_token(self):
         """Get OAuth access token from M-Pesa"""
         consumer_key, consumer_secret, _, _ = get_mpesa_credentials()
         
-        response = requests.get(
-            self.auth_url,
-            auth=(consumer_key, consumer_secret),
-            headers={'Content-Type': 'application/json'}
-        )
+        with track_outbound('mpesa', 'oauth') as call:
+            response = requests.get(
+                self.auth_url,
+                auth=(consumer_key, consumer_secret),
+                headers={'Content-Type': 'application/json'}
+            )
+            call.ok = response.ok
         
         if response.status_code == 200:
             return response.json().get('access_token')
@@ -73,11 +83,13 @@ class MpesaService:
         current_app.logger.info("STK Push Request Payload: %s", json.dumps(payload))
         current_app.logger.info("STK Push Request Headers: %s", headers)
         
-        response = requests.post(
-            self.stk_push_url,
-            headers=headers,
-            json=payload
-        )
+        with track_outbound('mpesa', 'stk_push') as call:
+            response = requests.post(
+                self.stk_push_url,
+                headers=headers,
+                json=payload
+            )
+            call.ok = response.ok
         
         # Log the response for debugging
         current_app.logger.info("STK Push Response: %s", response.text)
@@ -3,7 +3,10 @@ from app.models.notification import Notification, NotificationType
 from app.services.email_service import EmailService
 from app.models.user import User
 from app.models.groups import Group, group_members
+from app.services.task_queue import enqueue
 from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 
 class NotificationService:
@@ -47,6 +50,61 @@ class NotificationService:
             current_app.logger.error(f"Failed to create notification: {str(e)}")
             return None
             
+    @staticmethod
+    def bulk_create_notifications(entries):
+        """
+        Insert many notifications with a single statement, without committing.
+        Pass the returned IDs to queue_notification_emails once the caller commits.
+        """
+        if not entries:
+            return []
+            
+        created_at = datetime.utcnow()
+        rows = [{
+            'type': entry['type'].value if isinstance(entry['type'], NotificationType) else entry['type'],
+            'message': entry['message'][:255],
+            'recipient_id': entry['recipient_id'],
+            'sender_id': entry.get('sender_id'),
+            'group_id': entry.get('group_id'),
+            'reference_id': entry.get('reference_id'),
+            'reference_amount': entry.get('reference_amount'),
+            'created_at': created_at,
+            'read': False,
+            'emailed': False
+        } for entry in entries]
+        
+        return list(db.session.scalars(insert(Notification).returning(Notification.id), rows))
+        
+    @staticmethod
+    def queue_notification_emails(notification_ids):
+        """Send the emails for already committed notifications in the background"""
+        if notification_ids:
+            enqueue(NotificationService._send_queued_emails, list(notification_ids))
+            
+    @staticmethod
+    def _send_queued_emails(notification_ids):
+        """Load notifications with their recipients in one query and email them"""
+        notifications = Notification.query.options(
+            joinedload(Notification.recipient),
+            joinedload(Notification.sender),
+            joinedload(Notification.group)
+        ).filter(Notification.id.in_(notification_ids)).all()
+        
+        emailed_ids = []
+        for notification in notifications:
+            if notification.recipient and notification.recipient.email and notification.group:
+                if NotificationService._send_notification_email(
+                    notification, notification.recipient, notification.sender, notification.group
+                ):
+                    emailed_ids.append(notification.id)
+                    
+        if emailed_ids:
+            Notification.query.filter(Notification.id.in_(emailed_ids)).update(
+                {Notification.emailed: True}, synchronize_session=False
+            )
+            db.session.commit()
+        return len(emailed_ids)
+            
     @staticmethod
     def _send_notification_email(notification, recipient, sender, group):
         """
@@ -55,7 +113,7 @@ class NotificationService:
         # Base URL for dashboard links
         base_url = current_app.config.get('FRONTEND_URL', 'https://group-savings.vercel.app')
         
-        if notification.type == NotificationType.CONTRIBUTION:
+        if notification.type == NotificationType.CONTRIBUTION.value:
             # For contribution notifications
             template = EmailService.get_contribution_template()
             context = {
@@ -69,7 +127,7 @@ class NotificationService:
             }
             subject = f"New Contribution to {group.name}"
             
-        elif notification.type == NotificationType.WITHDRAWAL_REQUEST:
+        elif notification.type == NotificationType.WITHDRAWAL_REQUEST.value:
             # For withdrawal request notifications
             template = EmailService.get_withdrawal_request_template()
             context = {
@@ -82,7 +140,7 @@ class NotificationService:
             }
             subject = f"Withdrawal Request for {group.name}"
             
-        elif notification.type == NotificationType.WITHDRAWAL_APPROVED:
+        elif notification.type == NotificationType.WITHDRAWAL_APPROVED.value:
             # For withdrawal approval notifications
             template = EmailService.get_withdrawal_approval_template()
             context = {
@@ -95,7 +153,7 @@ class NotificationService:
             }
             subject = f"Withdrawal Approved for {group.name}"
             
-        elif notification.type == NotificationType.WITHDRAWAL_REJECTED:
+        elif notification.type == NotificationType.WITHDRAWAL_REJECTED.value:
             # For withdrawal rejection notifications
             template = EmailService.get_withdrawal_rejection_template()
             context = {
@@ -108,6 +166,17 @@ class NotificationService:
             }
             subject = f"Withdrawal Request Rejected for {group.name}"
             
+        elif notification.type == NotificationType.GROUP_WELCOME.value:
+            # For members added to a group
+            template = EmailService.get_group_welcome_template()
+            context = {
+                'recipient_name': recipient.username,
+                'sender_name': sender.username if sender else 'An admin',
+                'group_name': group.name,
+                'dashboard_url': f"{base_url}/dashboard/group/{group.id}"
+            }
+            subject = f"Welcome to {group.name}"
+            
         else:
             # Generic notification
             template = """
@@ -317,7 +386,7 @@ class NotificationService:
             group_members, User.id == group_members.c.user_id
         ).filter(
             group_members.c.group_id == group_id,
-            group_members.c.is_admin == True
+            group_members.c.is_admin == 1
         ).all()
 
         for admin in admins:
@@ -375,7 +444,7 @@ class NotificationService:
             group_members, User.id == group_members.c.user_id
         ).filter(
             group_members.c.group_id == group_id,
-            group_members.c.is_admin == True
+            group_members.c.is_admin == 1
         ).all()
         
         for admin in admins:
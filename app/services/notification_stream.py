@@ -0,0 +1,188 @@
+# app/services/notification_stream.py
+import json
+import queue
+import logging
+import threading
+import time
+from app import db
+from app.models.notification import Notification
+from app.utils.pg_listener import ChannelListener, database_dsn
+
+logger = logging.getLogger(__name__)
+
+# Channel the notifications table's insert trigger publishes on
+NOTIFICATION_CHANNEL = 'notifications'
+# Comment line sent to idle streams so proxies keep them open
+HEARTBEAT_SECONDS = 15
+# Streams are closed after this long; the browser reconnects and resumes from its last event id
+STREAM_MAX_SECONDS = 3600
+# Browser reconnect delay, in milliseconds
+RECONNECT_MILLISECONDS = 3000
+# Events buffered per client; a client that falls further behind catches up from the database
+SUBSCRIBER_QUEUE_SIZE = 256
+REPLAY_LIMIT = 100
+# Ids come from a sequence at insert but events arrive at commit, so a notification can
+# reach the stream after ones with higher ids; allow this long for it to catch up
+REORDER_SECONDS = 30
+# Ids above the settled one carried in each event id, bounding the Last-Event-ID header
+CURSOR_MAX_IDS = 50
+
+# Queued to every client when events may have been missed, so it re-reads from the database
+RESYNC = object()
+
+class NotificationBroker:
+    """
+    One LISTEN connection per worker process, fanning notifications out to the
+    process's connected clients by recipient.
+    """
+
+    def __init__(self, channel=NOTIFICATION_CHANNEL):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._listener = ChannelListener(
+            channel, self._handle, on_reconnect=self._resync_all, name='notification-listener'
+        )
+
+    def subscribe(self, user_id, dsn):
+        """Register a client of user_id; returns the queue its events arrive on"""
+        events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(events)
+        self._listener.ensure_started(dsn)
+        return events
+
+    def unsubscribe(self, user_id, events):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(events)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, event):
+        """Hand an event to the recipient's clients in this process"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.get('recipient_id'), ()))
+        for events in subscribers:
+            self._offer(events, event)
+
+    def _handle(self, payload):
+        try:
+            self.publish(json.loads(payload))
+        except ValueError:
+            logger.warning(f"Ignoring malformed notification payload: {payload!r}")
+
+    def _resync_all(self):
+        # Anything published while the listener was reconnecting was missed
+        with self._lock:
+            subscribers = [events for group in self._subscribers.values() for events in group]
+        for events in subscribers:
+            self._offer(events, RESYNC)
+
+    @staticmethod
+    def _offer(events, event):
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            # The client is far behind; drop its backlog and have it re-read from the database
+            with events.mutex:
+                events.queue.clear()
+            events.put_nowait(RESYNC)
+
+broker = NotificationBroker()
+
+def parse_cursor(value):
+    """
+    Split an event id into the id everything up to which was sent and the ids above it
+    sent since; raises ValueError if it is malformed
+    """
+    settled, _, recent = str(value).partition(':')
+    return int(settled), [int(notification_id) for notification_id in recent.split(',') if notification_id]
+
+def _format_event(event, cursor):
+    return f"id: {cursor}\nevent: notification\ndata: {json.dumps(event)}\n\n"
+
+class NotificationStream:
+    @staticmethod
+    def _missed(user_id, after_id, sent):
+        """
+        The user's notifications after after_id other than those already sent, releasing
+        the session's connection afterwards
+        """
+        try:
+            return [
+                notification.to_dict()
+                for notification in Notification.query.filter(
+                    Notification.recipient_id == user_id,
+                    Notification.id > after_id,
+                    Notification.id.not_in(sent)
+                ).order_by(Notification.id).limit(REPLAY_LIMIT)
+            ]
+        finally:
+            db.session.close()
+
+    @staticmethod
+    def events(user_id, last_event_id=None):
+        """
+        Server-sent event stream of the user's new notifications. Subscribes before
+        replaying anything missed since last_event_id so nothing falls in between.
+        Events can arrive out of id order, so rather than a high-water mark each event
+        id carries the id everything up to which was sent plus the ids above it sent in
+        the last REORDER_SECONDS; a notification that commits late behind a higher id
+        is still delivered, live or on replay, and is not sent twice.
+        """
+        events = broker.subscribe(user_id, database_dsn(db.engine))
+        if last_event_id is None:
+            # Start from the newest existing notification; earlier ones come from GET /api/notifications
+            settled = db.session.query(db.func.coalesce(db.func.max(Notification.id), 0)).filter(
+                Notification.recipient_id == user_id
+            ).scalar()
+            db.session.close()
+            recent = []
+        else:
+            settled, recent = parse_cursor(last_event_id)
+        # Ids sent recently, in the order they went out, with when; resumed ones count as just sent
+        sent = dict.fromkeys(recent, time.monotonic())
+
+        def cursor():
+            # Anything sent longer than REORDER_SECONDS ago no longer has stragglers to wait for
+            nonlocal settled
+            expired = time.monotonic() - REORDER_SECONDS
+            while sent and next(iter(sent.values())) < expired:
+                notification_id = next(iter(sent))
+                del sent[notification_id]
+                settled = max(settled, notification_id)
+            pending = sorted(notification_id for notification_id in sent if notification_id > settled)
+            if len(pending) > CURSOR_MAX_IDS:
+                # Keep the event id short after a burst by settling the oldest
+                settled = pending[-CURSOR_MAX_IDS - 1]
+                pending = pending[-CURSOR_MAX_IDS:]
+            return f"{settled}:{','.join(map(str, pending))}" if pending else str(settled)
+
+        def send(event):
+            sent[event['id']] = time.monotonic()
+            return _format_event(event, cursor())
+
+        try:
+            yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+            replaying = last_event_id is not None
+            closes_at = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < closes_at:
+                if replaying:
+                    # Page through everything missed before taking live events again
+                    missed = NotificationStream._missed(user_id, settled, list(sent))
+                    for event in missed:
+                        yield send(event)
+                    replaying = len(missed) == REPLAY_LIMIT
+                    continue
+                try:
+                    event = events.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESYNC:
+                    replaying = True
+                elif event['id'] not in sent:
+                    yield send(event)
+        finally:
+            broker.unsubscribe(user_id, events)
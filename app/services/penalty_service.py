@@ -0,0 +1,96 @@
+# app/services/penalty_service.py
+from app import db
+from app.models.loan import Loan, LoanStatus, LoanRepayment, RepaymentStatus, GroupLoanSettings, LoanPenalty
+from sqlalchemy import select, update, func, literal, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime, date, time, timedelta
+
+# Matches the GroupLoanSettings column default for groups without settings
+DEFAULT_LATE_PENALTY_RATE = 2.0
+
+class PenaltyService:
+    @staticmethod
+    def accrue_penalties(accrual_date=None):
+        """
+        Accrue one day of late penalties on every overdue installment across all groups.
+        late_penalty_rate is read as a percentage of the unpaid installment per week
+        overdue, so each accrual date adds rate / 7 percent. Running it again for
+        the same date adds nothing. Returns a summary; the caller commits.
+        """
+        accrual_date = accrual_date or date.today()
+        # Installments due before the start of the accrual date are overdue on it
+        cutoff = datetime.combine(accrual_date, time.min)
+        now = datetime.utcnow()
+
+        outstanding = LoanRepayment.amount - func.coalesce(LoanRepayment.amount_paid, 0.0)
+        rate = func.coalesce(GroupLoanSettings.late_penalty_rate, DEFAULT_LATE_PENALTY_RATE)
+
+        overdue = select(
+            LoanRepayment.id,
+            Loan.id,
+            Loan.group_id,
+            literal(accrual_date),
+            outstanding * rate / 100.0 / 7.0,
+            rate,
+            literal(now)
+        ).join(
+            Loan, Loan.id == LoanRepayment.loan_id
+        ).outerjoin(
+            GroupLoanSettings, GroupLoanSettings.group_id == Loan.group_id
+        ).where(
+            LoanRepayment.status != RepaymentStatus.PAID,
+            LoanRepayment.due_date < cutoff,
+            Loan.status.in_([LoanStatus.APPROVED, LoanStatus.ACTIVE]),
+            outstanding > 0,
+            rate > 0
+        )
+
+        # Write the day's ledger entries in one statement; the unique key makes reruns no-ops
+        accrued = db.session.execute(
+            pg_insert(LoanPenalty).from_select(
+                ['repayment_id', 'loan_id', 'group_id', 'accrual_date', 'amount', 'rate', 'created_at'],
+                overdue
+            ).on_conflict_do_nothing(
+                index_elements=['repayment_id', 'accrual_date']
+            ).returning(LoanPenalty.repayment_id, LoanPenalty.amount)
+        ).all()
+
+        # Roll only the newly written entries into the installments' running totals
+        if accrued:
+            repayments = LoanRepayment.__table__
+            db.session.execute(
+                update(repayments)
+                .where(repayments.c.id == bindparam('repayment_id'))
+                .values(penalty_amount=repayments.c.penalty_amount + bindparam('penalty')),
+                [{'repayment_id': repayment_id, 'penalty': amount} for repayment_id, amount in accrued]
+            )
+
+        # Store the overdue state so reads no longer compute it per row
+        marked = db.session.execute(
+            update(LoanRepayment)
+            .where(
+                LoanRepayment.status != RepaymentStatus.PAID,
+                LoanRepayment.due_date < cutoff,
+                (LoanRepayment.status != RepaymentStatus.LATE) | LoanRepayment.is_overdue.is_(False)
+            )
+            .values(status=RepaymentStatus.LATE, is_overdue=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        return {
+            "accrual_date": accrual_date.isoformat(),
+            "penalties_written": len(accrued),
+            "penalty_total": sum(amount for _, amount in accrued),
+            "installments_marked_late": marked
+        }
+
+    @staticmethod
+    def accrue_range(start_date, end_date):
+        """Accrue every date from start_date to end_date inclusive, committing per date"""
+        summaries = []
+        current = start_date
+        while current <= end_date:
+            summaries.append(PenaltyService.accrue_penalties(current))
+            db.session.commit()
+            current += timedelta(days=1)
+        return summaries
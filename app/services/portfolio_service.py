@@ -0,0 +1,140 @@
+# app/services/portfolio_service.py
+from app import db
+from app.models.loan import Loan, LoanStatus, LoanRepayment, RepaymentStatus
+from app.models.user import User
+from app.utils.cache import TTLCache
+from app.utils.invalidation import invalidation_bus
+from sqlalchemy import select, func, literal
+from datetime import datetime
+
+# Portfolio at risk buckets, in days past due
+PAR_THRESHOLDS = (7, 30, 90)
+TOP_BORROWERS = 5
+
+# Loans with money still out
+OUTSTANDING_STATUSES = (LoanStatus.APPROVED, LoanStatus.ACTIVE, LoanStatus.DEFAULTED)
+# Loans that were ever disbursed
+DISBURSED_STATUSES = OUTSTANDING_STATUSES + (LoanStatus.PAID,)
+
+portfolio_cache = TTLCache(ttl=3600)
+invalidation_bus.watch(portfolio_cache, 'loans')
+
+class PortfolioService:
+    @staticmethod
+    def _loan_positions(group_id, as_of):
+        """Per-loan outstanding principal, amount due and days past due, as a subquery"""
+        paid_share = func.least(
+            func.coalesce(LoanRepayment.amount_paid, 0.0) / func.nullif(LoanRepayment.amount, 0.0), 1.0
+        )
+        unpaid = LoanRepayment.status != RepaymentStatus.PAID
+        principal_repaid = func.coalesce(
+            func.sum(func.coalesce(LoanRepayment.principal_amount, 0.0) * func.coalesce(paid_share, 0.0)), 0.0
+        )
+        amount_due = func.coalesce(func.sum(
+            LoanRepayment.amount - func.coalesce(LoanRepayment.amount_paid, 0.0) + LoanRepayment.penalty_amount
+        ).filter(unpaid), 0.0)
+        oldest_unpaid_due = func.min(LoanRepayment.due_date).filter(unpaid)
+
+        return select(
+            Loan.id,
+            Loan.user_id,
+            Loan.status,
+            Loan.amount,
+            func.greatest(Loan.amount - principal_repaid, 0.0).label('outstanding_principal'),
+            amount_due.label('amount_due'),
+            func.greatest(
+                func.coalesce(func.date_part('epoch', literal(as_of) - oldest_unpaid_due) / 86400.0, 0.0), 0.0
+            ).label('days_past_due')
+        ).outerjoin(
+            LoanRepayment, LoanRepayment.loan_id == Loan.id
+        ).where(
+            Loan.group_id == group_id,
+            Loan.status.in_(DISBURSED_STATUSES)
+        ).group_by(Loan.id).subquery()
+
+    @staticmethod
+    def compute_portfolio(group_id, as_of=None):
+        """Aggregate a group's loan exposure in two set-based queries"""
+        as_of = as_of or datetime.utcnow()
+        positions = PortfolioService._loan_positions(group_id, as_of)
+        outstanding = positions.c.status.in_(OUTSTANDING_STATUSES)
+
+        totals = db.session.execute(select(
+            func.count().label('disbursed_loans'),
+            func.count().filter(outstanding).label('outstanding_loans'),
+            func.count().filter(positions.c.status == LoanStatus.DEFAULTED).label('defaulted_loans'),
+            func.coalesce(func.sum(positions.c.amount), 0.0).label('disbursed_principal'),
+            func.coalesce(func.sum(positions.c.amount).filter(
+                positions.c.status == LoanStatus.DEFAULTED), 0.0).label('defaulted_principal'),
+            func.coalesce(func.sum(positions.c.outstanding_principal).filter(outstanding), 0.0).label('outstanding_principal'),
+            func.coalesce(func.sum(positions.c.amount_due).filter(outstanding), 0.0).label('amount_due'),
+            *[
+                func.coalesce(func.sum(positions.c.outstanding_principal).filter(
+                    outstanding, positions.c.days_past_due > days), 0.0).label(f'at_risk_{days}')
+                for days in PAR_THRESHOLDS
+            ]
+        ).select_from(positions)).one()
+
+        borrowers = db.session.execute(
+            select(
+                positions.c.user_id,
+                User.username,
+                func.count().label('loans'),
+                func.sum(positions.c.outstanding_principal).label('outstanding_principal')
+            ).join(
+                User, User.id == positions.c.user_id
+            ).where(
+                outstanding, positions.c.outstanding_principal > 0
+            ).group_by(
+                positions.c.user_id, User.username
+            ).order_by(func.sum(positions.c.outstanding_principal).desc())
+        ).all()
+
+        total = totals.outstanding_principal
+        shares = [row.outstanding_principal / total for row in borrowers] if total > 0 else []
+
+        return {
+            "group_id": group_id,
+            "as_of": as_of.isoformat(),
+            "disbursed_loans": totals.disbursed_loans,
+            "outstanding_loans": totals.outstanding_loans,
+            "disbursed_principal": totals.disbursed_principal,
+            "outstanding_principal": total,
+            "amount_due": totals.amount_due,
+            "portfolio_at_risk": {
+                f"par_{days}": {
+                    "amount": getattr(totals, f'at_risk_{days}'),
+                    "ratio": getattr(totals, f'at_risk_{days}') / total if total > 0 else 0.0
+                }
+                for days in PAR_THRESHOLDS
+            },
+            "default_rate": {
+                "loans": totals.defaulted_loans / totals.disbursed_loans if totals.disbursed_loans else 0.0,
+                "principal": totals.defaulted_principal / totals.disbursed_principal if totals.disbursed_principal else 0.0
+            },
+            "concentration": {
+                "borrowers": len(borrowers),
+                # Herfindahl-Hirschman index of outstanding principal: 1 / borrowers when spread evenly, 1 for a single borrower
+                "hhi": sum(share * share for share in shares),
+                "top_borrowers": [
+                    {
+                        "user_id": row.user_id,
+                        "username": row.username,
+                        "loans": row.loans,
+                        "outstanding_principal": row.outstanding_principal,
+                        "share": share
+                    }
+                    for row, share in zip(borrowers[:TOP_BORROWERS], shares)
+                ]
+            }
+        }
+
+    @staticmethod
+    def get_portfolio(group_id):
+        """Cached portfolio of a group; returns (portfolio, was_cached)"""
+        return portfolio_cache.get_or_set(group_id, lambda: PortfolioService.compute_portfolio(group_id))
+
+    @staticmethod
+    def invalidate(*group_ids):
+        """Drop cached portfolios in every worker after their loans change"""
+        invalidation_bus.publish('loans', *group_ids)
@@ -0,0 +1,323 @@
+# app/services/statement_service.py
+import csv
+import io
+import logging
+from app import db
+from app.models.groups import Group
+from app.models.loan import Loan, LoanStatus, LoanRepayment
+from app.models.statement import MemberStatement, StatementStatus
+from app.models.transaction import Transaction, TransactionType
+from app.models.user import User
+from app.services.balance_service import settled_contribution
+from app.services.task_queue import enqueue
+from flask import current_app, render_template_string
+from itsdangerous import URLSafeTimedSerializer
+from sqlalchemy import select, update, func, case, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime, time, timedelta
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_FORMATS = ('csv', 'html')
+# How long a download link stays valid, in seconds
+STATEMENT_LINK_MAX_AGE = 3600
+# A statement still pending after this long is assumed lost with its worker and may be claimed again
+STATEMENT_PENDING_TIMEOUT = timedelta(minutes=10)
+
+DISBURSED_STATUSES = (LoanStatus.APPROVED, LoanStatus.ACTIVE, LoanStatus.PAID, LoanStatus.DEFAULTED)
+
+STATEMENT_HTML = """
+<html>
+<body style="font-family: Arial, sans-serif;">
+    <h2>{{ group_name }} statement for {{ username }}</h2>
+    <p>{{ period_start }} to {{ period_end }}</p>
+    <p>Opening balance: {{ '%.2f' | format(opening_balance) }}</p>
+    <table border="1" cellpadding="4" cellspacing="0">
+        <tr><th>Date</th><th>Type</th><th>Description</th><th>Amount</th><th>Balance</th></tr>
+        {% for entry in entries %}
+        <tr>
+            <td>{{ entry.timestamp }}</td><td>{{ entry.type }}</td><td>{{ entry.description or '' }}</td>
+            <td>{{ '%.2f' | format(entry.amount) }}</td><td>{{ '%.2f' | format(entry.balance) }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    <p>
+        Contributions: {{ '%.2f' | format(totals.contributed) }},
+        withdrawals: {{ '%.2f' | format(totals.withdrawn) }},
+        dividends: {{ '%.2f' | format(totals.dividends) }}
+    </p>
+    <p><strong>Closing balance: {{ '%.2f' | format(closing_balance) }}</strong></p>
+    {% if loans %}
+    <h3>Loans</h3>
+    <table border="1" cellpadding="4" cellspacing="0">
+        <tr><th>Loan</th><th>Approved</th><th>Amount</th><th>Status</th><th>Repaid in period</th><th>Outstanding</th></tr>
+        {% for loan in loans %}
+        <tr>
+            <td>{{ loan.id }}</td><td>{{ loan.approved_at or '' }}</td><td>{{ '%.2f' | format(loan.amount) }}</td>
+            <td>{{ loan.status }}</td><td>{{ '%.2f' | format(loan.repaid_in_period) }}</td>
+            <td>{{ '%.2f' | format(loan.outstanding) }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    {% endif %}
+</body>
+</html>
+"""
+
+def _period_bounds(period_start, period_end):
+    """Datetime bounds of an inclusive date period"""
+    return datetime.combine(period_start, time.min), datetime.combine(period_end + timedelta(days=1), time.min)
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='member-statement')
+
+class StatementService:
+    @staticmethod
+    def activity_marker(user_id, group_id, period_end):
+        """
+        Fingerprint everything a statement up to period_end is built from, in one query.
+        It changes with any new, settled or removed ledger entry and any loan or
+        repayment change, so a stored statement is current exactly while it matches.
+        """
+        _, end = _period_bounds(period_end, period_end)
+        member_loans = and_(Loan.user_id == user_id, Loan.group_id == group_id, Loan.created_at < end)
+        member_ledger = and_(
+            Transaction.user_id == user_id,
+            Transaction.group_id == group_id,
+            Transaction.timestamp < end
+        )
+        parts = [
+            select(func.count()).where(member_ledger),
+            select(func.max(Transaction.id)).where(member_ledger),
+            select(func.count()).where(member_ledger, settled_contribution()),
+            select(func.count()).where(member_loans),
+            select(func.max(Loan.updated_at)).where(member_loans),
+            select(func.coalesce(func.sum(LoanRepayment.amount_paid), 0.0)).join(
+                Loan, Loan.id == LoanRepayment.loan_id
+            ).where(member_loans)
+        ]
+        row = db.session.execute(select(*[part.scalar_subquery() for part in parts])).one()
+        return '|'.join('' if value is None else str(value) for value in row)
+
+    @staticmethod
+    def build(user_id, group_id, period_start, period_end):
+        """
+        Compute a member's statement: the opening balance from the ledger before the
+        period, then the period's own ledger entries and loans.
+        """
+        start, end = _period_bounds(period_start, period_end)
+        member_ledger = and_(
+            Transaction.user_id == user_id,
+            Transaction.group_id == group_id,
+            or_(
+                and_(Transaction.transaction_type == TransactionType.CONTRIBUTION, settled_contribution()),
+                Transaction.transaction_type.in_([TransactionType.WITHDRAWAL, TransactionType.DIVIDEND])
+            )
+        )
+
+        # Same entries and clock as the period below, so nothing settling across the
+        # boundary falls between the two
+        signed_amount = case(
+            (Transaction.transaction_type == TransactionType.WITHDRAWAL, -Transaction.amount),
+            else_=Transaction.amount
+        )
+        opening_balance = db.session.execute(
+            select(func.coalesce(func.sum(signed_amount), 0.0)).where(member_ledger, Transaction.timestamp < start)
+        ).scalar()
+
+        ledger = db.session.execute(
+            select(
+                Transaction.id, Transaction.timestamp, Transaction.transaction_type,
+                Transaction.amount, Transaction.description
+            ).where(
+                member_ledger,
+                Transaction.timestamp >= start,
+                Transaction.timestamp < end
+            ).order_by(Transaction.timestamp, Transaction.id)
+        ).all()
+
+        balance = opening_balance
+        totals = {'contributed': 0.0, 'withdrawn': 0.0, 'dividends': 0.0}
+        entries = []
+        for row in ledger:
+            if row.transaction_type == TransactionType.WITHDRAWAL:
+                amount = -row.amount
+                totals['withdrawn'] += row.amount
+            elif row.transaction_type == TransactionType.DIVIDEND:
+                amount = row.amount
+                totals['dividends'] += row.amount
+            else:
+                amount = row.amount
+                totals['contributed'] += row.amount
+            balance += amount
+            entries.append({
+                'id': row.id,
+                'timestamp': row.timestamp.isoformat(),
+                'type': row.transaction_type.name.lower(),
+                'description': row.description,
+                'amount': amount,
+                'balance': balance
+            })
+
+        # Loans disbursed by the end of the period, with what was repaid during and by then
+        paid_by_end = LoanRepayment.paid_at < end
+        loans = db.session.execute(
+            select(
+                Loan.id, Loan.amount, Loan.status, Loan.approved_at,
+                func.coalesce(func.sum(LoanRepayment.amount), 0.0).label('total_due'),
+                func.coalesce(func.sum(LoanRepayment.amount_paid).filter(
+                    LoanRepayment.paid_at >= start, paid_by_end), 0.0).label('repaid_in_period'),
+                func.coalesce(func.sum(LoanRepayment.amount_paid).filter(paid_by_end), 0.0).label('repaid')
+            ).outerjoin(
+                LoanRepayment, LoanRepayment.loan_id == Loan.id
+            ).where(
+                Loan.user_id == user_id,
+                Loan.group_id == group_id,
+                Loan.status.in_(DISBURSED_STATUSES),
+                Loan.approved_at < end
+            ).group_by(Loan.id).order_by(Loan.approved_at)
+        ).all()
+
+        names = db.session.execute(select(
+            select(User.username).where(User.id == user_id).scalar_subquery().label('username'),
+            select(Group.name).where(Group.id == group_id).scalar_subquery().label('name')
+        )).one()
+
+        return {
+            'username': names.username,
+            'group_name': names.name,
+            'period_start': period_start.isoformat(),
+            'period_end': period_end.isoformat(),
+            'opening_balance': opening_balance,
+            'closing_balance': balance,
+            'totals': totals,
+            'entries': entries,
+            'loans': [
+                {
+                    'id': loan.id,
+                    'amount': loan.amount,
+                    'status': loan.status.value,
+                    'approved_at': loan.approved_at.date().isoformat() if loan.approved_at else None,
+                    'repaid_in_period': loan.repaid_in_period,
+                    'outstanding': max(loan.total_due - loan.repaid, 0.0)
+                }
+                for loan in loans
+            ]
+        }
+
+    @staticmethod
+    def render_csv(statement):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['statement', statement['group_name'], statement['username']])
+        writer.writerow(['period', statement['period_start'], statement['period_end']])
+        writer.writerow(['opening_balance', f"{statement['opening_balance']:.2f}"])
+        writer.writerow(['date', 'type', 'description', 'amount', 'balance'])
+        for entry in statement['entries']:
+            writer.writerow([entry['timestamp'], entry['type'], entry['description'] or '',
+                             f"{entry['amount']:.2f}", f"{entry['balance']:.2f}"])
+        for name, amount in statement['totals'].items():
+            writer.writerow([f'total_{name}', f"{amount:.2f}"])
+        writer.writerow(['closing_balance', f"{statement['closing_balance']:.2f}"])
+        if statement['loans']:
+            writer.writerow(['loan', 'approved_at', 'amount', 'status', 'repaid_in_period', 'outstanding'])
+            for loan in statement['loans']:
+                writer.writerow([loan['id'], loan['approved_at'] or '', f"{loan['amount']:.2f}", loan['status'],
+                                 f"{loan['repaid_in_period']:.2f}", f"{loan['outstanding']:.2f}"])
+        return buffer.getvalue()
+
+    @staticmethod
+    def render_html(statement):
+        return render_template_string(STATEMENT_HTML, **statement)
+
+    @staticmethod
+    def request_statement(user_id, group_id, period_start, period_end, format='csv'):
+        """
+        Get the member's statement for the period, queueing generation unless a current
+        one is stored or already being generated. Returns (statement, queued).
+        """
+        now = datetime.utcnow()
+        marker = StatementService.activity_marker(user_id, group_id, period_end)
+        key = and_(
+            MemberStatement.user_id == user_id,
+            MemberStatement.group_id == group_id,
+            MemberStatement.period_start == period_start,
+            MemberStatement.period_end == period_end,
+            MemberStatement.format == format
+        )
+
+        # First request for this period claims it by creating it
+        claimed_id = db.session.execute(
+            pg_insert(MemberStatement).values(
+                user_id=user_id, group_id=group_id, period_start=period_start, period_end=period_end,
+                format=format, status=StatementStatus.PENDING.value, requested_at=now
+            ).on_conflict_do_nothing(
+                constraint='uq_member_statements_member_period_format'
+            ).returning(MemberStatement.id)
+        ).scalar()
+
+        # Otherwise claim it only if it is out of date and nobody is working on it
+        if claimed_id is None:
+            claimed_id = db.session.execute(
+                update(MemberStatement).where(
+                    key,
+                    ~and_(MemberStatement.status == StatementStatus.READY.value,
+                          MemberStatement.activity_marker == marker),
+                    ~and_(MemberStatement.status == StatementStatus.PENDING.value,
+                          MemberStatement.requested_at > now - STATEMENT_PENDING_TIMEOUT)
+                ).values(
+                    status=StatementStatus.PENDING.value, requested_at=now, error=None
+                ).returning(MemberStatement.id)
+            ).scalar()
+        db.session.commit()
+
+        if claimed_id is not None:
+            enqueue(StatementService.generate, claimed_id)
+        statement = db.session.execute(select(MemberStatement).where(key)).scalar_one()
+        return statement, claimed_id is not None
+
+    @staticmethod
+    def generate(statement_id):
+        """Build and render a claimed statement and store it (runs in the background)"""
+        statement = db.session.get(MemberStatement, statement_id)
+        try:
+            # Taken first, so activity that lands while building marks the result stale
+            marker = StatementService.activity_marker(statement.user_id, statement.group_id, statement.period_end)
+            data = StatementService.build(
+                statement.user_id, statement.group_id, statement.period_start, statement.period_end
+            )
+            render = StatementService.render_html if statement.format == 'html' else StatementService.render_csv
+            statement.content = render(data)
+            statement.activity_marker = marker
+            statement.opening_balance = data['opening_balance']
+            statement.closing_balance = data['closing_balance']
+            statement.status = StatementStatus.READY.value
+            statement.completed_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Statement {statement_id} failed: {str(e)}", exc_info=True)
+            statement.status = StatementStatus.FAILED.value
+            statement.error = str(e)[:255]
+            statement.completed_at = datetime.utcnow()
+            db.session.commit()
+
+    @staticmethod
+    def is_current(statement):
+        """Whether a ready statement still matches the member's activity"""
+        return (
+            statement.status == StatementStatus.READY.value and
+            statement.activity_marker == StatementService.activity_marker(
+                statement.user_id, statement.group_id, statement.period_end
+            )
+        )
+
+    @staticmethod
+    def download_token(statement):
+        """Signed token for downloading this rendering of the statement without logging in"""
+        return _serializer().dumps({'id': statement.id, 'marker': statement.activity_marker})
+
+    @staticmethod
+    def load_download_token(token):
+        """Verify a download token; raises itsdangerous.BadSignature (or SignatureExpired) if invalid"""
+        return _serializer().loads(token, max_age=STATEMENT_LINK_MAX_AGE)
@@ -0,0 +1,31 @@
+# app/services/task_queue.py
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Small per-process pool for work that should not hold up the HTTP response (emails etc.)
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('BACKGROUND_WORKERS', 4)),
+    thread_name_prefix='background'
+)
+
+def enqueue(func, *args, **kwargs):
+    """Run func in the background inside the current app's context"""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                logger.error(f"Background task {func.__name__} failed", exc_info=True)
+                raise
+            finally:
+                # Each app context gets its own session; hand its connection back
+                db.session.remove()
+
+    return _executor.submit(run)
@@ -1,8 +1,11 @@
 # app/services/transaction_service.py
 from app import db
 from app.models.transaction import Transaction, TransactionType
-from app.models.groups import Group
-from sqlalchemy import func
+from app.models.groups import Group, group_members
+from app.models.notification import NotificationType
+from app.services.balance_service import BalanceService
+from app.services.notification_service import NotificationService
+from sqlalchemy import func, select, insert, update
 from datetime import datetime, timedelta
 
 class TransactionService:
@@ -69,4 +72,64 @@ class TransactionService:
                 "month": item[0].strftime('%Y-%m'),
                 "amount": item[1]
             } for item in monthly_contributions]
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def record_cash_contributions(group, recorder_id, contributions, description=None):
+        """
+        Record a meeting's cash contributions, given as dicts of user_id, amount and an
+        optional description, with one statement each for the ledger, balances, rollups,
+        the group's savings and the members' digest notifications. All contributors must
+        already be checked to be members. Returns (transaction_ids, notification_ids);
+        the caller commits and then queues the notification emails.
+        """
+        now = datetime.utcnow()
+        total = sum(entry['amount'] for entry in contributions)
+
+        # Lock the group before the member balances, the order every savings write uses
+        BalanceService.lock_group(group.id)
+
+        # Credited first, so balances seeded from the ledger do not already include this batch
+        BalanceService.record_contributions(
+            group.id, [(entry['user_id'], entry['amount']) for entry in contributions]
+        )
+        transaction_ids = list(db.session.scalars(insert(Transaction).returning(Transaction.id), [
+            {
+                'amount': entry['amount'],
+                'description': entry.get('description') or description or 'Cash contribution',
+                'transaction_type': TransactionType.CONTRIBUTION,
+                'timestamp': now,
+                'status': 'completed',
+                'user_id': entry['user_id'],
+                'group_id': group.id
+            }
+            for entry in contributions
+        ]))
+        db.session.execute(
+            update(Group).where(Group.id == group.id).values(
+                current_amount=func.coalesce(Group.current_amount, 0.0) + total
+            )
+        )
+
+        # One digest per member instead of one notification per contribution per member
+        own = {}
+        for entry in contributions:
+            own[entry['user_id']] = own.get(entry['user_id'], 0.0) + entry['amount']
+        summary = f"{len(contributions)} cash contributions totalling Ksh.{total:.2f} were recorded for {group.name}"
+        member_ids = db.session.execute(
+            select(group_members.c.user_id).where(group_members.c.group_id == group.id)
+        ).scalars().all()
+        notification_ids = NotificationService.bulk_create_notifications([
+            {
+                'type': NotificationType.CONTRIBUTION,
+                'recipient_id': member_id,
+                'sender_id': recorder_id,
+                'group_id': group.id,
+                'message': f"{summary}, including yours of Ksh.{own[member_id]:.2f}" if member_id in own else summary,
+                'reference_amount': own.get(member_id, total)
+            }
+            for member_id in member_ids
+            if member_id != recorder_id or member_id in own
+        ])
+        return transaction_ids, notification_ids
+
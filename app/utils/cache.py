@@ -0,0 +1,62 @@
+# app/utils/cache.py
+import threading
+import time
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache whose entries expire after ttl seconds.
+    Each worker process holds its own copy; caches watching the invalidation bus
+    (app.utils.invalidation) hear about every worker's writes, and the TTL bounds
+    how stale a copy can get otherwise.
+    """
+
+    def __init__(self, ttl=300, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get a live entry, or default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                self._evict()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_set(self, key, factory):
+        """Get a live entry or compute and store it; returns (value, was_cached)"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value, True
+        value = factory()
+        self.set(key, value)
+        return value, False
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        # Drop expired entries first, then the one closest to expiring
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        if len(self._entries) >= self.maxsize:
+            del self._entries[min(self._entries, key=lambda key: self._entries[key][0])]
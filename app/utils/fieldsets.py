@@ -0,0 +1,34 @@
+# app/utils/fieldsets.py
+from flask import request
+
+# Always returned, so clients can tell the items apart
+ALWAYS_INCLUDED = ('id',)
+
+class InvalidFields(ValueError):
+    """?fields= named keys the endpoint does not return"""
+
+def requested_fields(available):
+    """
+    Keys asked for with ?fields=amount,status (plus id), in the order of available,
+    or all of available when the parameter is missing or empty. Unknown keys raise
+    InvalidFields.
+    """
+    raw = request.args.get('fields', '')
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    if not names:
+        return list(available)
+    unknown = names.difference(available)
+    if unknown:
+        raise InvalidFields(
+            f"Unknown fields: {', '.join(sorted(unknown))}. Available fields are: {', '.join(available)}"
+        )
+    names.update(ALWAYS_INCLUDED)
+    return [name for name in available if name in names]
+
+def rows_to_dicts(fields, rows):
+    """Dicts of rows selected with one column per field, in the same order"""
+    return [dict(zip(fields, row)) for row in rows]
+
+def only(data, fields):
+    """The given keys of a to_dict result"""
+    return {key: value for key, value in data.items() if key in fields}
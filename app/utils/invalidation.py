@@ -0,0 +1,202 @@
+# app/utils/invalidation.py
+import os
+import re
+import json
+import uuid
+import logging
+import threading
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+from app import db
+from app.utils.pg_listener import ChannelListener, database_dsn
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'cache_invalidation'
+# Events per NOTIFY, keeping payloads well under PostgreSQL's 8000 byte limit
+EVENTS_PER_MESSAGE = 200
+
+# Tables whose writes are published: the entity they invalidate and the column
+# holding the group the row belongs to, which is what every cache here is keyed by
+TRACKED_TABLES = {
+    'groups': ('groups', 'id'),
+    'group_members': ('group_members', 'group_id'),
+    'group_loan_settings': ('group_loan_settings', 'group_id'),
+    'transactions': ('transactions', 'group_id'),
+    'loans': ('loans', 'group_id'),
+    'loan_penalties': ('loans', 'group_id')
+}
+
+# Identifies this process, so it skips its own messages when they come back
+_NODE = uuid.uuid4().hex
+
+def _origin():
+    return f"{_NODE}:{os.getpid()}"
+
+class MemoryBackend:
+    """Keeps invalidations within the process; for tests and single-process runs"""
+
+    def send(self, connection, payloads):
+        pass
+
+    def start(self, bus, engine):
+        pass
+
+class PostgresBackend:
+    """Publishes invalidations with NOTIFY and applies other processes' from a LISTEN thread"""
+
+    def __init__(self, channel=INVALIDATION_CHANNEL):
+        self.channel = channel
+        self._listener = None
+
+    def send(self, connection, payloads):
+        for payload in payloads:
+            connection.execute(select(func.pg_notify(self.channel, payload)))
+
+    def start(self, bus, engine):
+        if self._listener is None:
+            self._listener = ChannelListener(
+                self.channel, bus.receive, on_reconnect=bus.clear_all, name='invalidation-listener'
+            )
+        self._listener.ensure_started(database_dsn(engine))
+
+class InvalidationBus:
+    """
+    Publishes (entity, id) invalidations to every worker process so in-process
+    caches can keep long TTLs.
+
+    Writes to the tracked tables are picked up from the session: ORM objects at
+    flush, and INSERT/UPDATE/DELETE statements when they execute, reading the group
+    ids from their parameters (a statement without them invalidates the whole
+    entity). With the PostgreSQL backend the events are sent with NOTIFY inside the
+    transaction being committed, so other processes only hear about committed
+    changes. This process applies them right after the commit. An id of None means
+    every key of the entity.
+    """
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self._watchers = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_INVALIDATION_BACKEND')
+        if backend is None:
+            backend = 'postgres' if (app.config.get('SQLALCHEMY_DATABASE_URI') or '').startswith('postgres') else 'memory'
+        self.backend = PostgresBackend() if backend == 'postgres' else MemoryBackend()
+        app.before_request(self.ensure_listening)
+
+    def ensure_listening(self):
+        """Start receiving other processes' invalidations, once per process"""
+        self.backend.start(self, db.engine)
+
+    def watch(self, cache, *entities):
+        """Invalidate cache keys (group ids) whenever one of the entities changes"""
+        with self._lock:
+            for entity in entities:
+                self._watchers.setdefault(entity, []).append(cache)
+
+    def invalidate_on_commit(self, session, entity, *ids):
+        """Publish invalidations once the session's current transaction commits"""
+        pending = session.info.setdefault('invalidation_events', set())
+        pending.update((entity, key) for key in ids or (None,))
+
+    def publish(self, entity, *ids):
+        """Publish invalidations now, for changes that are already committed"""
+        events = {(entity, key) for key in ids or (None,)}
+        self.apply(events)
+        if not isinstance(self.backend, MemoryBackend):
+            with db.engine.begin() as connection:
+                self.backend.send(connection, self._payloads(events))
+
+    def apply(self, events):
+        """Invalidate this process's watching caches"""
+        for entity, key in events:
+            for cache in self._watchers.get(entity, ()):
+                if key is None:
+                    cache.clear()
+                else:
+                    cache.invalidate(key)
+
+    def receive(self, payload):
+        message = json.loads(payload)
+        if message.get('origin') != _origin():
+            self.apply((entity, key) for entity, key in message['events'])
+
+    def clear_all(self):
+        # Invalidations sent while the listener was reconnecting were missed
+        with self._lock:
+            caches = {id(cache): cache for caches in self._watchers.values() for cache in caches}
+        for cache in caches.values():
+            cache.clear()
+
+    @staticmethod
+    def _payloads(events):
+        events = sorted(events, key=lambda event: (event[0], event[1] is not None, event[1] or 0))
+        return [
+            json.dumps({'origin': _origin(), 'events': events[start:start + EVENTS_PER_MESSAGE]})
+            for start in range(0, len(events), EVENTS_PER_MESSAGE)
+        ]
+
+invalidation_bus = InvalidationBus()
+
+def _statement_ids(statement, parameters, column, dialect):
+    """Group ids a DML statement binds for column, or None if it binds none"""
+    ids = set()
+    rows = parameters if isinstance(parameters, (list, tuple)) else [parameters or {}]
+    for row in rows:
+        if row.get(column) is not None:
+            ids.add(row[column])
+    if ids:
+        return ids
+    # Literal values and WHERE clauses are bound as column, column_1, column_m0, ...
+    pattern = re.compile(rf"^{column}(_m?\d+)?$")
+    for name, value in statement.compile(dialect=dialect).params.items():
+        if value is not None and pattern.match(name):
+            ids.update(value if isinstance(value, (list, tuple, set)) else [value])
+    return ids or None
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tracked = TRACKED_TABLES.get(getattr(instance, '__tablename__', None))
+        if tracked:
+            entity, column = tracked
+            invalidation_bus.invalidate_on_commit(session, entity, getattr(instance, column))
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_statement(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    tracked = TRACKED_TABLES.get(getattr(table, 'name', None))
+    if tracked:
+        entity, column = tracked
+        session = orm_execute_state.session
+        ids = _statement_ids(
+            orm_execute_state.statement, orm_execute_state.parameters, column, session.get_bind().dialect
+        )
+        invalidation_bus.invalidate_on_commit(session, entity, *(ids or ()))
+
+@event.listens_for(Session, 'before_commit')
+def _send_invalidations(session):
+    if isinstance(invalidation_bus.backend, MemoryBackend):
+        return
+    # Flush first so the commit's own changes are included
+    session.flush()
+    events = session.info.get('invalidation_events')
+    if events:
+        # NOTIFY is delivered when, and only if, this transaction commits
+        invalidation_bus.backend.send(session.connection(), InvalidationBus._payloads(events))
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    events = session.info.pop('invalidation_events', None)
+    if events:
+        invalidation_bus.apply(events)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_invalidations(session, previous_transaction):
+    # Only a rollback of the whole transaction; a savepoint's leaves the rest to commit
+    if previous_transaction.parent is None:
+        session.info.pop('invalidation_events', None)
@@ -0,0 +1,66 @@
+# app/utils/json_provider.py
+import json
+import decimal
+import dataclasses
+from datetime import date
+from enum import Enum
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+def _default(o):
+    """Types neither encoder handles natively, serialized the way to_dict does"""
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, date):
+        # ISO 8601 like .isoformat(), not the HTTP date format Flask's encoder uses
+        return o.isoformat()
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider encoding responses with orjson when it is installed. Datetimes,
+    dates, enums and Decimals can be passed as they are: datetimes come out as
+    ISO 8601 (exactly what .isoformat() gives), enums as their values and Decimals
+    as strings, with either encoder, so views need not convert them first.
+    Otherwise it behaves like Flask's default provider: keys are sorted, non-string
+    keys become strings and debug responses are indented.
+    """
+
+    def _orjson_options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._orjson_options()).decode()
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # Bytes straight from the encoder, skipping the str round trip
+        body = orjson.dumps(obj, default=_default, option=self._orjson_options()) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
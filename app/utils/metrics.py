@@ -0,0 +1,108 @@
+# app/utils/metrics.py
+import os
+import time
+import hmac
+from contextlib import contextmanager
+from flask import Response, g, request
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Label for requests that matched no route, so scanners cannot blow up cardinality
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint',
+    ['method', 'endpoint'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+REQUEST_COUNT = Counter(
+    'http_requests_total', 'Requests by endpoint and status',
+    ['method', 'endpoint', 'status']
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'Requests being handled',
+    ['method'], multiprocess_mode='livesum'
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements executed per request',
+    ['endpoint'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250)
+)
+REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds', 'Time spent in SQL statements per request',
+    ['endpoint'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+OUTBOUND_LATENCY = Histogram(
+    'outbound_request_duration_seconds', 'Calls to external services (M-Pesa, TinyPesa, SMTP)',
+    ['service', 'operation', 'outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+class OutboundCall:
+    """Handed to the body of track_outbound, which sets ok to False for a failed response"""
+
+    def __init__(self):
+        self.ok = True
+
+@contextmanager
+def track_outbound(service, operation):
+    """Time a call to an external service, labelled error if it raised or was marked not ok"""
+    started = time.perf_counter()
+    call = OutboundCall()
+    try:
+        yield call
+    except BaseException:
+        call.ok = False
+        raise
+    finally:
+        OUTBOUND_LATENCY.labels(service, operation, 'ok' if call.ok else 'error').observe(
+            time.perf_counter() - started
+        )
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule else UNMATCHED_ENDPOINT
+
+def metrics_registry():
+    """The registry to expose: every worker's metrics under gunicorn, this process's otherwise"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def init_metrics(app):
+    """Record request metrics and serve them on /metrics"""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.labels(request.method).inc()
+
+    @app.after_request
+    def record_request(response):
+        if 'request_started' in g:
+            endpoint = _endpoint()
+            REQUEST_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - g.request_started)
+            REQUEST_COUNT.labels(request.method, endpoint, response.status_code).inc()
+            # Counted by the query inspector
+            stats = g.get('query_stats')
+            if stats is not None:
+                REQUEST_DB_QUERIES.labels(endpoint).observe(stats.count)
+                REQUEST_DB_SECONDS.labels(endpoint).observe(stats.seconds)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        # Runs even when a view raised, so the gauge never drifts upwards
+        if g.pop('request_started', None) is not None:
+            REQUESTS_IN_PROGRESS.labels(request.method).dec()
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus exposition, behind METRICS_TOKEN when one is configured"""
+        token = app.config.get('METRICS_TOKEN')
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            return Response("Unauthorized\n", status=401, mimetype='text/plain')
+        return Response(generate_latest(metrics_registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,16 @@
+# app/utils/pagination.py
+from flask_sqlalchemy.pagination import SelectPagination
+from app import db
+
+class RowPagination(SelectPagination):
+    """Pagination of a select of columns, whose items are the result rows rather than their first column"""
+
+    def _query_items(self):
+        select = self._query_args['select'].limit(self.per_page).offset(self._query_offset)
+        return list(self._query_args['session'].execute(select))
+
+def paginate_rows(select, page, per_page):
+    """Same as db.paginate(select, error_out=False), for selects that skip loading ORM objects"""
+    return RowPagination(
+        select=select, session=db.session(), page=page, per_page=per_page, max_per_page=None, error_out=False
+    )
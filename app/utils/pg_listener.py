@@ -0,0 +1,79 @@
+# app/utils/pg_listener.py
+import os
+import select
+import logging
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# How often an idle listener checks its connection is still alive
+HEARTBEAT_SECONDS = 15
+MAX_RECONNECT_DELAY_SECONDS = 30
+
+def database_dsn(engine):
+    """libpq connection string for an engine's database"""
+    return engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+
+class ChannelListener:
+    """
+    Background thread holding one LISTEN connection on a PostgreSQL channel and
+    handing each payload to on_message. After a dropped connection comes back,
+    on_reconnect runs, since anything published meanwhile was missed.
+
+    The thread waits on the connection's socket with select() and only polls
+    psycopg2 when it is readable, so under gevent's monkey patching it yields like
+    any other greenlet instead of blocking the worker.
+    """
+
+    def __init__(self, channel, on_message, on_reconnect=None, name=None):
+        self.channel = channel
+        self.on_message = on_message
+        self.on_reconnect = on_reconnect
+        self.name = name or f"{channel}-listener"
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self, dsn):
+        """Start listening unless this process already is"""
+        with self._lock:
+            # Started lazily so each forked worker gets its own
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, args=(dsn,), name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self, dsn):
+        delay, connected_before = 1, False
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(dsn)
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cursor = connection.cursor()
+                cursor.execute(f"LISTEN {self.channel}")
+                if connected_before and self.on_reconnect:
+                    self.on_reconnect()
+                connected_before, delay = True, 1
+
+                while True:
+                    if select.select([connection], [], [], HEARTBEAT_SECONDS) == ([], [], []):
+                        # Idle: make sure the connection is still alive
+                        cursor.execute("SELECT 1")
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        try:
+                            self.on_message(notify.payload)
+                        except Exception:
+                            logger.error(f"Failed to handle a message on {self.channel}", exc_info=True)
+            except Exception:
+                logger.error(f"Listener on {self.channel} lost its connection", exc_info=True)
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+            finally:
+                if connection is not None:
+                    connection.close()
@@ -0,0 +1,284 @@
+# app/utils/profiler.py
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import tempfile
+import threading
+from flask import Response, g, jsonify, request
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+# Request header carrying a profile token minted with `flask profile-token`
+PROFILE_HEADER = 'X-Profile'
+PROFILE_TOKEN_SALT = 'request-profile'
+DEFAULT_INTERVAL_MS = 2
+DEFAULT_MAX_PROFILES = 50
+# Sampling stops after this many samples (a minute at the default interval), bounding
+# the memory and file size of a profile however long the request runs
+DEFAULT_MAX_SAMPLES = 30000
+# Deepest stack recorded per sample
+MAX_STACK_DEPTH = 200
+
+def profile_serializer(key):
+    return URLSafeTimedSerializer(key, salt=PROFILE_TOKEN_SALT)
+
+def not_sampled(view):
+    """Leave a view out of PROFILE_SAMPLE_RATE sampling, for streams that stay open indefinitely"""
+    view.profile_sampled = False
+    return view
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack from a background thread every interval. Each
+    sample is weighted by the wall time since the previous one and, where the
+    platform has per-thread CPU clocks, by the CPU time the thread used meanwhile,
+    giving a wall and a CPU profile of the same run.
+    """
+
+    def __init__(self, thread_id, interval, max_samples=DEFAULT_MAX_SAMPLES):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_samples = max_samples
+        self.truncated = False
+        self.frames = []
+        self._frame_index = {}
+        self.samples = []
+        self.wall_weights = []
+        self.cpu_weights = []
+        self._cpu_clock = None
+        if hasattr(time, 'pthread_getcpuclockid'):
+            try:
+                self._cpu_clock = time.pthread_getcpuclockid(thread_id)
+            except OSError:
+                pass
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = self.stopped_at = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _cpu_time(self):
+        try:
+            return time.clock_gettime(self._cpu_clock) if self._cpu_clock is not None else 0.0
+        except OSError:
+            # The thread has exited
+            return 0.0
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self.frames)
+                self.frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _run(self):
+        last_wall, last_cpu = time.perf_counter(), self._cpu_time()
+        while not self._stop.wait(self.interval):
+            if len(self.samples) >= self.max_samples:
+                self.truncated = True
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            now_wall, now_cpu = time.perf_counter(), self._cpu_time()
+            self.samples.append(self._stack(frame))
+            self.wall_weights.append(now_wall - last_wall)
+            self.cpu_weights.append(max(now_cpu - last_cpu, 0.0))
+            last_wall, last_cpu = now_wall, now_cpu
+            del frame
+
+    def to_speedscope(self, name):
+        """The profile in speedscope's file format, as wall and (if available) CPU profiles"""
+        def profile(kind, weights):
+            return {
+                'type': 'sampled',
+                'name': f"{name} ({kind})",
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': self.samples,
+                'weights': weights
+            }
+
+        profiles = [profile('wall', self.wall_weights)]
+        if self._cpu_clock is not None:
+            profiles.append(profile('cpu', self.cpu_weights))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'activeProfileIndex': 0,
+            'exporter': 'group-savings-backend',
+            'shared': {'frames': self.frames},
+            'profiles': profiles
+        }
+
+class ProfileStore:
+    """Keeps the newest max_profiles profiles on disk, each with a small metadata file"""
+
+    def __init__(self, directory, max_profiles=DEFAULT_MAX_PROFILES):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    @staticmethod
+    def new_id():
+        # Ids sort by creation time, which is what the ring buffer drops by
+        return f"{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profile_id, metadata, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        metadata = {**metadata, 'id': profile_id}
+        for suffix, content in (('.json', profile), ('.meta.json', metadata)):
+            path = os.path.join(self.directory, profile_id + suffix)
+            with open(path + '.tmp', 'w') as file:
+                json.dump(content, file)
+            os.replace(path + '.tmp', path)
+        self._prune()
+
+    def _ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len('.meta.json')] for name in names if name.endswith('.meta.json'))
+
+    def _prune(self):
+        for profile_id in self._ids()[:-self.max_profiles]:
+            for suffix in ('.meta.json', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + suffix))
+                except FileNotFoundError:
+                    # Another worker pruned it first
+                    pass
+
+    def index(self):
+        """Metadata of the stored profiles, newest first"""
+        entries = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(os.path.join(self.directory, profile_id + '.meta.json')) as file:
+                    entries.append(json.load(file))
+            except (FileNotFoundError, ValueError):
+                continue
+        return entries
+
+    def path(self, profile_id):
+        """Path of a stored profile, or None"""
+        if profile_id not in self._ids():
+            return None
+        return os.path.join(self.directory, profile_id + '.json')
+
+def init_profiler(app):
+    """
+    Profile requests that carry a valid X-Profile token, or a PROFILE_SAMPLE_RATE
+    share of all requests, and serve the stored profiles on /profiles. Nothing is
+    registered unless PROFILER_KEY or a sample rate is configured, so a disabled
+    profiler costs nothing.
+    """
+    key = app.config.get('PROFILER_KEY')
+    sample_rate = float(app.config.get('PROFILE_SAMPLE_RATE') or 0)
+    if not key and sample_rate <= 0:
+        return
+
+    serializer = profile_serializer(key) if key else None
+    max_age = int(app.config.get('PROFILE_TOKEN_MAX_AGE', 3600))
+    interval = float(app.config.get('PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS)) / 1000
+    max_samples = int(app.config.get('PROFILE_MAX_SAMPLES') or DEFAULT_MAX_SAMPLES)
+    store = ProfileStore(
+        app.config.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'group-savings-profiles'),
+        int(app.config.get('PROFILE_MAX_PROFILES', DEFAULT_MAX_PROFILES))
+    )
+
+    def has_valid_token():
+        token = request.headers.get(PROFILE_HEADER)
+        if not token or serializer is None:
+            return False
+        try:
+            serializer.loads(token, max_age=max_age)
+            return True
+        except (BadSignature, SignatureExpired):
+            return False
+
+    def is_sampled():
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return False
+        view = app.view_functions.get(request.endpoint)
+        return getattr(view, 'profile_sampled', True)
+
+    @app.before_request
+    def start_profile():
+        if request.path.startswith('/profiles'):
+            return
+        if has_valid_token() or is_sampled():
+            g.profile_id = store.new_id()
+            g.profiler = SamplingProfiler(threading.get_ident(), interval, max_samples)
+            g.profiler.start()
+
+    @app.after_request
+    def tag_profiled_response(response):
+        if 'profiler' in g:
+            response.headers['X-Profile-Id'] = g.profile_id
+        return response
+
+    @app.teardown_request
+    def finish_profile(exc):
+        # After a streamed body has been sent, so the profile covers all of it
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.stop()
+        name = f"{request.method} {request.path}"
+        store.save(g.profile_id, {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.url_rule.rule if request.url_rule else None,
+            'duration_ms': round((profiler.stopped_at - profiler.started_at) * 1000, 1),
+            'samples': len(profiler.samples),
+            # Only the first max_samples samples were kept
+            'truncated': profiler.truncated,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        }, profiler.to_speedscope(name))
+
+    def require_token():
+        if not has_valid_token():
+            return jsonify({"error": f"A valid {PROFILE_HEADER} token is required"}), 401
+        return None
+
+    @app.route('/profiles')
+    def list_profiles():
+        """Stored request profiles, newest first"""
+        denied = require_token()
+        if denied:
+            return denied
+        return jsonify({"profiles": store.index()}), 200
+
+    @app.route('/profiles/<profile_id>')
+    def download_profile(profile_id):
+        """A stored profile as speedscope JSON (open it at https://www.speedscope.app)"""
+        denied = require_token()
+        if denied:
+            return denied
+        path = store.path(profile_id)
+        if path is None:
+            return jsonify({"error": "Profile not found"}), 404
+        with open(path) as file:
+            body = file.read()
+        return Response(body, mimetype='application/json', headers={
+            'Content-Disposition': f'attachment; filename="profile-{profile_id}.speedscope.json"'
+        })
@@ -0,0 +1,126 @@
+# app/utils/query_inspector.py
+import re
+import time
+import logging
+from collections import Counter
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text included in a log line
+MAX_LOGGED_STATEMENT = 500
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more SQL statements than its declared budget (raised under TESTING)"""
+
+class RequestQueries:
+    """SQL statements run while handling one request, counted by statement shape"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def add(self, statement, elapsed):
+        self.count += 1
+        self.seconds += elapsed
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold):
+        """(statement, times) for every shape run at least threshold times, most repeated first"""
+        return [(statement, times) for statement, times in self.shapes.most_common() if times >= threshold]
+
+def statement_shape(statement):
+    """Statement text on one line, truncated for logging"""
+    text = re.sub(r'\s+', ' ', statement).strip()
+    return text if len(text) <= MAX_LOGGED_STATEMENT else text[:MAX_LOGGED_STATEMENT] + '...'
+
+def parameter_shape(parameters, executemany=False):
+    """Names and types of the bound parameters, without their values"""
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} x {parameter_shape(rows[0])}" if rows else "0 x {}"
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return '{}'
+
+class QueryInspector:
+    """
+    Watches every SQL statement the app runs. Statements slower than
+    SLOW_QUERY_MS are logged with the shape of their parameters; within a request,
+    the same statement run N_PLUS_ONE_THRESHOLD times or more is logged as a likely
+    N+1 when the request ends. Per-request counts are kept on g.query_stats for
+    the metrics and for query_budget.
+    """
+
+    def __init__(self):
+        self.slow_query_ms = 250.0
+        self.n_plus_one_threshold = 10
+
+    def init_app(self, app):
+        self.slow_query_ms = float(app.config.get('SLOW_QUERY_MS', self.slow_query_ms))
+        self.n_plus_one_threshold = int(app.config.get('N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold))
+        app.before_request(self.start_request)
+        app.teardown_request(self.finish_request)
+
+    def start_request(self):
+        g.query_stats = RequestQueries()
+
+    def finish_request(self, exc):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return
+        for statement, times in stats.repeated(self.n_plus_one_threshold):
+            logger.warning(
+                f"Possible N+1 in {request.method} {request.path}: {times} x {statement_shape(statement)}"
+            )
+
+    def record(self, statement, parameters, executemany, elapsed):
+        if elapsed * 1000 >= self.slow_query_ms:
+            where = f" in {request.method} {request.path}" if has_request_context() else ""
+            logger.warning(
+                f"Slow query ({elapsed * 1000:.0f}ms){where}: {statement_shape(statement)} "
+                f"params {parameter_shape(parameters, executemany)}"
+            )
+        # Only statements run while handling a request count towards it
+        if has_request_context() and 'query_stats' in g:
+            g.query_stats.add(statement, elapsed)
+
+query_inspector = QueryInspector()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    query_inspector.record(statement, parameters, executemany, elapsed)
+
+@event.listens_for(Engine, 'handle_error')
+def _drop_query_timer(exception_context):
+    # The failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+def query_budget(limit):
+    """Decorator declaring the most SQL statements a view may run; raises under TESTING, logs otherwise"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            response = fn(*args, **kwargs)
+            stats = g.get('query_stats')
+            if stats is not None and stats.count > limit:
+                message = f"{request.method} {request.path} ran {stats.count} queries, over its budget of {limit}"
+                if current_app.testing:
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+        return wrapper
+    return decorator
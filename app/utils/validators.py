@@ -1,6 +1,7 @@
-from marshmallow import Schema, fields, validate, ValidationError
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
 import re
 from app.models.withdrawal_request import WithdrawalStatus
+from app.models.transaction import TransactionType
 
 class RegisterSchema(Schema):
     username = fields.Str(
@@ -45,6 +46,11 @@ class GroupSchema(Schema):
 
 class JoinGroupSchema(Schema):
     group_id = fields.Int(required=True)    
+
+class BulkMemberAddSchema(Schema):
+    """Schema for adding many members to a group by username or email"""
+    members = fields.List(fields.Str(validate=validate.Length(min=1, max=120)), required=True,
+                          validate=validate.Length(min=1, max=500))
     
 # app/utils/validators.py (append to existing file)
 from marshmallow import Schema, fields, validate, validates, ValidationError
@@ -60,6 +66,19 @@ class TransactionSchema(Schema):
             raise ValidationError("Amount must be positive")    
         
 
+class BatchContributionItemSchema(Schema):
+    """One member's cash contribution in a batch"""
+    user_id = fields.Int(required=True)
+    amount = fields.Float(required=True, validate=validate.Range(min=0.01))
+    description = fields.Str(required=False, allow_none=True, validate=validate.Length(max=255))
+
+class BatchContributionSchema(Schema):
+    """Schema for recording a meeting's cash contributions at once"""
+    group_id = fields.Int(required=True)
+    description = fields.Str(required=False, allow_none=True, validate=validate.Length(max=255))
+    contributions = fields.List(fields.Nested(BatchContributionItemSchema), required=True,
+                                validate=validate.Length(min=1, max=500))
+
 # withdrawal request validation
 class WithdrawalRequestSchema(Schema):
     """Schema for creating withdrawal requests"""
@@ -73,7 +92,94 @@ class WithdrawalActionSchema(Schema):
         [WithdrawalStatus.APPROVED.value, WithdrawalStatus.REJECTED.value]
     ))
     admin_comment = fields.Str(required=False)
+
+class WithdrawalBulkItemSchema(WithdrawalActionSchema):
+    """Schema for one entry of a bulk withdrawal action"""
+    withdrawal_id = fields.Int(required=True)
+
+class WithdrawalBulkActionSchema(Schema):
+    """Schema for approving/rejecting many withdrawal requests at once"""
+    actions = fields.List(fields.Nested(WithdrawalBulkItemSchema), required=True,
+                          validate=validate.Length(min=1, max=200))
+
+class LoanBulkItemSchema(Schema):
+    """Schema for one entry of a bulk loan action"""
+    loan_id = fields.Int(required=True)
+    action = fields.Str(required=True, validate=validate.OneOf(['approve', 'reject']))
+    reason = fields.Str(required=False)
+
+class LoanBulkActionSchema(Schema):
+    """Schema for approving/rejecting many loan requests at once"""
+    actions = fields.List(fields.Nested(LoanBulkItemSchema), required=True,
+                          validate=validate.Length(min=1, max=200))
+
+class LoanPolicyCandidateSchema(Schema):
+    """Schema for one set of loan settings to simulate"""
+    max_loan_multiplier = fields.Float(required=True, validate=validate.Range(min=0))
+    base_interest_rate = fields.Float(required=True, validate=validate.Range(min=0))
+    min_repayment_period = fields.Int(required=True, validate=validate.Range(min=1))
+    max_repayment_period = fields.Int(required=True, validate=validate.Range(min=1))
+
+    @validates_schema
+    def validate_periods(self, data, **kwargs):
+        if data['min_repayment_period'] > data['max_repayment_period']:
+            raise ValidationError("min_repayment_period must not be above max_repayment_period",
+                                  "max_repayment_period")
+
+class LoanPolicySimulationSchema(Schema):
+    """Schema for simulating candidate loan settings over a group's history"""
+    group_id = fields.Int(required=True)
+    candidates = fields.List(fields.Nested(LoanPolicyCandidateSchema), required=False,
+                             validate=validate.Length(min=1, max=50))
+    # Defaults to as many of 2000 as the group's size allows inline
+    scenarios = fields.Int(load_default=None, validate=validate.Range(min=100, max=20000))
+    horizon_weeks = fields.Int(load_default=26, validate=validate.Range(min=1, max=104))
+    seed = fields.Int(required=False, allow_none=True)
+
+class QueueItemSchema(Schema):
+    """Schema for one item of the admin review queue"""
+    type = fields.Str(required=True, validate=validate.OneOf(['withdrawal', 'loan']))
+    id = fields.Int(required=True)
+
+class QueueReleaseSchema(Schema):
+    """Schema for releasing claims on review queue items"""
+    items = fields.List(fields.Nested(QueueItemSchema), load_default=list,
+                        validate=validate.Length(max=200))
+
+class DividendDistributionSchema(Schema):
+    """Schema for sharing out a group's loan interest for a period"""
+    period_start = fields.Date(required=True)
+    period_end = fields.Date(required=True)
+    dry_run = fields.Bool(load_default=False)
+
+class TransactionExportSchema(Schema):
+    """Schema for the query string of a ledger export"""
+    format = fields.Str(load_default='csv', validate=validate.OneOf(['csv', 'jsonl']))
+    start_date = fields.Date(load_default=None)
+    end_date = fields.Date(load_default=None)
+    type = fields.List(
+        fields.Str(validate=validate.OneOf([t.name.lower() for t in TransactionType])),
+        load_default=list
+    )
+    after_id = fields.Int(load_default=None, validate=validate.Range(min=0))
+
+    @validates_schema
+    def validate_dates(self, data, **kwargs):
+        if data['start_date'] and data['end_date'] and data['start_date'] > data['end_date']:
+            raise ValidationError("start_date must not be after end_date", "end_date")
     
+class StatementRequestSchema(Schema):
+    """Schema for requesting a member statement"""
+    group_id = fields.Int(required=True)
+    period_start = fields.Date(required=True)
+    period_end = fields.Date(required=True)
+    format = fields.Str(load_default='csv', validate=validate.OneOf(['csv', 'html']))
+
+    @validates_schema
+    def validate_period(self, data, **kwargs):
+        if data['period_start'] > data['period_end']:
+            raise ValidationError("period_start must not be after period_end", "period_end")
+
 class GroupUpdateSchema(Schema):
     name = fields.Str(
         required=False,
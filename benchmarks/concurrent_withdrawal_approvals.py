@@ -0,0 +1,259 @@
+"""
+Concurrent withdrawal approval harness.
+
+Seeds a throwaway group against the PostgreSQL database in DATABASE_URL,
+files more withdrawal requests than each member's balance can cover and has
+several admin threads race to approve every one of them, while contributor
+threads keep paying into the same members' balances through the contribute
+endpoint. Afterwards it checks that nothing deadlocked or was approved twice,
+that no member balance or the group savings were overdrawn and that the
+balances still agree with the ledger, then reports approval throughput.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/concurrent_withdrawal_approvals.py --threads 8 --members 4
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.models.user import User
+from app.models.groups import Group
+from app.models.transaction import Transaction, TransactionType
+from app.models.withdrawal_request import WithdrawalRequest, WithdrawalStatus
+from app.models.member_balance import MemberBalance
+from app.services.balance_service import (
+    BalanceService, InsufficientBalanceError, InsufficientGroupFundsError, WithdrawalStateError
+)
+from fake_providers import FakeSmtp
+
+
+def seed(admin_count, member_count, withdrawal_count, contributed, withdrawal_amount):
+    """Create admins, members with savings and pending withdrawals exceeding each member's"""
+    tag = uuid.uuid4().hex[:8]
+    admins = [
+        User(username=f"bench_admin_{tag}_{i}", email=f"admin_{tag}_{i}@bench.local", password="x")
+        for i in range(admin_count)
+    ]
+    members = [
+        User(username=f"bench_member_{tag}_{i}", email=f"member_{tag}_{i}@bench.local", password="x")
+        for i in range(member_count)
+    ]
+    db.session.add_all(admins + members)
+    db.session.flush()
+
+    group = Group(name=f"Bench {tag}", target_amount=contributed * member_count * 10,
+                  current_amount=contributed * member_count, creator_id=admins[0].id)
+    db.session.add(group)
+    db.session.flush()
+    for admin in admins:
+        Group.add_member(group.id, admin.id, is_admin=True)
+    for member in members:
+        Group.add_member(group.id, member.id)
+
+    db.session.add_all([
+        Transaction(
+            amount=contributed, user_id=member.id, group_id=group.id,
+            transaction_type=TransactionType.CONTRIBUTION, status='completed'
+        )
+        for member in members
+    ])
+    db.session.flush()
+    for member in members:
+        BalanceService.ensure_balance(member.id, group.id)
+
+    # Filed without holds, so only the approval path stands between them and an overdraw.
+    # Interleaved across members, so consecutive approvals lock different balances.
+    withdrawals = [
+        WithdrawalRequest(amount=withdrawal_amount, user_id=members[i % member_count].id, group_id=group.id,
+                          description=f"bench {i}")
+        for i in range(withdrawal_count * member_count)
+    ]
+    db.session.add_all(withdrawals)
+    db.session.commit()
+    return [admin.id for admin in admins], [member.id for member in members], group.id, [w.id for w in withdrawals]
+
+
+def is_deadlock(error):
+    return 'deadlock detected' in str(error)
+
+
+def record(lock, outcomes, outcome, latencies=None, elapsed=None):
+    with lock:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if latencies is not None:
+            latencies.append(elapsed)
+
+
+def approve_all(app, admin_id, withdrawal_ids, barrier, outcomes, latencies, lock):
+    """Try to approve every withdrawal as one admin"""
+    with app.app_context():
+        barrier.wait()
+        for withdrawal_id in withdrawal_ids:
+            started = time.perf_counter()
+            try:
+                BalanceService.approve_withdrawal(withdrawal_id, admin_id, "bench")
+                db.session.commit()
+                outcome = 'approved'
+            except WithdrawalStateError:
+                db.session.rollback()
+                outcome = 'already_processed'
+            except (InsufficientBalanceError, InsufficientGroupFundsError):
+                db.session.rollback()
+                outcome = 'insufficient'
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_deadlock(e):
+                    raise
+                outcome = 'deadlock'
+            record(lock, outcomes, outcome, latencies, time.perf_counter() - started)
+        db.session.remove()
+
+
+def contribute_all(app, token, group_id, count, amount, barrier, contributions, lock):
+    """Contribute count times through the endpoint as one member"""
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    barrier.wait()
+    for _ in range(count):
+        response = client.post('/api/transactions/contribute', headers=headers, json={
+            'group_id': group_id, 'amount': amount, 'description': 'bench'
+        })
+        if response.status_code == 201:
+            outcome = 'contributed'
+        elif is_deadlock(response.get_json().get('details', '')):
+            outcome = 'deadlock'
+        else:
+            outcome = f'failed_{response.status_code}'
+        record(lock, contributions, outcome)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--threads', type=int, default=8, help="concurrent admins")
+    parser.add_argument('--members', type=int, default=4)
+    parser.add_argument('--withdrawals', type=int, default=100, help="withdrawal requests per member")
+    parser.add_argument('--contributed', type=float, default=5000.0, help="savings per member before the run")
+    parser.add_argument('--amount', type=float, default=100.0, help="amount per withdrawal")
+    parser.add_argument('--contributions', type=int, default=25, help="contributions per member during the run")
+    parser.add_argument('--contribution-amount', type=float, default=50.0)
+    args = parser.parse_args()
+
+    # Contribution notifications are emailed synchronously; give them somewhere to go
+    smtp = FakeSmtp().start()
+    os.environ.update({
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': str(smtp.port),
+        'SMTP_USERNAME': 'bench',
+        'SMTP_PASSWORD': 'bench',
+        'SMTP_USE_TLS': 'false'
+    })
+
+    app = create_app()
+    # The email service logs every message it sends at DEBUG
+    logging.getLogger().setLevel(logging.WARNING)
+    with app.app_context():
+        admin_ids, member_ids, group_id, withdrawal_ids = seed(
+            args.threads, args.members, args.withdrawals, args.contributed, args.amount
+        )
+        tokens = {member_id: create_access_token(identity=str(member_id)) for member_id in member_ids}
+
+    outcomes, contributions, latencies, lock = {}, {}, [], threading.Lock()
+    barrier = threading.Barrier(args.threads + args.members)
+    threads = [
+        threading.Thread(target=approve_all, args=(
+            app, admin_id, withdrawal_ids, barrier, outcomes, latencies, lock
+        ))
+        for admin_id in admin_ids
+    ] + [
+        threading.Thread(target=contribute_all, args=(
+            app, tokens[member_id], group_id, args.contributions, args.contribution_amount,
+            barrier, contributions, lock
+        ))
+        for member_id in member_ids
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    smtp.stop()
+
+    with app.app_context():
+        approved = dict(db.session.query(
+            WithdrawalRequest.user_id, func.count(WithdrawalRequest.id)
+        ).filter_by(group_id=group_id, status=WithdrawalStatus.APPROVED.value).group_by(WithdrawalRequest.user_id).all())
+        transactions_per_request = db.session.query(
+            Transaction.reference_id, func.count(Transaction.id)
+        ).filter(
+            Transaction.group_id == group_id,
+            Transaction.transaction_type == TransactionType.WITHDRAWAL
+        ).group_by(Transaction.reference_id).all()
+        ledger = dict(db.session.query(Transaction.user_id, func.sum(Transaction.amount)).filter(
+            Transaction.group_id == group_id,
+            Transaction.transaction_type == TransactionType.CONTRIBUTION
+        ).group_by(Transaction.user_id).all())
+        balances = {
+            balance.user_id: balance
+            for balance in MemberBalance.query.filter(MemberBalance.user_id.in_(member_ids), MemberBalance.group_id == group_id)
+        }
+        group = db.session.get(Group, group_id)
+
+        total_approved = sum(approved.values())
+        contributed = contributions.get('contributed', 0)
+        covered = min(args.withdrawals, int(args.contributed // args.amount))
+        checks = {
+            "no_deadlocks": 'deadlock' not in outcomes and 'deadlock' not in contributions,
+            "all_contributions_recorded": contributed == args.members * args.contributions,
+            "no_double_approval": all(count == 1 for _, count in transactions_per_request)
+                                  and len(transactions_per_request) == total_approved
+                                  and outcomes.get('approved', 0) == total_approved,
+            "no_member_overdraw": all(
+                balances[member_id].net_savings >= 0
+                and balances[member_id].total_withdrawn == approved.get(member_id, 0) * args.amount
+                for member_id in member_ids
+            ),
+            "balances_match_ledger": all(
+                abs(balances[member_id].total_contributed - ledger.get(member_id, 0.0)) < 1e-6
+                for member_id in member_ids
+            ),
+            "group_savings_match_ledger": abs(
+                group.current_amount
+                - (sum(ledger.values()) - total_approved * args.amount)
+            ) < 1e-6 and group.current_amount >= 0,
+            "all_covered_requests_approved": all(approved.get(member_id, 0) >= covered for member_id in member_ids)
+        }
+
+    print(f"threads={args.threads} members={args.members} withdrawals={len(withdrawal_ids)} "
+          f"attempts={len(latencies)}")
+    print(f"outcomes={outcomes} contributions={contributions}")
+    print(f"approved={total_approved} group_savings={group.current_amount}")
+    print(f"throughput={len(latencies) / elapsed:.1f} attempts/s, "
+          f"{outcomes.get('approved', 0) / elapsed:.1f} approvals/s")
+    print(f"latency p50={percentile(latencies, 50) * 1000:.2f}ms p95={percentile(latencies, 95) * 1000:.2f}ms")
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'} {name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Contribution-day load test.
+
+Replays a month-end rush against the real app under gunicorn: hundreds of
+members start M-Pesa contributions within a short window, a local fake Daraja
+answers the STK pushes and sends the payment callbacks back in bursts, and
+a fake SMTP server takes the notification emails. A few group admins hold
+notification streams open, so each contribution can be followed from its
+callback to the moment another member sees the notification.
+
+Members come from the seed_data.py dataset at --scale in DATABASE_URL. Latency
+of the contribution requests is measured from when each was due to start, so a
+saturated server shows up as latency rather than as a slower arrival rate.
+Reports throughput, latency percentiles, error rates, callback handling time
+and callback-to-notification time, and checks them against the given limits.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/contribution_day.py --contributors 300 --window 30
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+import requests
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models.transaction import Transaction
+from fake_providers import FakeDaraja, FakeSmtp
+from notification_stream import read_events
+from seed_data import SCALES, generate
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STARTUP_TIMEOUT = 30
+SHUTDOWN_TIMEOUT = 10
+# Time allowed for the last notifications to reach the streams after the last callback
+SETTLE_SECONDS = 5
+
+
+def percentiles(values):
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return f"p50 {p50:.0f}ms  p95 {p95:.0f}ms  p99 {p99:.0f}ms  max {max(values) * 1000:.0f}ms"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def pick_participants(tag, count, observers, rng):
+    """(user_id, group_id) contributors, ordinary members only, and the admins of the groups most of them pay into"""
+    rows = db.session.execute(text("""
+        SELECT m.user_id, m.group_id FROM group_members m JOIN groups g ON g.id = m.group_id
+        WHERE g.name LIKE :names AND m.is_admin = 0
+        ORDER BY m.group_id, m.user_id
+    """), {'names': f"Bench {tag} #%"}).all()
+    contributors = rng.sample([tuple(row) for row in rows], min(count, len(rows)))
+    per_group = {}
+    for _, group_id in contributors:
+        per_group[group_id] = per_group.get(group_id, 0) + 1
+    busiest = sorted(per_group, key=lambda group_id: (-per_group[group_id], group_id))[:observers]
+    admins = dict(db.session.execute(text("""
+        SELECT group_id, user_id FROM group_members WHERE group_id = ANY(:group_ids) AND is_admin = 1
+    """), {'group_ids': busiest}).all())
+    return contributors, {group_id: admins[group_id] for group_id in busiest if group_id in admins}
+
+
+def start_gunicorn(port, workers, threads, env, log_path):
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        ['gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--threads', str(threads), 'run:app'],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.perf_counter() + STARTUP_TIMEOUT
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}, see {log_path}")
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/', timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not start within {STARTUP_TIMEOUT}s, see {log_path}")
+
+
+def contribute(base_url, token, group_id, amount, phone, scheduled_at):
+    """One contribution request, timed from when it was due to start"""
+    result = {'scheduled_at': scheduled_at, 'group_id': group_id}
+    try:
+        response = requests.post(
+            f'{base_url}/api/groups/{group_id}/contribute/mpesa',
+            json={'phone_number': phone, 'amount': amount},
+            headers={'Authorization': f'Bearer {token}'},
+            timeout=60
+        )
+        result['status'] = response.status_code
+        if response.ok:
+            result['checkout_request_id'] = response.json()['response'].get('CheckoutRequestID')
+    except requests.RequestException as e:
+        result['status'] = None
+        result['error'] = str(e)
+    result['finished_at'] = time.perf_counter()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--contributors', type=int, default=300)
+    parser.add_argument('--window', type=float, default=30.0, help="Seconds over which contributions start")
+    parser.add_argument('--concurrency', type=int, default=64, help="Most contribution requests in flight")
+    parser.add_argument('--observers', type=int, default=4, help="Admins holding notification streams open")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--stk-latency', type=float, default=0.2, help="Seconds Daraja takes to accept a push")
+    parser.add_argument('--callback-delay', type=float, default=3.0, help="Mean seconds until a callback is due")
+    parser.add_argument('--burst-interval', type=float, default=1.0, help="Seconds between callback bursts")
+    parser.add_argument('--failure-rate', type=float, default=0.05, help="Share of payments the customer cancels")
+    parser.add_argument('--drain-timeout', type=float, default=300.0)
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--max-p99', type=float, default=2.0, help="Seconds, contribution requests")
+    parser.add_argument('--max-notification-p99', type=float, default=10.0, help="Seconds, callback to notification")
+    parser.add_argument('--log-file', default=os.path.join(tempfile.gettempdir(), 'contribution-day-gunicorn.log'))
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    app = create_app()
+    with app.app_context():
+        print(f"Preparing {args.scale} dataset (seed {args.seed})...")
+        dataset = generate(args.scale, args.seed)
+        contributors, observers = pick_participants(dataset['tag'], args.contributors, args.observers, rng)
+        tokens = {
+            user_id: create_access_token(identity=str(user_id))
+            for user_id in {user_id for user_id, _ in contributors} | set(observers.values())
+        }
+
+    smtp = FakeSmtp().start()
+    daraja = FakeDaraja(stk_latency=args.stk_latency, callback_delay=args.callback_delay,
+                        burst_interval=args.burst_interval, failure_rate=args.failure_rate, seed=args.seed).start()
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = {
+        **os.environ,
+        'MPESA_BASE_URL': daraja.url,
+        'MPESA_CALLBACK_URL': f'{base_url}/api/groups/mpesa/callback',
+        'MPESA_CONSUMER_KEY': 'load-test',
+        'MPESA_CONSUMER_SECRET': 'load-test',
+        'MPESA_PASSKEY': 'load-test',
+        'MPESA_BUSINESS_SHORTCODE': '174379',
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': str(smtp.port),
+        'SMTP_USERNAME': 'load-test',
+        'SMTP_PASSWORD': 'load-test',
+        'SMTP_USE_TLS': 'false'
+    }
+    server = start_gunicorn(port, args.workers, args.threads, env, args.log_file)
+    print(f"gunicorn on {base_url} ({args.workers} workers x {args.threads} threads), log in {args.log_file}")
+
+    try:
+        stop = threading.Event()
+        received = {group_id: [] for group_id in observers}
+        for group_id, admin_id in observers.items():
+            ready = threading.Event()
+            threading.Thread(
+                target=read_events,
+                args=(f'{base_url}/api/notifications/stream', tokens[admin_id], received[group_id], ready, stop),
+                daemon=True
+            ).start()
+            ready.wait(5)
+
+        # Arrivals bunch up early in the window, like members paying on the morning of month end
+        offsets = sorted(rng.betavariate(2, 4) * args.window for _ in contributors)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = []
+            for offset, (user_id, group_id) in zip(offsets, contributors):
+                scheduled_at = started + offset
+                time.sleep(max(0.0, scheduled_at - time.perf_counter()))
+                amount = rng.choice((200, 500, 1000, 2000))
+                phone = f"2547{rng.randint(0, 10 ** 8 - 1):08d}"
+                futures.append(pool.submit(contribute, base_url, tokens[user_id], group_id, amount, phone, scheduled_at))
+            results = [future.result() for future in futures]
+        sent_for = time.perf_counter() - started
+
+        deadline = time.perf_counter() + args.drain_timeout
+        while daraja.outstanding() and time.perf_counter() < deadline:
+            time.sleep(0.2)
+        time.sleep(SETTLE_SECONDS)
+        stop.set()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        try:
+            server.wait(SHUTDOWN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            # Open notification streams hold up a graceful shutdown
+            server.kill()
+            server.wait()
+        daraja.stop()
+        smtp.stop()
+
+    accepted = {result['checkout_request_id']: result for result in results if result.get('checkout_request_id')}
+    with app.app_context():
+        transactions = {
+            transaction.mpesa_request_id: transaction
+            for transaction in Transaction.query.filter(Transaction.mpesa_request_id.in_(list(accepted))).all()
+        }
+
+    request_latencies = [result['finished_at'] - result['scheduled_at'] for result in results]
+    request_errors = sum(1 for result in results if result['status'] != 200)
+    callbacks = [callback for checkout_id, callback in daraja.callbacks.items() if checkout_id in accepted]
+    answered = [callback for callback in callbacks if 'answered_at' in callback]
+    callback_latencies = [callback['answered_at'] - callback['sent_at'] for callback in answered]
+    callback_errors = sum(1 for callback in callbacks if callback.get('status') != 200)
+    paid = {checkout_id for checkout_id, callback in daraja.callbacks.items()
+            if checkout_id in accepted and callback['result_code'] == 0}
+    completed = {checkout_id for checkout_id, transaction in transactions.items() if transaction.status == 'completed'}
+
+    # Callback to the group admin's notification, for payments into the observed groups
+    sent_at = {transactions[checkout_id].id: daraja.callbacks[checkout_id]['sent_at']
+               for checkout_id in paid if checkout_id in transactions}
+    expected = {transactions[checkout_id].id for checkout_id in paid
+                if checkout_id in transactions and accepted[checkout_id]['group_id'] in observers}
+    notification_latencies = {}
+    for events in received.values():
+        for event, arrived, _ in events:
+            if event.get('reference_id') in expected:
+                notification_latencies.setdefault(event['reference_id'], arrived - sent_at[event['reference_id']])
+    notification_latencies = list(notification_latencies.values())
+
+    print(f"{len(results)} contributions started over {sent_for:.1f}s ({len(results) / sent_for:.1f}/s), "
+          f"all settled after {elapsed:.1f}s")
+    print(f"  contribution requests  {percentiles(request_latencies)}  errors {request_errors}/{len(results)}")
+    print(f"  payment callbacks      {percentiles(callback_latencies)}  errors {callback_errors}/{len(callbacks)}")
+    print(f"  callback to notified   {percentiles(notification_latencies)}  "
+          f"seen {len(notification_latencies)}/{len(expected)}")
+    print(f"  Daraja: {daraja.oauth_requests} OAuth and {daraja.stk_requests} STK push requests; "
+          f"SMTP: {smtp.messages} emails")
+
+    request_p99 = float(np.percentile(request_latencies, 99)) if request_latencies else float('inf')
+    notification_p99 = float(np.percentile(notification_latencies, 99)) if notification_latencies else float('inf')
+    checks = {
+        "request_error_rate": request_errors <= args.max_error_rate * len(results),
+        "request_p99": request_p99 <= args.max_p99,
+        "callback_error_rate": callback_errors <= args.max_error_rate * max(len(callbacks), 1),
+        "all_callbacks_answered": len(answered) == len(accepted),
+        "paid_contributions_completed": paid <= completed,
+        "observers_notified": len(notification_latencies) == len(expected),
+        "notification_p99": notification_p99 <= args.max_notification_p99
+    }
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'} {name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
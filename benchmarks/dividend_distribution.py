@@ -0,0 +1,206 @@
+"""
+Dividend distribution benchmark.
+
+Seeds a throwaway group against the PostgreSQL database in DATABASE_URL with
+hundreds of members and years of weekly contributions, occasional withdrawals
+and repaid loans, then times the single streaming pass that computes
+time-weighted balances and the bulk payout. Afterwards it checks that the
+interest income counts only what was repaid within the period, that the
+payouts add up to it, and spot-checks the weights of a few members against a
+naive per-member recomputation.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/dividend_distribution.py --members 500 --years 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models.user import User
+from app.models.groups import Group, group_members
+from app.models.loan import Loan, LoanStatus, LoanRepayment, RepaymentStatus
+from app.models.member_balance import MemberBalance
+from app.models.transaction import Transaction, TransactionType
+from app.services.dividend_service import DividendService
+
+BATCH_SIZE = 10000
+
+
+def seed(member_count, years, seed_value):
+    """Create a group with weekly contributions from every member over the years"""
+    rng = random.Random(seed_value)
+    tag = uuid.uuid4().hex[:8]
+    users = [
+        User(username=f"bench_div_{tag}_{i}", email=f"div_{tag}_{i}@bench.local", password="x")
+        for i in range(member_count)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    user_ids = [user.id for user in users]
+
+    group = Group(name=f"Dividend bench {tag}", target_amount=1e9, current_amount=0, creator_id=user_ids[0])
+    db.session.add(group)
+    db.session.flush()
+    db.session.execute(insert(group_members), [
+        {'user_id': user_id, 'group_id': group.id, 'is_admin': 1 if i == 0 else 0, 'joined_at': datetime.utcnow()}
+        for i, user_id in enumerate(user_ids)
+    ])
+
+    start = datetime.combine(date.today() - timedelta(days=365 * years), datetime.min.time())
+    weeks = 52 * years
+    rows, totals = [], {user_id: [0.0, 0.0] for user_id in user_ids}
+    for user_id in user_ids:
+        joined_week = rng.randrange(0, weeks // 2)
+        weekly = rng.choice([50, 100, 200, 500, 1000])
+        for week in range(joined_week, weeks):
+            timestamp = start + timedelta(weeks=week, hours=rng.randrange(0, 24 * 7))
+            rows.append({
+                'amount': weekly, 'user_id': user_id, 'group_id': group.id,
+                'transaction_type': TransactionType.CONTRIBUTION, 'timestamp': timestamp, 'status': 'completed'
+            })
+            totals[user_id][0] += weekly
+            if rng.random() < 0.02:
+                amount = round(totals[user_id][0] - totals[user_id][1], 2) * 0.3
+                rows.append({
+                    'amount': amount, 'user_id': user_id, 'group_id': group.id,
+                    'transaction_type': TransactionType.WITHDRAWAL,
+                    'timestamp': timestamp + timedelta(hours=1), 'status': 'completed'
+                })
+                totals[user_id][1] += amount
+
+    for offset in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(Transaction), rows[offset:offset + BATCH_SIZE])
+    db.session.execute(insert(MemberBalance), [
+        {'user_id': user_id, 'group_id': group.id, 'total_contributed': contributed,
+         'total_withdrawn': withdrawn, 'total_dividends': 0.0, 'held_amount': 0.0}
+        for user_id, (contributed, withdrawn) in totals.items()
+    ])
+
+    # A loan repaid during the final year supplies the interest income
+    loan = Loan(amount=100000, interest_rate=10, duration_weeks=20, status=LoanStatus.PAID,
+                user_id=user_ids[1], group_id=group.id, approved_by_id=user_ids[0])
+    db.session.add(loan)
+    db.session.flush()
+    paid_from = datetime.combine(date.today() - timedelta(days=300), datetime.min.time())
+    db.session.execute(insert(LoanRepayment), [
+        {'loan_id': loan.id, 'amount': 5500, 'amount_paid': 5500, 'principal_amount': 5000,
+         'interest_amount': 500, 'status': RepaymentStatus.PAID,
+         'due_date': paid_from + timedelta(weeks=week), 'paid_at': paid_from + timedelta(weeks=week)}
+        for week in range(20)
+    ])
+    repayments = [
+        {'amount': 5500, 'user_id': user_ids[1], 'group_id': group.id, 'reference_id': loan.id,
+         'transaction_type': TransactionType.LOAN_REPAYMENT, 'timestamp': paid_from + timedelta(weeks=week),
+         'status': 'completed'}
+        for week in range(20)
+    ]
+
+    # A single installment paid half a year before the period and half within it,
+    # which leaves paid_at inside the period and amount_paid covering both halves
+    split = Loan(amount=10000, interest_rate=10, duration_weeks=1, status=LoanStatus.PAID,
+                 user_id=user_ids[2], group_id=group.id, approved_by_id=user_ids[0])
+    db.session.add(split)
+    db.session.flush()
+    first_half = paid_from - timedelta(days=200)
+    db.session.execute(insert(LoanRepayment), [
+        {'loan_id': split.id, 'amount': 11000, 'amount_paid': 11000, 'principal_amount': 10000,
+         'interest_amount': 1000, 'status': RepaymentStatus.PAID, 'due_date': first_half, 'paid_at': paid_from}
+    ])
+    repayments += [
+        {'amount': 5500, 'user_id': user_ids[2], 'group_id': group.id, 'reference_id': split.id,
+         'transaction_type': TransactionType.LOAN_REPAYMENT, 'timestamp': timestamp, 'status': 'completed'}
+        for timestamp in (first_half, paid_from)
+    ]
+    db.session.execute(insert(Transaction), repayments)
+    db.session.commit()
+
+    # Interest on everything repaid within the final year
+    expected_income = 20 * 500 + 1000 / 2
+    return group.id, user_ids[0], user_ids, len(rows), expected_income
+
+
+def naive_weight(group_id, user_id, period_start, period_end):
+    """Recompute one member's weight by replaying their own transactions"""
+    start = datetime.combine(period_start, datetime.min.time())
+    end = datetime.combine(period_end + timedelta(days=1), datetime.min.time())
+    transactions = Transaction.query.filter(
+        Transaction.group_id == group_id, Transaction.user_id == user_id, Transaction.timestamp < end
+    ).order_by(Transaction.timestamp).all()
+
+    weight, balance, changed = 0.0, 0.0, start
+    for transaction in transactions:
+        moment = max(transaction.timestamp, start)
+        weight += max(balance, 0.0) * (moment - changed).total_seconds() / 86400.0
+        sign = -1 if transaction.transaction_type == TransactionType.WITHDRAWAL else 1
+        balance += sign * transaction.amount
+        changed = moment
+    return weight + max(balance, 0.0) * (end - changed).total_seconds() / 86400.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--members', type=int, default=500)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--spot-checks', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        group_id, admin_id, user_ids, ledger_rows, expected_income = seed(args.members, args.years, args.seed)
+        print(f"seeded {args.members} members, {ledger_rows} ledger rows in {time.perf_counter() - started:.1f}s")
+
+        period_end = date.today()
+        period_start = period_end - timedelta(days=364)
+
+        started = time.perf_counter()
+        weights = DividendService.time_weighted_balances([group_id], period_start, period_end)[group_id]
+        weigh_time = time.perf_counter() - started
+
+        # Before paying out, since the payouts themselves land in the period
+        rng = random.Random(args.seed)
+        spot_checked = rng.sample(list(weights), min(args.spot_checks, len(weights)))
+        weights_match = all(
+            abs(naive_weight(group_id, user_id, period_start, period_end) - weights[user_id]) <= 1e-6 * weights[user_id]
+            for user_id in spot_checked
+        )
+
+        started = time.perf_counter()
+        distribution, allocations, _ = DividendService.distribute(group_id, period_start, period_end, admin_id)
+        db.session.commit()
+        distribute_time = time.perf_counter() - started
+
+        credited = sum(balance.total_dividends for balance in MemberBalance.query.filter_by(group_id=group_id))
+        payouts = Transaction.query.filter_by(group_id=group_id, transaction_type=TransactionType.DIVIDEND).count()
+
+        checks = {
+            "income_repaid_in_period": abs(distribution.interest_income - expected_income) < 0.005,
+            "payouts_add_up": round(sum(allocations.values()), 2) == round(distribution.interest_income, 2),
+            "balances_credited": abs(credited - distribution.distributed_amount) < 0.005,
+            "one_payout_per_member": payouts == len(allocations),
+            "weights_match_naive": weights_match
+        }
+
+    print(f"time-weighted balances: {weigh_time * 1000:.1f}ms "
+          f"({ledger_rows / weigh_time:,.0f} ledger rows/s, {len(weights)} members)")
+    print(f"distribute (weights + income + bulk payout): {distribute_time * 1000:.1f}ms")
+    print(f"interest income {distribution.interest_income:.2f} to {distribution.member_count} members")
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'} {name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
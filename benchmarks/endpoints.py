@@ -0,0 +1,238 @@
+"""
+Endpoint benchmark suite.
+
+Seeds (or reuses) the synthetic dataset from seed_data.py at each requested
+scale, then calls every read-only /api endpoint through the test client as the
+admin of the largest group, recording p50/p95 latency and the SQL statements
+each request runs. Path parameters are filled from the dataset; endpoints that
+write, stream or need a one-off token, or that are broken in the route itself,
+are listed as skipped. A baseline is only saved when every endpoint succeeded.
+
+Results are written as JSON. Given a baseline, any endpoint whose latency grew
+by more than --tolerance (and by at least --min-delta-ms), which now runs more
+queries or which started failing is reported as a regression and the run exits
+non-zero. Latency is compared at the median by default: on a shared machine the
+p95 of a few dozen requests moves too much between runs to gate on.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/endpoints.py --scales small,medium --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from seed_data import SCALES, generate
+
+# Query strings for endpoints that need one; {name} is filled from the dataset
+QUERY_ARGS = {
+    '/api/loans/eligibility': 'group_id={group_id}',
+    '/api/loans/quote': 'group_id={group_id}&amount=5000',
+    '/api/users/search': 'q=bench',
+    '/api/transactions/group/<int:group_id>/transactions': 'per_page=50',
+    '/api/notifications': 'per_page=50'
+}
+# Read-only routes left out, and why
+SKIPPED = {
+    '/api/notifications/stream': "streams until the client disconnects",
+    '/api/statements/<int:statement_id>': "statements are created by POST /api/statements",
+    '/api/statements/download/<token>': "needs a signed download token",
+    '/api/loans/settings': "fails with 400 in the route: GET parses a JSON body it is never sent",
+    '/api/loans/stats': "fails with 500 in the route: filters the loan status enum by value, not name"
+}
+PATH_PARAMS = {
+    'group_id': 'group_id',
+    'loan_id': 'loan_id',
+    'withdrawal_id': 'withdrawal_id',
+    'user_id': 'member_id'
+}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def endpoint_urls(app, dataset):
+    """(rule, url) for every GET /api route, plus (rule, reason) for the skipped ones"""
+    urls, skipped, seen = [], [], set()
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if 'GET' not in rule.methods or not rule.rule.startswith('/api') or rule.rule in seen:
+            continue
+        seen.add(rule.rule)
+        if rule.rule in SKIPPED:
+            skipped.append((rule.rule, SKIPPED[rule.rule]))
+            continue
+        missing = [name for name in rule.arguments if dataset.get(PATH_PARAMS.get(name)) is None]
+        if missing:
+            skipped.append((rule.rule, f"no value for {', '.join(missing)}"))
+            continue
+        url = rule.rule
+        for name in rule.arguments:
+            url = url.replace(f"<int:{name}>", str(dataset[PATH_PARAMS[name]]))
+        if rule.rule in QUERY_ARGS:
+            url += '?' + QUERY_ARGS[rule.rule].format(**dataset)
+        urls.append((rule.rule, url))
+    return urls, skipped
+
+
+def measure(client, url, headers, counter, warmup, iterations):
+    """Status, latency percentiles and median statement count of repeated GETs"""
+    for _ in range(warmup):
+        client.get(url, headers=headers)
+    latencies, queries, status = [], [], None
+    for _ in range(iterations):
+        counter[0] = 0
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        queries.append(counter[0])
+        status = response.status_code
+    return {
+        'status': status,
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 2),
+        'queries': int(np.median(queries))
+    }
+
+
+def run_scale(app, scale, seed, warmup, iterations):
+    with app.app_context():
+        print(f"Preparing {scale} dataset (seed {seed})...")
+        dataset = generate(scale, seed)
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(dataset['admin_id']))}"}
+        engine = db.engine
+    urls, skipped = endpoint_urls(app, dataset)
+    counter = [0]
+
+    def count(*args):
+        counter[0] += 1
+
+    # Requests run outside the app context above, so each gets its own session
+    event.listen(engine, 'after_cursor_execute', count)
+    try:
+        client = app.test_client()
+        results = {}
+        for rule, url in urls:
+            results[rule] = measure(client, url, headers, counter, warmup, iterations)
+            result = results[rule]
+            print(f"  {rule:<60} {result['status']}  p50 {result['p50_ms']:>8.2f}ms  "
+                  f"p95 {result['p95_ms']:>8.2f}ms  {result['queries']:>3} queries")
+    finally:
+        event.remove(engine, 'after_cursor_execute', count)
+    for rule, reason in skipped:
+        print(f"  {rule:<60} skipped: {reason}")
+    return {
+        'dataset': {key: value for key, value in dataset.items() if key != 'loaded'},
+        'endpoints': results,
+        'skipped': dict(skipped)
+    }
+
+
+def compare(results, baseline, percentile, tolerance, min_delta_ms):
+    """Regressions of results against baseline, as printable lines"""
+    regressions = []
+    for scale, measured in results['scales'].items():
+        expected = baseline.get('scales', {}).get(scale)
+        if expected is None:
+            continue
+        for rule, current in measured['endpoints'].items():
+            before = expected['endpoints'].get(rule)
+            if before is None:
+                continue
+            # Check if the endpoint got slower by a margin that is not noise
+            key = f"{percentile}_ms"
+            delta = current[key] - before[key]
+            if delta > before[key] * tolerance and delta >= min_delta_ms:
+                regressions.append(f"{scale} {rule}: {percentile} {before[key]}ms -> {current[key]}ms")
+            # Check if the endpoint runs more queries than it used to
+            if current['queries'] > before['queries']:
+                regressions.append(f"{scale} {rule}: {before['queries']} -> {current['queries']} queries")
+            # Check if the endpoint started failing
+            if current['status'] >= 400 and current['status'] != before['status']:
+                regressions.append(f"{scale} {rule}: status {before['status']} -> {current['status']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', default='small', help=f"Comma separated, from {', '.join(SCALES)}")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help="Results file to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Also write the results to --baseline")
+    parser.add_argument('--percentile', choices=('p50', 'p95'), default='p50', help="Latency compared to the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative latency growth")
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help="Ignore latency growth smaller than this")
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale {', '.join(unknown)}")
+
+    app = create_app()
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'seed': args.seed,
+            'warmup': args.warmup,
+            'iterations': args.iterations,
+            'python': sys.version.split()[0]
+        },
+        'scales': {scale: run_scale(app, scale, args.seed, args.warmup, args.iterations) for scale in scales}
+    }
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    if args.save_baseline:
+        # A failing endpoint in the baseline would make it failing count as no regression
+        failing = [
+            f"{scale} {rule}: status {result['status']}"
+            for scale, measured in results['scales'].items()
+            for rule, result in measured['endpoints'].items()
+            if not 200 <= result['status'] < 300
+        ]
+        for line in failing:
+            print(f"FAIL  {line}")
+        if failing:
+            print("Baseline not written: fix these endpoints or list them in SKIPPED")
+            return 1
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.percentile, args.tolerance, args.min_delta_ms)
+    for line in regressions:
+        print(f"FAIL  {line}")
+    if regressions:
+        return 1
+    print(f"PASS  no regressions against {args.baseline} (commit {baseline['meta'].get('commit')})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Local stand-ins for the payment provider and mail server, for load tests.
+
+FakeDaraja answers M-Pesa OAuth and STK push requests after a configurable
+delay, then delivers each payment's callback to the CallBackURL it was given.
+Callbacks are held back and released in bursts, the way Safaricom's tend to
+arrive at month end. FakeSmtp accepts plain (no STARTTLS) SMTP sessions and
+counts the messages it receives.
+
+Both record what happened, with time.perf_counter() timestamps, for the
+caller to report on.
+"""
+import base64
+import json
+import logging
+import random
+import socketserver
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+# Daraja's result code for a payment the customer cancelled
+CANCELLED_RESULT_CODE = 1032
+
+
+class FakeDaraja:
+    """OAuth and STK push endpoints with delayed, bursty callbacks"""
+
+    def __init__(self, stk_latency=0.2, callback_delay=3.0, burst_interval=1.0,
+                 failure_rate=0.05, callback_workers=16, seed=None):
+        self.stk_latency = stk_latency
+        self.callback_delay = callback_delay
+        self.burst_interval = burst_interval
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.token = uuid.uuid4().hex
+        self.oauth_requests = 0
+        self.stk_requests = 0
+        # CheckoutRequestID -> what was sent and how the app answered
+        self.callbacks = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._senders = ThreadPoolExecutor(max_workers=callback_workers, thread_name_prefix='fake-daraja-callback')
+        self._server = make_server('127.0.0.1', 0, self._app(), threaded=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        # One access log line per STK push would drown out the report
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        threading.Thread(target=self._server.serve_forever, name='fake-daraja', daemon=True).start()
+        threading.Thread(target=self._release_callbacks, name='fake-daraja-bursts', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._server.shutdown()
+        self._senders.shutdown(wait=True)
+
+    def outstanding(self):
+        """Callbacks scheduled but not yet answered"""
+        with self._lock:
+            return len(self._pending) + sum(1 for callback in self.callbacks.values() if 'status' not in callback)
+
+    def _app(self):
+        app = Flask('fake_daraja')
+
+        @app.route('/oauth/v1/generate', methods=['GET'])
+        def oauth():
+            with self._lock:
+                self.oauth_requests += 1
+            if not request.authorization:
+                return jsonify({"errorMessage": "Invalid credentials"}), 400
+            return jsonify({"access_token": self.token, "expires_in": "3599"})
+
+        @app.route('/mpesa/stkpush/v1/processrequest', methods=['POST'])
+        def stk_push():
+            if request.headers.get('Authorization') != f"Bearer {self.token}":
+                return jsonify({"errorCode": "404.001.03", "errorMessage": "Invalid Access Token"}), 401
+            payload = request.get_json()
+            time.sleep(self.stk_latency)
+            merchant_request_id = f"{self.rng.randint(10000, 99999)}-{uuid.uuid4().int % 10 ** 8}-1"
+            checkout_request_id = f"ws_CO_{datetime.now():%d%m%Y%H%M%S}{uuid.uuid4().hex[:10]}"
+            due = time.perf_counter() + self.rng.expovariate(1 / self.callback_delay)
+            with self._lock:
+                self.stk_requests += 1
+                self._pending.append((due, payload, merchant_request_id, checkout_request_id))
+            return jsonify({
+                "MerchantRequestID": merchant_request_id,
+                "CheckoutRequestID": checkout_request_id,
+                "ResponseCode": "0",
+                "ResponseDescription": "Success. Request accepted for processing",
+                "CustomerMessage": "Success. Request accepted for processing"
+            })
+
+        return app
+
+    def _release_callbacks(self):
+        while not self._stop.wait(self.burst_interval):
+            now = time.perf_counter()
+            with self._lock:
+                due = [entry for entry in self._pending if entry[0] <= now]
+                self._pending = [entry for entry in self._pending if entry[0] > now]
+            for _, payload, merchant_request_id, checkout_request_id in due:
+                self._senders.submit(self._send_callback, payload, merchant_request_id, checkout_request_id)
+
+    def _callback_body(self, payload, merchant_request_id, checkout_request_id):
+        if self.rng.random() < self.failure_rate:
+            return {"Body": {"stkCallback": {
+                "MerchantRequestID": merchant_request_id,
+                "CheckoutRequestID": checkout_request_id,
+                "ResultCode": CANCELLED_RESULT_CODE,
+                "ResultDesc": "Request cancelled by user"
+            }}}
+        receipt = base64.b32encode(uuid.uuid4().bytes).decode()[:10]
+        return {"Body": {"stkCallback": {
+            "MerchantRequestID": merchant_request_id,
+            "CheckoutRequestID": checkout_request_id,
+            "ResultCode": 0,
+            "ResultDesc": "The service request is processed successfully.",
+            "CallbackMetadata": {"Item": [
+                {"Name": "Amount", "Value": payload['Amount']},
+                {"Name": "MpesaReceiptNumber", "Value": receipt},
+                {"Name": "TransactionDate", "Value": int(datetime.now().strftime('%Y%m%d%H%M%S'))},
+                {"Name": "PhoneNumber", "Value": int(payload['PhoneNumber'])}
+            ]}
+        }}}
+
+    def _send_callback(self, payload, merchant_request_id, checkout_request_id):
+        body = self._callback_body(payload, merchant_request_id, checkout_request_id)
+        record = {'result_code': body['Body']['stkCallback']['ResultCode'], 'sent_at': time.perf_counter()}
+        with self._lock:
+            self.callbacks[checkout_request_id] = record
+        try:
+            response = requests.post(payload['CallBackURL'], data=json.dumps(body),
+                                     headers={'Content-Type': 'application/json'}, timeout=60)
+            record['status'] = response.status_code
+        except requests.RequestException as e:
+            record['status'] = None
+            record['error'] = str(e)
+        record['answered_at'] = time.perf_counter()
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        self.reply("220 fake-smtp ready")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.wfile.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250 OK\r\n")
+            elif verb == 'AUTH':
+                self.reply("235 Authentication successful")
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[-1].strip(' <>'))
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                sink.received(recipients)
+                self.reply("250 OK queued")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                # RSET, NOOP and anything else
+                self.reply("250 OK")
+
+
+class _ThreadingSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeSmtp:
+    """SMTP sink counting delivered messages; configure the app with SMTP_USE_TLS=false"""
+
+    def __init__(self):
+        self.messages = 0
+        self.recipients = set()
+        self._lock = threading.Lock()
+        self._server = _ThreadingSmtpServer(('127.0.0.1', 0), _SmtpHandler)
+        self._server.sink = self
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def received(self, recipients):
+        with self._lock:
+            self.messages += 1
+            self.recipients.update(recipients)
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='fake-smtp', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
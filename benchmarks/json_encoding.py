@@ -0,0 +1,133 @@
+"""
+JSON serialization benchmark.
+
+Times the transaction and notification list payloads per 10,000 rows, built
+the old way (ORM objects, to_dict() with .isoformat(), Flask's default
+encoder) and the new way (plain rows from list_select, FastJSONProvider with
+orjson), split into loading, building the dicts and encoding. Also times the
+provider's standard library fallback, and checks that all three produce the
+same JSON.
+
+Uses the seed_data.py dataset at --scale in DATABASE_URL.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/json_encoding.py --rows 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import joinedload
+
+from app import create_app, db
+from app.models.notification import Notification
+from app.models.transaction import Transaction
+from app.utils import json_provider
+from app.utils.json_provider import FastJSONProvider
+from seed_data import SCALES, generate
+
+
+def best_of(repeat, fn):
+    """Fastest of repeat runs, in seconds, and the last result"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def compare(name, rows, repeat, old_load, old_build, new_load, new_build, old_provider, new_provider):
+    """Time both pipelines for one payload; returns whether their JSON matched"""
+    load_old, objects = best_of(repeat, old_load)
+    build_old, payload_old = best_of(repeat, lambda: old_build(objects))
+    encode_old, body_old = best_of(repeat, lambda: old_provider.dumps(payload_old))
+
+    load_new, fetched = best_of(repeat, new_load)
+    build_new, payload_new = best_of(repeat, lambda: new_build(fetched))
+    encode_new, body_new = best_of(repeat, lambda: new_provider.dumps(payload_new))
+
+    # The same provider without orjson
+    encoder, json_provider.orjson = json_provider.orjson, None
+    try:
+        encode_fallback, body_fallback = best_of(repeat, lambda: new_provider.dumps(payload_new))
+    finally:
+        json_provider.orjson = encoder
+
+    scale = 10000 / max(len(objects), 1)
+    print(f"{name}: {len(objects)} rows, ms per 10k rows (best of {repeat})")
+    print(f"  {'':<26}{'load':>9}{'build':>9}{'encode':>9}{'total':>9}")
+    for label, load, build, encode in (
+        ("ORM + to_dict + stdlib", load_old, build_old, encode_old),
+        ("rows + stdlib fallback", load_new, build_new, encode_fallback),
+        ("rows + orjson", load_new, build_new, encode_new)
+    ):
+        print(f"  {label:<26}" + ''.join(f"{value * scale * 1000:>9.1f}" for value in (load, build, encode, load + build + encode)))
+    print(f"  speedup {(load_old + build_old + encode_old) / (load_new + build_new + encode_new):.1f}x overall, "
+          f"{encode_old / encode_new:.1f}x encoding")
+    return json.loads(body_old) == json.loads(body_new) == json.loads(body_fallback) and len(objects) == rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if json_provider.orjson is None:
+        print("orjson is not installed; only the fallback encoder can be measured")
+        return 1
+
+    app = create_app()
+    with app.test_request_context():
+        dataset = generate(args.scale, args.seed)
+        group_id = db.session.execute(
+            db.select(Transaction.group_id).group_by(Transaction.group_id)
+            .order_by(db.func.count().desc()).limit(1)
+        ).scalar_one()
+        old_provider, new_provider = DefaultJSONProvider(app), FastJSONProvider(app)
+        print(f"Dataset {dataset['tag']}")
+
+        checks = {
+            "transactions_identical": compare(
+                "Group transactions", args.rows, args.repeat,
+                lambda: Transaction.query.filter_by(group_id=group_id).options(joinedload(Transaction.user))
+                    .order_by(Transaction.timestamp.desc(), Transaction.id).limit(args.rows).all(),
+                lambda objects: {"transactions": [transaction.to_dict() for transaction in objects]},
+                lambda: db.session.execute(
+                    Transaction.list_select().where(Transaction.group_id == group_id)
+                    .order_by(Transaction.timestamp.desc(), Transaction.id).limit(args.rows)
+                ).all(),
+                lambda rows: {"transactions": [Transaction.row_to_dict(row) for row in rows]},
+                old_provider, new_provider
+            ),
+            "notifications_identical": compare(
+                "Notifications", args.rows, args.repeat,
+                lambda: Notification.query.order_by(Notification.created_at.desc(), Notification.id)
+                    .limit(args.rows).all(),
+                lambda objects: [notification.to_dict() for notification in objects],
+                lambda: db.session.execute(
+                    Notification.list_select().order_by(Notification.created_at.desc(), Notification.id)
+                    .limit(args.rows)
+                ).all(),
+                lambda rows: [Notification.row_to_dict(row) for row in rows],
+                old_provider, new_provider
+            )
+        }
+
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'} {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Ledger export benchmark.
+
+Seeds a throwaway group against the PostgreSQL database in DATABASE_URL with a
+large ledger (a million rows by default, generated server side), then streams
+it through the export endpoint as CSV and JSON lines while sampling the
+process's resident memory. Checks that every row arrives once and in id order,
+that memory stays flat while the export runs, and that resuming with after_id
+picks up exactly where a cut-off export stopped.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/ledger_export.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, text
+
+from app import create_app, db
+from app.models.user import User
+from app.models.groups import Group, group_members
+
+MEMBERS = 50
+# Resident memory may grow by at most this much once the export is under way
+MAX_GROWTH_MB = 32
+
+
+def rss_mb():
+    """Current resident set size of this process"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def seed(row_count):
+    """Create a group whose members share row_count ledger rows over five years"""
+    tag = uuid.uuid4().hex[:8]
+    users = [
+        User(username=f"bench_exp_{tag}_{i}", email=f"exp_{tag}_{i}@bench.local", password="x")
+        for i in range(MEMBERS)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    user_ids = [user.id for user in users]
+
+    group = Group(name=f"Export bench {tag}", target_amount=1e9, current_amount=0, creator_id=user_ids[0])
+    db.session.add(group)
+    db.session.flush()
+    db.session.execute(insert(group_members), [
+        {'user_id': user_id, 'group_id': group.id, 'is_admin': 1 if i == 0 else 0}
+        for i, user_id in enumerate(user_ids)
+    ])
+
+    # Generated in the database; building a million ORM rows would dominate the run
+    db.session.execute(text("""
+        INSERT INTO transactions (amount, description, transaction_type, timestamp, status, user_id, group_id)
+        SELECT 50 + (n % 20) * 25,
+               'Weekly contribution, batch ' || (n % 7),
+               CAST(CASE WHEN n % 10 = 0 THEN 'WITHDRAWAL' ELSE 'CONTRIBUTION' END AS transactiontype),
+               now() - interval '5 years' + (n * interval '5 years') / :rows,
+               'completed',
+               :first_user_id + (n % :members),
+               :group_id
+        FROM generate_series(1, :rows) AS n
+    """), {'rows': row_count, 'first_user_id': user_ids[0], 'members': MEMBERS, 'group_id': group.id})
+    db.session.commit()
+    return group.id, user_ids[0]
+
+
+def export(client, url, headers, parse, expected, stop_after=None):
+    """
+    Stream an export, checking ids against the expected ones as they arrive so the
+    benchmark itself holds nothing per row. Returns (rows, in_order, last id,
+    seconds, bytes received, memory samples).
+    """
+    samples = []
+    rows, in_order, last_id, received = 0, True, None, 0
+    started = time.perf_counter()
+    response = client.get(url, headers=headers, buffered=False)
+    assert response.status_code == 200, response.status_code
+    for index, chunk in enumerate(response.response):
+        received += len(chunk)
+        for row_id in parse(chunk.decode() if isinstance(chunk, bytes) else chunk):
+            in_order = in_order and rows < len(expected) and expected[rows] == row_id
+            rows, last_id = rows + 1, row_id
+        if index % 25 == 0:
+            samples.append(rss_mb())
+        if stop_after and rows >= stop_after:
+            break
+    response.close()
+    return rows, in_order, last_id, time.perf_counter() - started, received, samples
+
+
+def csv_ids(chunk):
+    return [int(line.split(',', 1)[0]) for line in chunk.splitlines() if line and line[0].isdigit()]
+
+
+def jsonl_ids(chunk):
+    return [json.loads(line)['id'] for line in chunk.splitlines() if line]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        started = time.perf_counter()
+        group_id, admin_id = seed(args.rows)
+        print(f"seeded {args.rows:,} ledger rows in {time.perf_counter() - started:.1f}s")
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin_id))}'}
+        expected = [row[0] for row in db.session.execute(
+            text("SELECT id FROM transactions WHERE group_id = :group_id ORDER BY id"), {'group_id': group_id}
+        )]
+        db.session.remove()
+
+    base_url = f'/api/transactions/group/{group_id}/export'
+    results, checks = {}, {}
+    for export_format, parse in (('csv', csv_ids), ('jsonl', jsonl_ids)):
+        rows, in_order, _, seconds, received, samples = export(
+            client, f'{base_url}?format={export_format}', headers, parse, expected
+        )
+        # Memory once the export is under way against the peak over the rest of it
+        growth = max(samples) - samples[min(1, len(samples) - 1)]
+        results[export_format] = (seconds, received, samples[0], max(samples), growth)
+        checks[f"{export_format}_all_rows_in_order"] = in_order and rows == len(expected)
+        checks[f"{export_format}_flat_memory"] = growth <= MAX_GROWTH_MB
+
+    # Cut an export off midway and resume it from the last id received
+    half = len(expected) // 2
+    first_rows, first_in_order, last_id, _, _, _ = export(
+        client, f'{base_url}?format=jsonl', headers, jsonl_ids, expected, stop_after=half
+    )
+    rest_rows, rest_in_order, _, _, _, _ = export(
+        client, f'{base_url}?format=jsonl&after_id={last_id}', headers, jsonl_ids, expected[first_rows:]
+    )
+    checks["resume_after_id"] = (
+        first_in_order and rest_in_order and first_rows + rest_rows == len(expected)
+    )
+
+    for export_format, (seconds, received, start_mb, peak_mb, growth) in results.items():
+        print(f"{export_format}: {len(expected):,} rows, {received / 2 ** 20:.0f}MB in {seconds:.1f}s "
+              f"({len(expected) / seconds:,.0f} rows/s), rss {start_mb:.0f}MB -> peak {peak_mb:.0f}MB "
+              f"(+{growth:.1f}MB after the first chunks)")
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'} {name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Late penalty repayment check.
+
+Seeds a throwaway group against the PostgreSQL database in DATABASE_URL with
+a loan approved long enough ago that every installment is overdue, accrues the
+nightly late penalties for each day since, then has the borrower repay through
+the repay endpoint on the original schedule until the loan closes. Afterwards
+it checks that the loan reached PAID, and only once the penalties were paid as
+well, then reports how long the accrual took. Like the nightly job, the
+accrual covers every overdue loan in the database, so point it at a
+benchmark database.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/loan_penalties.py --weeks 8 --overdue-days 21
+"""
+import argparse
+import math
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models.user import User
+from app.models.groups import Group
+from app.models.loan import Loan, LoanStatus, GroupLoanSettings
+from app.services.loan_service import LoanService
+from app.services.penalty_service import PenaltyService
+
+
+def seed(amount, weeks, overdue_days, penalty_rate):
+    """Create a group and a borrower whose loan's last installment fell due overdue_days ago"""
+    tag = uuid.uuid4().hex[:8]
+    admin = User(username=f"bench_admin_{tag}", email=f"admin_{tag}@bench.local", password="x")
+    member = User(username=f"bench_member_{tag}", email=f"member_{tag}@bench.local", password="x")
+    db.session.add_all([admin, member])
+    db.session.flush()
+
+    group = Group(name=f"Bench {tag}", target_amount=amount * 10, current_amount=amount * 2, creator_id=admin.id)
+    db.session.add(group)
+    db.session.flush()
+    Group.add_member(group.id, admin.id, is_admin=True)
+    Group.add_member(group.id, member.id)
+    db.session.add(GroupLoanSettings(group_id=group.id, late_penalty_rate=penalty_rate))
+
+    loan = Loan(amount=amount, purpose="bench", interest_rate=10.0, duration_weeks=weeks,
+                interest_method='flat', user_id=member.id, group_id=group.id)
+    db.session.add(loan)
+    db.session.flush()
+    approved_at = datetime.utcnow() - timedelta(weeks=weeks, days=overdue_days)
+    LoanService.approve(loan, admin.id, approved_at)
+    db.session.commit()
+    return member.id, loan.id, approved_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--amount', type=float, default=10000.0)
+    parser.add_argument('--weeks', type=int, default=8)
+    parser.add_argument('--overdue-days', type=int, default=21, help="days since the last installment fell due")
+    parser.add_argument('--penalty-rate', type=float, default=2.0, help="late_penalty_rate, percent per week")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        member_id, loan_id, approved_at = seed(args.amount, args.weeks, args.overdue_days, args.penalty_rate)
+        token = create_access_token(identity=str(member_id))
+
+        started = time.perf_counter()
+        summaries = PenaltyService.accrue_range((approved_at + timedelta(weeks=1)).date(), datetime.utcnow().date())
+        accrual_elapsed = time.perf_counter() - started
+
+        loan = db.session.get(Loan, loan_id)
+        scheduled = [repayment.amount for repayment in sorted(loan.repayments, key=lambda r: r.due_date)]
+        penalties = loan.penalties_accrued()
+        owed = loan.outstanding_balance()
+        db.session.remove()
+
+    # Pay the scheduled installments, then whatever is still owed, as a member would
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    payments, errors, status_after_schedule = [], [], None
+    outstanding = owed
+    for attempt in range(len(scheduled) * 2):
+        if attempt < len(scheduled):
+            amount = scheduled[attempt]
+        else:
+            # Rounded up to the cent, as the member would see it
+            amount = math.ceil(outstanding * 100) / 100
+        response = client.post(f'/api/loans/{loan_id}/repay', headers=headers, json={'amount': amount})
+        body = response.get_json()
+        if response.status_code != 200:
+            errors.append(f"{response.status_code} {body.get('error')}")
+            break
+        payments.append(amount)
+        outstanding = body['loan']['outstanding_balance']
+        if attempt == len(scheduled) - 1:
+            status_after_schedule = body['loan']['status']
+        if body['loan']['status'] == LoanStatus.PAID.value:
+            break
+
+    with app.app_context():
+        loan = db.session.get(Loan, loan_id)
+        checks = {
+            "penalties_accrued": penalties > 0,
+            "open_until_penalties_paid": status_after_schedule != LoanStatus.PAID.value,
+            "no_repayment_refused": not errors,
+            "loan_paid": loan.status == LoanStatus.PAID,
+            "paid_schedule_and_penalties": sum(payments) >= sum(scheduled) + penalties - 0.005
+        }
+
+    print(f"installments={len(scheduled)} scheduled={sum(scheduled):.2f} penalties={penalties:.2f} "
+          f"owed={owed:.2f}")
+    print(f"payments={len(payments)} paid={sum(payments):.2f} status={loan.status.value}")
+    if errors:
+        print(f"refused: {errors[0]}")
+    print(f"accrual: {len(summaries)} days in {accrual_elapsed * 1000:.1f}ms, "
+          f"{sum(summary['penalties_written'] for summary in summaries)} penalties written")
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'} {name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Loan pricing engine benchmark.
+
+Prices a batch of hypothetical loans with random principals, rates and terms
+under each interest method, checks every schedule against the closed-form
+totals and reports the time per pass. No database is needed.
+
+    python benchmarks/loan_pricing.py --loans 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from app.services.loan_pricing import LoanPricingEngine, INTEREST_METHODS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--loans', type=int, default=100_000)
+    parser.add_argument('--min-term', type=int, default=4)
+    parser.add_argument('--max-term', type=int, default=52)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    principals = rng.uniform(500, 200_000, args.loans).round(2)
+    rates = rng.uniform(0, 30, args.loans).round(1)
+    terms = rng.integers(args.min_term, args.max_term + 1, args.loans)
+
+    print(f"{args.loans} loans, terms {args.min_term}-{args.max_term} weeks, best of {args.repeat}")
+    failed = False
+    for method in INTEREST_METHODS:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            priced = LoanPricingEngine.price(principals, rates, terms, method)
+            timings.append(time.perf_counter() - started)
+
+        expected = LoanPricingEngine.total_repayment(principals, rates, terms, method)
+        totals_match = np.allclose(priced["installments"].sum(axis=1), expected, rtol=1e-9)
+        principal_repaid = np.allclose(priced["principal"].sum(axis=1), principals, rtol=1e-9)
+        last_week = priced["balance"][np.arange(args.loans), terms - 1]
+        balances_cleared = np.allclose(last_week, 0.0, atol=1e-6)
+        ok = totals_match and principal_repaid and balances_cleared
+        failed = failed or not ok
+
+        print(f"  {method:<17} best {min(timings) * 1000:8.1f} ms   "
+              f"mean {sum(timings) / len(timings) * 1000:8.1f} ms   "
+              f"interest {priced['total_interest'].sum():16,.2f}   {'PASS' if ok else 'FAIL'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Notification stream benchmark.
+
+Serves the app on a local threaded server against the PostgreSQL database in
+DATABASE_URL, connects one server-sent event stream per member of a throwaway
+group and then commits notifications to random members in batches. Measures the
+delay from each commit to the event arriving at its client, and checks that
+every event reaches only its recipient, that a notification committed after
+one with a higher id still arrives, and that a client reconnecting with
+Last-Event-ID gets everything it missed, including such a straggler and more
+than one replay page, followed by new events.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/notification_stream.py --clients 20 --notifications 500
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+import requests
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from werkzeug.serving import make_server
+
+from app import create_app, db
+from app.models.user import User
+from app.models.notification import Notification, NotificationType
+from app.services.notification_service import NotificationService
+from app.services.notification_stream import REPLAY_LIMIT
+
+BATCH_SIZE = 25
+# Delivery within this many seconds counts as real time
+MAX_P99_LATENCY = 1.0
+
+
+def read_events(url, token, received, ready, stop, last_event_id=None):
+    """Collect (event, arrival time, event id) triples from one stream until stop is set"""
+    headers = {'Last-Event-ID': str(last_event_id)} if last_event_id is not None else {}
+    with requests.get(url, params={'jwt': token}, headers=headers, stream=True, timeout=(5, 30)) as response:
+        ready.set()
+        data, event_id = None, None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('id: '):
+                event_id = line[len('id: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+            elif line == '' and data is not None:
+                received.append((data, time.perf_counter(), event_id))
+                data = None
+            if stop.is_set():
+                return
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.05)
+
+
+def insert_notification(session, user_id, message):
+    """Insert a notification in the session's open transaction, returning its id"""
+    return session.scalar(insert(Notification).returning(Notification.id), {
+        'type': NotificationType.CONTRIBUTION.value, 'recipient_id': user_id, 'message': message,
+        'created_at': datetime.utcnow(), 'read': False, 'emailed': False
+    })
+
+
+def commit_out_of_order(user_id):
+    """Commit two notifications to the user, the one with the lower id last; returns both ids"""
+    straggler = Session(db.engine)
+    try:
+        late_id = insert_notification(straggler, user_id, "committed late")
+        ahead_id = insert_notification(db.session, user_id, "committed first")
+        db.session.commit()
+        straggler.commit()
+    finally:
+        straggler.close()
+    return [late_id, ahead_id]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--notifications', type=int, default=500)
+    parser.add_argument('--missed', type=int, default=2 * REPLAY_LIMIT + 5,
+                        help="notifications a reconnecting client has to catch up on")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    app = create_app()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/api/notifications/stream'
+
+    with app.app_context():
+        tag = uuid.uuid4().hex[:8]
+        users = [
+            User(username=f"bench_sse_{tag}_{i}", email=f"sse_{tag}_{i}@bench.local", password="x")
+            for i in range(args.clients)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+        tokens = {user_id: create_access_token(identity=str(user_id)) for user_id in user_ids}
+
+    stop = threading.Event()
+    received = {user_id: [] for user_id in user_ids}
+    readers = []
+    for user_id in user_ids:
+        ready = threading.Event()
+        reader = threading.Thread(
+            target=read_events, args=(url, tokens[user_id], received[user_id], ready, stop), daemon=True
+        )
+        reader.start()
+        ready.wait(5)
+        readers.append(reader)
+    # Let every stream finish subscribing
+    time.sleep(0.5)
+
+    committed_at, recipients = {}, {}
+    with app.app_context():
+        for offset in range(0, args.notifications, BATCH_SIZE):
+            batch = [rng.choice(user_ids) for _ in range(min(BATCH_SIZE, args.notifications - offset))]
+            ids = NotificationService.bulk_create_notifications([
+                {'type': NotificationType.CONTRIBUTION, 'recipient_id': user_id, 'message': f"bench {offset + i}"}
+                for i, user_id in enumerate(batch)
+            ])
+            db.session.commit()
+            now = time.perf_counter()
+            for notification_id, user_id in zip(ids, batch):
+                committed_at[notification_id], recipients[notification_id] = now, user_id
+            time.sleep(rng.uniform(0.0, 0.05))
+
+        deadline = time.perf_counter() + 5
+        while sum(len(events) for events in received.values()) < args.notifications and time.perf_counter() < deadline:
+            time.sleep(0.05)
+
+        # A notification committed after one with a higher id still reaches a live client
+        late_user = user_ids[1 % len(user_ids)]
+        late_live = commit_out_of_order(late_user)
+        wait_for(lambda: {event['id'] for event, _, _ in received[late_user]} >= set(late_live))
+
+        # Reconnect one client after it missed some events, one of them committed
+        # behind a higher id the client had already seen
+        user_id = user_ids[0]
+        straggler = Session(db.engine)
+        late_id = insert_notification(straggler, user_id, "committed late")
+        ahead_id = insert_notification(db.session, user_id, "committed first")
+        db.session.commit()
+        wait_for(lambda: any(event['id'] == ahead_id for event, _, _ in received[user_id]))
+        last_seen = received[user_id][-1][2] if received[user_id] else '0'
+        stop.set()
+        missed = NotificationService.bulk_create_notifications([
+            {'type': NotificationType.CONTRIBUTION, 'recipient_id': user_id, 'message': f"missed {i}"}
+            for i in range(args.missed)
+        ])
+        db.session.commit()
+        straggler.commit()
+        straggler.close()
+        missed.insert(0, late_id)
+
+    replayed, ready = [], threading.Event()
+    resume = threading.Thread(
+        target=read_events, args=(url, tokens[user_id], replayed, ready, threading.Event(), last_seen), daemon=True
+    )
+    resume.start()
+    ready.wait(5)
+    # A new event while it catches up must not make it skip the rest of the backlog
+    with app.app_context():
+        missed += NotificationService.bulk_create_notifications([
+            {'type': NotificationType.CONTRIBUTION, 'recipient_id': user_id, 'message': "after reconnecting"}
+        ])
+        db.session.commit()
+    wait_for(lambda: len(replayed) >= len(missed))
+
+    latencies = [
+        arrived - committed_at[event['id']]
+        for user_id, events in received.items()
+        for event, arrived, _ in events
+        if event['id'] in committed_at
+    ]
+    delivered = sorted(
+        event['id'] for events in received.values() for event, _, _ in events if event['id'] in committed_at
+    )
+    live_ids = [event['id'] for event, _, _ in received[late_user]]
+    checks = {
+        "all_delivered_once": delivered == sorted(committed_at),
+        "only_to_recipient": all(
+            event['recipient_id'] == user_id for user_id, events in received.items() for event, _, _ in events
+        ),
+        "late_commit_delivered_live": all(live_ids.count(notification_id) == 1 for notification_id in late_live),
+        "resume_from_last_event_id": [event['id'] for event, _, _ in replayed] == missed,
+        "p99_under_1s": bool(latencies) and sorted(latencies)[int(0.99 * (len(latencies) - 1))] <= MAX_P99_LATENCY
+    }
+    server.shutdown()
+
+    if latencies:
+        latencies.sort()
+        print(f"{len(latencies)} events to {args.clients} clients: "
+              f"median {statistics.median(latencies) * 1000:.1f}ms, "
+              f"p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms")
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'} {name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""
+Synthetic data generator for benchmarks.
+
+Fills the PostgreSQL database in DATABASE_URL with a reproducible, realistic
+dataset: users; groups whose sizes follow a power law (most have a handful of
+members, a few have hundreds); years of weekly-ish contributions, withdrawals
+with their approved requests, loans with repayment schedules and
+notifications. Everything is generated from one seed with numpy and
+bulk-loaded with COPY, after which member balances, daily rollups and group
+totals are derived from the ledger with set-based statements.
+
+A dataset is named after its scale and seed, so running again with the same
+arguments finds the existing one instead of loading it twice.
+
+    DATABASE_URL=postgresql://localhost/group_savings_bench \\
+        python benchmarks/seed_data.py --scale medium --seed 42
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('FRONTEND_URL', 'http://localhost:5173')
+
+from sqlalchemy import text
+
+from app import create_app, db, bcrypt
+from app.models.loan import LoanStatus, RepaymentStatus
+from app.models.notification import NotificationType
+from app.models.transaction import TransactionType
+from app.models.user import UserRole
+from app.models.withdrawal_request import WithdrawalStatus
+
+SCALES = {
+    'small': {'users': 300, 'years': 2},
+    'medium': {'users': 3000, 'years': 3},
+    'large': {'users': 30000, 'years': 3}
+}
+USERS_PER_GROUP = 5
+MIN_GROUP_SIZE, MAX_GROUP_SIZE = 3, 500
+# Pareto shape of group sizes; lower is more skewed
+GROUP_SIZE_SHAPE = 1.2
+# Yearly rates per membership
+WITHDRAWALS_PER_YEAR = 1.5
+LOANS_PER_YEAR = 0.4
+PENDING_WITHDRAWAL_SHARE = 0.05
+# Yearly notifications per user, spread over memberships
+NOTIFICATIONS_PER_YEAR = 20
+DEFAULT_SHARE = 0.1
+INTEREST_RATE = 10.0
+LOAN_DURATIONS = (4, 8, 12)
+COPY_CHUNK_ROWS = 200000
+PASSWORD = 'benchmark'
+
+
+def dataset_tag(scale, seed):
+    return f"{scale}_s{seed}"
+
+
+def to_text(start, seconds):
+    """ISO timestamps start + seconds, vectorized"""
+    return (np.datetime64(start, 's') + seconds.astype('timedelta64[s]')).astype(str)
+
+
+def reserve_ids(table, count):
+    """Draw count ids from a table's sequence so rows can be COPYed with known keys"""
+    return np.array(db.session.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+        {'table': table, 'count': int(count)}
+    ).scalars().all(), dtype=np.int64)
+
+
+def copy_rows(table, columns, rows):
+    """COPY an iterable of row tuples into table, in chunks"""
+    cursor = db.session.connection().connection.cursor()
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    buffer, pending, total = io.StringIO(), 0, 0
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == COPY_CHUNK_ROWS:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            buffer, pending, total = io.StringIO(), 0, total + pending
+            writer = csv.writer(buffer)
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        total += pending
+    return total
+
+
+def find_dataset(tag):
+    """Summary of an already loaded dataset, or None"""
+    users = db.session.execute(
+        text("SELECT count(*) FROM users WHERE username LIKE :prefix"), {'prefix': f"bench_{tag}_%"}
+    ).scalar()
+    return describe(tag) if users else None
+
+
+def describe(tag):
+    """Counts and the ids benchmarks address: the largest group, its admin, a loan and a withdrawal"""
+    group_names = f"Bench {tag} #%"
+    largest = db.session.execute(text("""
+        SELECT g.id, g.creator_id, count(*) AS members
+        FROM groups g JOIN group_members m ON m.group_id = g.id
+        WHERE g.name LIKE :names
+        GROUP BY g.id ORDER BY members DESC, g.id LIMIT 1
+    """), {'names': group_names}).one()
+    counts = db.session.execute(text("""
+        SELECT
+            (SELECT count(*) FROM groups WHERE name LIKE :names) AS groups,
+            (SELECT count(*) FROM users WHERE username LIKE :users) AS users,
+            (SELECT count(*) FROM group_members m JOIN groups g ON g.id = m.group_id WHERE g.name LIKE :names) AS memberships,
+            (SELECT count(*) FROM transactions t JOIN groups g ON g.id = t.group_id WHERE g.name LIKE :names) AS transactions,
+            (SELECT count(*) FROM loans l JOIN groups g ON g.id = l.group_id WHERE g.name LIKE :names) AS loans,
+            (SELECT count(*) FROM notifications n JOIN groups g ON g.id = n.group_id WHERE g.name LIKE :names) AS notifications
+    """), {'names': group_names, 'users': f"bench_{tag}_%"}).one()
+    member_id = db.session.execute(text("""
+        SELECT user_id FROM group_members WHERE group_id = :group_id AND user_id <> :admin_id
+        ORDER BY user_id LIMIT 1
+    """), {'group_id': largest.id, 'admin_id': largest.creator_id}).scalar()
+    loan_id = db.session.execute(
+        text("SELECT min(id) FROM loans WHERE group_id = :group_id"), {'group_id': largest.id}
+    ).scalar()
+    withdrawal_id = db.session.execute(
+        text("SELECT min(id) FROM withdrawal_requests WHERE group_id = :group_id"), {'group_id': largest.id}
+    ).scalar()
+    return {
+        'tag': tag,
+        'counts': dict(counts._mapping),
+        'group_id': largest.id,
+        'group_members': largest.members,
+        'admin_id': largest.creator_id,
+        'member_id': member_id,
+        'loan_id': loan_id,
+        'withdrawal_id': withdrawal_id
+    }
+
+
+def generate(scale, seed, until=None):
+    """Load the dataset for scale and seed unless it exists; returns its description"""
+    tag = dataset_tag(scale, seed)
+    existing = find_dataset(tag)
+    if existing:
+        return existing
+
+    config = SCALES[scale]
+    rng = np.random.default_rng(seed)
+    until = until or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = until - timedelta(days=365 * config['years'])
+    horizon = (until - start).total_seconds()
+    week = 7 * 86400.0
+
+    # Users
+    user_count = config['users']
+    user_ids = reserve_ids('users', user_count)
+    password = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+    user_created = to_text(start, rng.random(user_count) * horizon * 0.1)
+    copy_rows('users', ['id', 'username', 'email', 'password', 'role', 'created_at', 'updated_at'], (
+        (user_ids[i], f"bench_{tag}_{i}", f"{tag}_{i}@bench.local", password, UserRole.member.name,
+         user_created[i], user_created[i])
+        for i in range(user_count)
+    ))
+
+    # Groups, with power-law sizes and members drawn towards more sociable users
+    group_count = max(1, user_count // USERS_PER_GROUP)
+    group_ids = reserve_ids('groups', group_count)
+    sizes = np.clip(np.round(rng.pareto(GROUP_SIZE_SHAPE, group_count) * 4 + MIN_GROUP_SIZE),
+                    MIN_GROUP_SIZE, min(MAX_GROUP_SIZE, user_count)).astype(int)
+    sociability = rng.pareto(2.0, user_count) + 1
+    sociability /= sociability.sum()
+    member_groups, member_users, member_admin = [], [], []
+    creators = np.empty(group_count, dtype=np.int64)
+    for g in range(group_count):
+        members = rng.choice(user_count, size=sizes[g], replace=False, p=sociability)
+        creators[g] = user_ids[members[0]]
+        member_groups.append(np.full(sizes[g], g))
+        member_users.append(members)
+        member_admin.append(np.arange(sizes[g]) == 0)
+    member_groups = np.concatenate(member_groups)
+    member_users = np.concatenate(member_users)
+    member_admin = np.concatenate(member_admin)
+    membership_count = len(member_groups)
+
+    group_created = rng.random(group_count) * horizon * 0.2
+    group_created_text = to_text(start, group_created)
+    copy_rows('groups', ['id', 'name', 'description', 'target_amount', 'current_amount', 'created_at', 'updated_at', 'creator_id'], (
+        (group_ids[g], f"Bench {tag} #{g}", "Synthetic benchmark group",
+         float(sizes[g] * 50000), 0.0, group_created_text[g], group_created_text[g], creators[g])
+        for g in range(group_count)
+    ))
+    copy_rows('group_loan_settings', ['group_id', 'max_loan_multiplier', 'base_interest_rate', 'min_repayment_period',
+                                      'max_repayment_period', 'late_penalty_rate', 'interest_method'], (
+        (group_ids[g], 3.0, INTEREST_RATE, 4, 12, 2.0, 'flat') for g in range(group_count)
+    ))
+
+    # Members join after their group was created and at least a month before the end
+    joined = group_created[member_groups] + rng.random(membership_count) * np.maximum(
+        horizon - 30 * 86400 - group_created[member_groups], 0)
+    joined[member_admin] = group_created[member_groups[member_admin]]
+    joined_text = to_text(start, joined)
+    copy_rows('group_members', ['user_id', 'group_id', 'is_admin', 'joined_at'], (
+        (user_ids[member_users[m]], group_ids[member_groups[m]], int(member_admin[m]), joined_text[m])
+        for m in range(membership_count)
+    ))
+    membership_seconds = horizon - joined
+    admin_of_group = user_ids[member_users[member_admin]]
+
+    # Contributions: each member contributes at their own weekly rate
+    activity = rng.beta(2, 2, membership_count)
+    counts = rng.poisson(membership_seconds / week * activity)
+    owner = np.repeat(np.arange(membership_count), counts)
+    seconds = joined[owner] + rng.random(len(owner)) * membership_seconds[owner]
+    amounts = np.maximum(50, np.round(rng.lognormal(np.log(500), 0.6, len(owner)), -1))
+    timestamps = to_text(start, seconds)
+    contribution = TransactionType.CONTRIBUTION.name
+    contributions = copy_rows('transactions', ['amount', 'description', 'transaction_type', 'timestamp', 'status', 'user_id', 'group_id'], (
+        (amounts[t], "Contribution", contribution, timestamps[t], 'completed',
+         user_ids[member_users[owner[t]]], group_ids[member_groups[owner[t]]])
+        for t in range(len(owner))
+    ))
+
+    # Withdrawals, each with the request an admin approved, and some still pending
+    counts = rng.poisson(membership_seconds / (365 * 86400) * WITHDRAWALS_PER_YEAR)
+    owner = np.repeat(np.arange(membership_count), counts)
+    seconds = joined[owner] + rng.random(len(owner)) * membership_seconds[owner]
+    amounts = np.maximum(100, np.round(rng.lognormal(np.log(800), 0.5, len(owner)), -1))
+    timestamps = to_text(start, seconds)
+    withdrawal = TransactionType.WITHDRAWAL.name
+    withdrawals = copy_rows('transactions', ['amount', 'description', 'transaction_type', 'timestamp', 'status', 'user_id', 'group_id'], (
+        (amounts[t], "Withdrawal", withdrawal, timestamps[t], 'completed',
+         user_ids[member_users[owner[t]]], group_ids[member_groups[owner[t]]])
+        for t in range(len(owner))
+    ))
+    pending = rng.random(membership_count) < PENDING_WITHDRAWAL_SHARE
+    pending_at = to_text(start, horizon - rng.random(membership_count) * 7 * 86400)
+    copy_rows('withdrawal_requests', ['amount', 'description', 'status', 'timestamp', 'updated_at', 'user_id',
+                                      'group_id', 'admin_id'], (
+        *((amounts[t], "Withdrawal", WithdrawalStatus.APPROVED.value, timestamps[t], timestamps[t],
+           user_ids[member_users[owner[t]]], group_ids[member_groups[owner[t]]],
+           admin_of_group[member_groups[owner[t]]])
+          for t in range(len(owner))),
+        *((500.0, "Withdrawal", WithdrawalStatus.PENDING.value, pending_at[m], pending_at[m],
+           user_ids[member_users[m]], group_ids[member_groups[m]], None)
+          for m in np.flatnonzero(pending))
+    ))
+
+    # Loans: finished ones paid (or defaulted), recent ones active, the newest pending
+    counts = rng.poisson(membership_seconds / (365 * 86400) * LOANS_PER_YEAR)
+    owner = np.repeat(np.arange(membership_count), counts)
+    loan_count = len(owner)
+    loan_ids = reserve_ids('loans', loan_count) if loan_count else np.array([], dtype=np.int64)
+    created = joined[owner] + rng.random(loan_count) * membership_seconds[owner]
+    principal = np.maximum(1000, np.round(rng.lognormal(np.log(5000), 0.7, loan_count), -2))
+    durations = rng.choice(LOAN_DURATIONS, loan_count)
+    approved = created + 86400
+    due = approved + durations * week
+    status = np.where(due < horizon, np.where(rng.random(loan_count) < DEFAULT_SHARE, 'DEFAULTED', 'PAID'), 'ACTIVE')
+    status[horizon - created < 3 * 86400] = 'PENDING'
+    created_text, approved_text, due_text = to_text(start, created), to_text(start, approved), to_text(start, due)
+    copy_rows('loans', ['id', 'amount', 'purpose', 'status', 'interest_rate', 'duration_weeks', 'interest_method',
+                        'approved_at', 'due_date', 'created_at', 'updated_at', 'group_id', 'user_id', 'approved_by_id'], (
+        (loan_ids[l], principal[l], "Synthetic loan", LoanStatus[status[l]].name, INTEREST_RATE, durations[l], 'flat',
+         None if status[l] == 'PENDING' else approved_text[l],
+         None if status[l] == 'PENDING' else due_text[l],
+         created_text[l], created_text[l], group_ids[member_groups[owner[l]]], user_ids[member_users[owner[l]]],
+         None if status[l] == 'PENDING' else admin_of_group[member_groups[owner[l]]])
+        for l in range(loan_count)
+    ))
+
+    # Weekly flat-rate installments of every approved loan; those already due are paid unless it defaulted
+    scheduled = np.flatnonzero(status != 'PENDING')
+    per_loan = durations[scheduled]
+    loan_of = np.repeat(scheduled, per_loan)
+    week_of = np.concatenate([np.arange(1, n + 1) for n in per_loan]) if len(per_loan) else np.array([], dtype=int)
+    installment_due = approved[loan_of] + week_of * week
+    principal_part = np.round(principal[loan_of] / durations[loan_of], 2)
+    interest_part = np.round(principal[loan_of] * INTEREST_RATE / 100 / durations[loan_of], 2)
+    paid = (installment_due < horizon) & (status[loan_of] != 'DEFAULTED') | (status[loan_of] == 'PAID')
+    installment_text = to_text(start, installment_due)
+    repayments = copy_rows('loan_repayments', ['amount', 'amount_paid', 'principal_amount', 'interest_amount', 'due_date',
+                                               'status', 'paid_at', 'created_at', 'is_overdue', 'penalty_amount', 'loan_id'], (
+        (principal_part[r] + interest_part[r], principal_part[r] + interest_part[r] if paid[r] else 0.0,
+         principal_part[r], interest_part[r], installment_text[r],
+         RepaymentStatus.PAID.name if paid[r] else RepaymentStatus.PENDING.name,
+         installment_text[r] if paid[r] else None, approved_text[loan_of[r]],
+         bool(not paid[r] and installment_due[r] < horizon), 0.0, loan_ids[loan_of[r]])
+        for r in range(len(loan_of))
+    ))
+
+    # Notifications, about a group each member belongs to
+    total = rng.poisson(user_count * config['years'] * NOTIFICATIONS_PER_YEAR)
+    memberships_of = rng.integers(0, membership_count, total)
+    types = [kind.value for kind in NotificationType]
+    kinds = rng.integers(0, len(types), len(memberships_of))
+    seconds = joined[memberships_of] + rng.random(len(memberships_of)) * membership_seconds[memberships_of]
+    notified_at = to_text(start, seconds)
+    read = rng.random(len(memberships_of)) < 0.8
+    notifications = copy_rows('notifications', ['type', 'message', 'recipient_id', 'group_id', 'created_at', 'read', 'emailed'], (
+        (types[kinds[n]], f"Synthetic {types[kinds[n]].replace('_', ' ')} notification",
+         user_ids[member_users[memberships_of[n]]], group_ids[member_groups[memberships_of[n]]],
+         notified_at[n], bool(read[n]), True)
+        for n in range(len(memberships_of))
+    ))
+
+    # Derived state, from the ledger
+    params = {'group_ids': [int(group_id) for group_id in group_ids]}
+    db.session.execute(text("""
+        INSERT INTO member_balances (user_id, group_id, total_contributed, total_withdrawn, total_dividends, held_amount, updated_at)
+        SELECT m.user_id, m.group_id,
+               coalesce(sum(t.amount) FILTER (WHERE t.transaction_type = 'CONTRIBUTION'), 0),
+               coalesce(sum(t.amount) FILTER (WHERE t.transaction_type = 'WITHDRAWAL'), 0),
+               0, 0, now()
+        FROM group_members m
+        LEFT JOIN transactions t ON t.group_id = m.group_id AND t.user_id = m.user_id
+        WHERE m.group_id = ANY(:group_ids)
+        GROUP BY m.user_id, m.group_id
+    """), params)
+    db.session.execute(text("""
+        INSERT INTO daily_rollups (group_id, user_id, day, contributed, contribution_count, withdrawn, withdrawal_count)
+        SELECT group_id, user_id, timestamp::date,
+               coalesce(sum(amount) FILTER (WHERE transaction_type = 'CONTRIBUTION'), 0),
+               count(*) FILTER (WHERE transaction_type = 'CONTRIBUTION'),
+               coalesce(sum(amount) FILTER (WHERE transaction_type = 'WITHDRAWAL'), 0),
+               count(*) FILTER (WHERE transaction_type = 'WITHDRAWAL')
+        FROM transactions
+        WHERE group_id = ANY(:group_ids) AND transaction_type IN ('CONTRIBUTION', 'WITHDRAWAL')
+        GROUP BY group_id, user_id, timestamp::date
+    """), params)
+    db.session.execute(text("""
+        UPDATE groups g SET current_amount = totals.saved
+        FROM (
+            SELECT group_id, sum(total_contributed - total_withdrawn) AS saved
+            FROM member_balances WHERE group_id = ANY(:group_ids) GROUP BY group_id
+        ) totals
+        WHERE g.id = totals.group_id
+    """), params)
+    db.session.commit()
+    for table in ('users', 'groups', 'group_members', 'transactions', 'withdrawal_requests', 'loans',
+                  'loan_repayments', 'notifications', 'member_balances', 'daily_rollups'):
+        db.session.execute(text(f"ANALYZE {table}"))
+    db.session.commit()
+
+    summary = describe(tag)
+    summary['loaded'] = {
+        'contributions': contributions, 'withdrawals': withdrawals, 'loans': loan_count,
+        'repayments': repayments, 'notifications': notifications
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--until', type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                        help="Last day of generated history (defaults to today)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        summary = generate(args.scale, args.seed, args.until)
+        print(f"{summary['tag']} ready in {time.perf_counter() - started:.1f}s")
+        for name, count in summary['counts'].items():
+            print(f"  {name:>14}: {count}")
+        print(f"  largest group {summary['group_id']} has {summary['group_members']} members")
+
+
+if __name__ == '__main__':
+    main()
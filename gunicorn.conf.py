@@ -0,0 +1,23 @@
+# gunicorn.conf.py
+import os
+import shutil
+import tempfile
+
+# Threaded workers so open notification streams do not tie up a whole worker each
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+
+# Workers write their Prometheus metrics here so /metrics can report all of them;
+# must be set before any worker imports prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'group-savings-metrics'))
+
+def on_starting(server):
+    # Start from empty files; stale ones from a previous run would be summed in
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
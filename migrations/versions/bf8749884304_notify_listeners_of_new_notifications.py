@@ -0,0 +1,49 @@
+"""Notify listeners of new notifications
+
+Revision ID: bf8749884304
+Revises: fd8f28dbe12f
+Create Date: 2026-10-19 16:37:12.519846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bf8749884304'
+down_revision = 'fd8f28dbe12f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Publish every new notification on one channel; each worker's listener routes it by recipient
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_notification_insert() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('notifications', json_build_object(
+                'id', NEW.id,
+                'type', NEW.type,
+                'message', NEW.message,
+                'recipient_id', NEW.recipient_id,
+                'sender_id', NEW.sender_id,
+                'group_id', NEW.group_id,
+                'reference_id', NEW.reference_id,
+                'reference_amount', NEW.reference_amount,
+                'created_at', to_char(NEW.created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+                'read', NEW.read
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER notifications_notify_insert
+        AFTER INSERT ON notifications
+        FOR EACH ROW EXECUTE FUNCTION notify_notification_insert()
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS notifications_notify_insert ON notifications")
+    op.execute("DROP FUNCTION IF EXISTS notify_notification_insert()")